@@ -7,6 +7,8 @@ from rest_framework import status
 from rest_framework.pagination import PageNumberPagination
 from Orgnization.pagination import CustomPagination
 import logging
+from HRMS.reference_data import bump_reference_version
+from Employee.attendance_snapshot import schedule_propagation
 
 @api_view(['POST'])
 def create_dept(request):
@@ -14,6 +16,7 @@ def create_dept(request):
     print("fetched data",request.data)
     if serializer.is_valid():
         serializer.save()
+        bump_reference_version("departments")
         print("serialised data",serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -46,9 +49,13 @@ def update_dept(request,pk):
     except Departments.DoesNotExist:
         return Response({'error':'data not found'}, status=status.HTTP_400_BAD_REQUEST)
     
+    old_name = dept.deptName
     serializer = DepartmentsSerializer(dept,data=request.data)
     if serializer.is_valid():
         serializer.save()
+        bump_reference_version("departments")
+        if serializer.instance.deptName != old_name:
+            schedule_propagation("departmentId", dept.id)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -59,4 +66,5 @@ def delete_dept(request,pk):
     except Departments.DoesNotExist:
         return Response({'error':'data not found'}, status=status.HTTP_400_BAD_REQUEST)
     dept.delete()
+    bump_reference_version("departments")
     return Response({"Message":'Departments Record deleted successfully'},status=status.HTTP_200_OK)
\ No newline at end of file
@@ -1,10 +1,10 @@
 # Employee/attendance_checker.py
 from utils.timezone_utils import (
     get_current_datetime_ist, get_current_date_ist, get_current_time_ist,
-    is_time_after, calculate_work_hours, is_valid_time_format
+    calculate_work_hours, is_valid_time_format
 )
 from Employee.models import Employee, Attendance
-from Shifts.models import Shift
+from HRMS.shift_registry import compiled, get_compiled_shift, seconds_of
 from datetime import datetime, timedelta
 import logging
 
@@ -17,95 +17,75 @@ def get_shift_absent_cutoff_time(shift):
     Returns: time string "HH:MM:SS" for the cutoff (shift end time - 2 hours)
     
     Args:
-        shift: Shift object with string time fields
+        shift: Shift object or CompiledShift
     
     Returns: string "HH:MM:SS" or None
     """
-    if not shift or not shift.endTime:
-        return None
-    
-    try:
-        # Parse shift end time string "HH:MM:SS"
-        end_time = datetime.strptime(shift.endTime, "%H:%M:%S")
-        
-        # Subtract 2 hours
-        cutoff_time = end_time - timedelta(hours=2)
-        
-        # Return as string
-        return cutoff_time.strftime("%H:%M:%S")
-    except Exception as e:
-        logger.error(f"Error calculating cutoff time: {e}")
+    shift = compiled(shift)
+    if not shift:
         return None
+    return shift.absent_cutoff_time
 
 
 def should_mark_absent_for_shift(shift, current_time_str, current_date_str):
     """
     Determine if we should mark absent based on shift timing
     
-    RULE: Mark absent ONLY when current time >= (shift end time - 2 hours)
+    RULE: Mark absent ONLY when current time has passed (shift end time - 2 hours)
     Never mark absent before this cutoff time.
+    Shifts crossing midnight (e.g. 10 PM - 6 AM, cutoff 4 AM) only pass
+    their cutoff after midnight.
     
     Args:
-        shift: Shift object
+        shift: Shift object or CompiledShift
         current_time_str: current time string "HH:MM:SS"
         current_date_str: current date string "YYYY-MM-DD"
         
     Returns: Boolean
     """
+    shift = compiled(shift)
     if not shift:
         return False
     
-    cutoff_time = get_shift_absent_cutoff_time(shift)
-    if not cutoff_time:
+    current_seconds = seconds_of(current_time_str)
+    if current_seconds is None:
+        logger.error(f"Invalid current time for absent check: {current_time_str}")
         return False
     
-    shift_type = getattr(shift, 'shiftType', '').lower()
+    result = shift.absent_cutoff_passed(current_seconds)
     
-    try:
-        # Parse current time for hour checking
-        current_time_obj = datetime.strptime(current_time_str, "%H:%M:%S").time()
-        
-        # CRITICAL: Only mark absent if current time has reached or passed the cutoff
-        # This ensures we DON'T mark absent before (shift_end - 2 hours)
-        
-        # Handle night shift that crosses midnight
-        if shift_type == 'night':
-            # Parse shift times
-            shift_end = datetime.strptime(shift.endTime, "%H:%M:%S").time()
-            shift_start = datetime.strptime(shift.fromTime, "%H:%M:%S").time()
-            
-            # If end time is less than start time, shift crosses midnight
-            if shift_end < shift_start:
-                # For night shifts crossing midnight
-                # Example: 10 PM - 6 AM, cutoff = 4 AM
-                cutoff_obj = datetime.strptime(cutoff_time, "%H:%M:%S").time()
-                
-                # If cutoff is in early morning (e.g., 4 AM)
-                if cutoff_obj.hour < 12:
-                    # Current time must be after midnight and >= cutoff
-                    if current_time_obj.hour < 12:
-                        return is_time_after(current_time_str, cutoff_time)
-                    else:
-                        # Still in previous day (PM), not yet at cutoff
-                        return False
-                else:
-                    # Cutoff is in evening
-                    return is_time_after(current_time_str, cutoff_time)
-        
-        # For all other shifts (day, afternoon, rotational)
-        # Simple comparison: current_time >= cutoff_time
-        result = is_time_after(current_time_str, cutoff_time)
-        
-        logger.debug(
-            f"Shift: {shift_type}, Current: {current_time_str}, "
-            f"Cutoff: {cutoff_time}, Should mark: {result}"
-        )
-        
-        return result
+    logger.debug(
+        f"Shift: {shift.shift_type}, Current: {current_time_str}, "
+        f"Cutoff: {shift.absent_cutoff_time}, Should mark: {result}"
+    )
     
-    except Exception as e:
-        logger.error(f"Error in should_mark_absent_for_shift: {e}")
-        return False
+    return result
+
+
+def _employees_by_id(attendances):
+    """
+    {employee id: {"firstName", "lastName", "shiftId"}} for the attendance
+    rows, in one query (rows are not dereferenced one by one)
+    """
+    employee_ids = {
+        getattr(ref, "id", ref)
+        for ref in (attendance._data.get("employee") for attendance in attendances)
+        if ref
+    }
+    if not employee_ids:
+        return {}
+    return {
+        row["_id"]: row
+        for row in Employee._get_collection().find(
+            {"_id": {"$in": list(employee_ids)}},
+            {"firstName": 1, "lastName": 1, "shiftId": 1}
+        )
+    }
+
+
+def _employee_of(attendance, employees):
+    ref = attendance._data.get("employee")
+    return employees.get(getattr(ref, "id", ref))
 
 
 def is_attendance_record_new(attendance, grace_minutes=30):
@@ -169,17 +149,22 @@ def mark_absent_for_date(check_date_str, skip_new_records=True):
         skipped = 0
         skipped_new = 0
         
+        pending_attendances = list(pending_attendances)
+        employees = _employees_by_id(pending_attendances)
+        
         for attendance in pending_attendances:
+            employee = _employee_of(attendance, employees)
+            
             # Skip if already checked in
             if attendance.check_in_time:
-                logger.debug(f"Skipping {attendance.employee.firstName} - already checked in")
+                logger.debug(f"Skipping {employee['firstName'] if employee else 'Unknown'} - already checked in")
                 continue
             
-            employee = attendance.employee
+            shift = get_compiled_shift(employee.get("shiftId")) if employee else None
             
-            if not employee or not employee.shiftId:
+            if not shift:
                 skipped += 1
-                logger.warning(f"Skipping employee {employee.id if employee else 'Unknown'} - no shift assigned")
+                logger.warning(f"Skipping employee {employee['_id'] if employee else 'Unknown'} - no shift assigned")
                 continue
             
             # Skip newly created records to prevent immediate absent marking
@@ -187,12 +172,11 @@ def mark_absent_for_date(check_date_str, skip_new_records=True):
                 if is_attendance_record_new(attendance, grace_minutes=30):
                     skipped_new += 1
                     logger.debug(
-                        f"⏳ Skipping {employee.firstName} {employee.lastName} - "
+                        f"⏳ Skipping {employee['firstName']} {employee['lastName']} - "
                         f"record created recently (within grace period)"
                     )
                     continue
             
-            shift = employee.shiftId
             should_mark = False
             
             # If checking for today, use real-time cutoff logic
@@ -205,20 +189,20 @@ def mark_absent_for_date(check_date_str, skip_new_records=True):
                 
                 if should_mark:
                     logger.info(
-                        f"⏰ Cutoff passed for {employee.firstName} {employee.lastName} "
-                        f"(Shift: {shift.shiftType}, Cutoff: {get_shift_absent_cutoff_time(shift)})"
+                        f"⏰ Cutoff passed for {employee['firstName']} {employee['lastName']} "
+                        f"(Shift: {shift.shift_type}, Cutoff: {shift.absent_cutoff_time})"
                     )
                 else:
                     logger.debug(
-                        f"⏳ Cutoff NOT passed yet for {employee.firstName} {employee.lastName} "
-                        f"(Cutoff: {get_shift_absent_cutoff_time(shift)})"
+                        f"⏳ Cutoff NOT passed yet for {employee['firstName']} {employee['lastName']} "
+                        f"(Cutoff: {shift.absent_cutoff_time})"
                     )
             else:
                 # For past dates, always mark as absent if not checked in
                 # Compare date strings directly
                 should_mark = check_date_str < current_date_str
                 if should_mark:
-                    logger.info(f"📅 Past date - marking {employee.firstName} {employee.lastName} as absent")
+                    logger.info(f"📅 Past date - marking {employee['firstName']} {employee['lastName']} as absent")
             
             if should_mark:
                 attendance.status = 'absent'
@@ -227,9 +211,9 @@ def mark_absent_for_date(check_date_str, skip_new_records=True):
                 marked_absent += 1
                 
                 logger.info(
-                    f"✅ Marked {employee.firstName} {employee.lastName} as ABSENT "
-                    f"for {check_date_str} (Shift: {shift.shiftType}, "
-                    f"Cutoff: {get_shift_absent_cutoff_time(shift)}, "
+                    f"✅ Marked {employee['firstName']} {employee['lastName']} as ABSENT "
+                    f"for {check_date_str} (Shift: {shift.shift_type}, "
+                    f"Cutoff: {shift.absent_cutoff_time}, "
                     f"Current: {current_time_str if check_date_str == current_date_str else 'Past date'})"
                 )
         
@@ -325,28 +309,31 @@ def get_employees_to_check_now():
         
         to_mark = []
         
+        pending_attendances = list(pending_attendances)
+        employees = _employees_by_id(pending_attendances)
+        
         for attendance in pending_attendances:
             # Skip if checked in
             if attendance.check_in_time:
                 continue
                 
-            employee = attendance.employee
+            employee = _employee_of(attendance, employees)
+            shift = get_compiled_shift(employee.get("shiftId")) if employee else None
             
-            if not employee or not employee.shiftId:
+            if not shift:
                 continue
             
             # Skip newly created records
             if is_attendance_record_new(attendance, grace_minutes=30):
                 continue
             
-            shift = employee.shiftId
-            cutoff_time = get_shift_absent_cutoff_time(shift)
+            cutoff_time = shift.absent_cutoff_time
             
             if should_mark_absent_for_shift(shift, current_time_str, current_date_str):
                 to_mark.append((
                     attendance,
                     cutoff_time,
-                    f"Shift: {shift.shiftType}, Cutoff: {cutoff_time}, Current: {current_time_str}"
+                    f"Shift: {shift.shift_type}, Cutoff: {cutoff_time}, Current: {current_time_str}"
                 ))
         
         return to_mark
@@ -0,0 +1,188 @@
+# Employee/attendance_snapshot.py
+"""
+Employee snapshot embedded in attendance rows
+
+Attendance lists show who each row belongs to. Instead of dereferencing
+attendance.employee (and its department and shift) per row, every row
+carries `employee_snapshot`: {name, email, deptName, shiftType, orgId}.
+
+- written when the row is created: Attendance.clean() for rows saved
+  with a loaded employee, Employee.punches.check_in for rows the
+  check-in upsert creates
+- department names and shift types come from the reference-data cache
+  and the shift registry, so building a snapshot needs no query; a
+  propagation job re-reads their versions first
+- update_emp, update_dept and update_shift queue a propagation job when
+  a field in a snapshot changes; it rewrites the affected employees'
+  rows with one update_many per employee (bulk), skipping rows that
+  already match
+- `manage.py sync_attendance_snapshots` backfills rows written before
+  snapshots existed
+
+Jobs run on a background thread, or on Celery with
+ATTENDANCE_SNAPSHOT_BACKEND = "celery".
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import ObjectId
+from django.conf import settings
+from pymongo import UpdateMany
+
+from HRMS.reference_data import reference_data_cache
+from HRMS.shift_registry import get_compiled_shift
+
+
+# Employee fields the snapshot is built from
+SOURCE_FIELDS = ("firstName", "lastName", "email", "departmentId", "shiftId", "organizationId")
+# Employee fields a propagation job can select on
+PROPAGATION_KEYS = ("_id", "departmentId", "shiftId")
+WRITE_BATCH_SIZE = 500
+
+
+def _ref_id(value):
+    return getattr(value, "id", value) if value is not None else None
+
+
+def department_name(department_id):
+    if not department_id:
+        return None
+    names = reference_data_cache.get(("department_names",))["department_names"]
+    return names.get(str(department_id))
+
+
+def build_snapshot(first_name, last_name, email, department_id, shift_id, org_id):
+    """
+    Snapshot dict as stored in attendance.employee_snapshot
+    Missing values are left out rather than stored as null, the way
+    MongoEngine saves EmployeeSnapshot: rows written by Attendance.clean()
+    and by the check-in upsert then have the same shape, and compare
+    equal when propagate_snapshots() looks for stale ones.
+    """
+    shift = get_compiled_shift(shift_id)
+    snapshot = {
+        "name": " ".join(part for part in (first_name, last_name) if part),
+        "email": email,
+        "deptName": department_name(department_id),
+        "shiftType": shift.shift_type if shift else None,
+        "orgId": _ref_id(org_id),
+    }
+    # Key order is EmployeeSnapshot's field order: embedded documents
+    # only compare equal field by field in order
+    return {key: value for key, value in snapshot.items() if value is not None}
+
+
+def snapshot_from_employee(employee):
+    """Snapshot of an Employee document (references are not dereferenced)"""
+    data = employee._data
+    return build_snapshot(
+        employee.firstName,
+        employee.lastName,
+        employee.email,
+        _ref_id(data.get("departmentId")),
+        _ref_id(data.get("shiftId")),
+        _ref_id(data.get("organizationId")),
+    )
+
+
+def snapshot_from_row(row):
+    """Snapshot of a raw employees collection row"""
+    return build_snapshot(
+        row.get("firstName"),
+        row.get("lastName"),
+        row.get("email"),
+        row.get("departmentId"),
+        row.get("shiftId"),
+        row.get("organizationId"),
+    )
+
+
+def snapshot_for_user(user):
+    """Snapshot of the authenticated user (Principal or Employee)"""
+    if hasattr(user, "_data"):
+        return snapshot_from_employee(user)
+    return build_snapshot(
+        user.firstName,
+        user.lastName,
+        user.email,
+        user.departmentId,
+        user.shiftId,
+        user.organizationId,
+    )
+
+
+def propagate_snapshots(query, only_missing=False):
+    """
+    Rewrite the snapshot on the attendance rows of the employees matching
+    `query` (raw employees filter); returns the number of rows modified
+    only_missing: leave rows that already have a snapshot alone (backfill)
+    """
+    from Employee.models import Attendance, Employee
+
+    # This process may not have seen the department rename / shift change
+    # that queued the job yet (Celery worker, another web worker)
+    reference_data_cache.sync(force=True)
+
+    attendance = Attendance._get_collection()
+    operations = []
+    modified = 0
+
+    for row in Employee._get_collection().find(query, {field: 1 for field in SOURCE_FIELDS}):
+        snapshot = snapshot_from_row(row)
+        stale = {"$exists": False} if only_missing else {"$ne": snapshot}
+        operations.append(UpdateMany(
+            {"employee": row["_id"], "employee_snapshot": stale},
+            {"$set": {"employee_snapshot": snapshot}}
+        ))
+        if len(operations) >= WRITE_BATCH_SIZE:
+            modified += attendance.bulk_write(operations, ordered=False).modified_count
+            operations = []
+
+    if operations:
+        modified += attendance.bulk_write(operations, ordered=False).modified_count
+    return modified
+
+
+def _run(key, value):
+    try:
+        modified = propagate_snapshots({key: ObjectId(value)})
+        print(f"🧾 Attendance snapshots refreshed for {key}={value}: {modified} rows")
+    except Exception as e:
+        print(f"❌ Error refreshing attendance snapshots for {key}={value}: {e}")
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # One worker: jobs for the same employee apply in order
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="attendance-snapshots")
+    return _executor
+
+
+def schedule_propagation(key, value):
+    """
+    Queue a snapshot refresh for the employees whose `key`
+    ("_id", "departmentId" or "shiftId") is `value`
+    """
+    if key not in PROPAGATION_KEYS:
+        raise ValueError(f"Unknown snapshot propagation key '{key}'")
+    value = str(value)
+    if getattr(settings, "ATTENDANCE_SNAPSHOT_BACKEND", "thread") == "celery":
+        try:
+            from Employee.tasks import propagate_attendance_snapshots_task
+            propagate_attendance_snapshots_task.delay(key, value)
+            return
+        except Exception as e:
+            print(f"⚠️  Could not queue snapshot task, using local worker: {e}")
+    _get_executor().submit(_run, key, value)
+
+
+def snapshot_changed(validated_data):
+    """An update touching these fields needs its snapshots refreshed"""
+    return any(field in validated_data for field in SOURCE_FIELDS)
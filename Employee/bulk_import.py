@@ -0,0 +1,388 @@
+# Employee/bulk_import.py
+"""
+Bulk employee import from CSV, XLSX or NDJSON
+
+Columns / keys use the same names as create_emp, nested fields in dotted
+form (NDJSON may also use nested objects):
+
+    firstName,lastName,email,mobileNumber,gender,dob,doj,status,role,
+    organizationId,departmentId,shiftId,designationId,reportingManagers,
+    currentAddress.street,currentAddress.city,...,permanentAddress.country
+
+- organizationId / departmentId / shiftId accept an id or a name
+  (orgName / deptName / shiftType), resolved from the cached
+  reference-data lookups
+- reportingManagers: ids or emails separated by "," or ";" - existing
+  employees or rows earlier in the same file (ancestors are filled in,
+  see Employee.hierarchy)
+- password: generated when empty, like create_emp
+- dob / doj: YYYY-MM-DD (XLSX date cells also work)
+
+Rows are processed in batches: one query per batch for taken emails and
+reporting managers, documents validated with Employee.validate() and
+written with an unordered insert_many. Failing rows never stop the
+import; each one is reported with its row (line) number and field errors.
+Documents / photos are not part of a bulk import.
+"""
+import csv
+import io
+import json
+import os
+import random
+import re
+import string
+import time
+from datetime import date, datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from mongoengine.errors import ValidationError
+from pymongo.errors import BulkWriteError
+
+from Employee.models import Employee, Address
+from HRMS.principal_cache import bump_principal_versions
+from HRMS.reference_data import get_lookups, bump_reference_version
+from Employee.hierarchy import ancestors_for
+
+
+FORMATS = ("csv", "xlsx", "ndjson")
+EXTENSIONS = {".csv": "csv", ".xlsx": "xlsx", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+SCALAR_FIELDS = (
+    "firstName", "middleName", "lastName", "location", "email", "password",
+    "mobileNumber", "gender", "status", "role", "designationId",
+)
+ADDRESS_FIELDS = ("currentAddress", "permanentAddress")
+
+# field -> (lookup name, name key in the lookup)
+REFERENCE_LOOKUPS = {
+    "organizationId": ("organizations", "orgName"),
+    "departmentId": ("departments", "deptName"),
+    "shiftId": ("shifts", "shiftType"),
+}
+
+_MANAGER_SPLIT = re.compile(r"[,;]")
+
+
+class ImportFormatError(Exception):
+    """The file cannot be read in the requested format"""
+
+
+def detect_format(filename, fmt=None):
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in FORMATS:
+            raise ImportFormatError(f"Unsupported format '{fmt}', use one of: {', '.join(FORMATS)}")
+        return fmt
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext not in EXTENSIONS:
+        raise ImportFormatError("Cannot detect the file format, pass file_format=csv|xlsx|ndjson")
+    return EXTENSIONS[ext]
+
+
+# ============================================================================
+# READERS - yield (row number, {key: value})
+# ============================================================================
+
+def read_csv(stream):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ndjson(stream):
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, {"__error__": f"Invalid JSON: {e}"}
+            continue
+        yield line_number, row if isinstance(row, dict) else {"__error__": "Expected a JSON object"}
+
+
+def read_xlsx(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError("XLSX import needs the openpyxl package")
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            return
+        keys = [str(cell).strip() if cell is not None else "" for cell in header]
+        for row_number, values in enumerate(rows, start=2):
+            if all(value is None for value in values):
+                continue
+            yield row_number, {key: value for key, value in zip(keys, values) if key}
+    finally:
+        workbook.close()
+
+
+READERS = {"csv": read_csv, "xlsx": read_xlsx, "ndjson": read_ndjson}
+
+
+def read_rows(stream, fmt):
+    return READERS[fmt](stream)
+
+
+# ============================================================================
+# ROW -> EMPLOYEE
+# ============================================================================
+
+def _clean(value):
+    """Normalize a cell: strings stripped, empty -> None, XLSX 9876543210.0 -> "9876543210" """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def _nest(row):
+    """{"currentAddress.city": x} -> {"currentAddress": {"city": x}}"""
+    result = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            result.setdefault(key, {}).update({k: _clean(v) for k, v in value.items()})
+        elif "." in key:
+            parent, child = key.split(".", 1)
+            result.setdefault(parent, {})[child] = _clean(value)
+        else:
+            result[key] = _clean(value)
+    return result
+
+
+def _parse_date(value):
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _is_object_id(value):
+    try:
+        ObjectId(value)
+        return True
+    except (InvalidId, TypeError):
+        return False
+
+
+class ReferenceResolver:
+    """Name / id -> ObjectId maps built once per import from the cached lookups"""
+
+    def __init__(self):
+        lookups = get_lookups(*(name for name, _ in REFERENCE_LOOKUPS.values()))
+        self.ids = {}
+        self.names = {}
+        for field, (lookup, name_key) in REFERENCE_LOOKUPS.items():
+            self.ids[field] = {row["id"] for row in lookups[lookup]}
+            by_name = {}
+            for row in lookups[lookup]:
+                by_name.setdefault((row.get(name_key) or "").strip().lower(), []).append(row["id"])
+            self.names[field] = by_name
+
+    def resolve(self, field, value):
+        """Return (ObjectId, error)"""
+        if value in self.ids[field]:
+            return ObjectId(value), None
+        matches = self.names[field].get(str(value).strip().lower(), [])
+        if len(matches) == 1:
+            return ObjectId(matches[0]), None
+        if matches:
+            return None, f"'{value}' matches {len(matches)} records, use the id"
+        return None, f"'{value}' not found"
+
+
+class EmployeeImporter:
+    """
+    Validate and insert employee rows in batches
+
+    importer = EmployeeImporter(dry_run=False)
+    report = importer.run(read_rows(stream, "csv"))
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+        self.batch_size = max(1, batch_size)
+        self.dry_run = dry_run
+        self.resolver = ReferenceResolver()
+        self.file_emails = {}      # email -> new id, rows accepted so far
+        self.ancestors = {}        # manager / new employee id -> ancestors
+        self.errors = []
+        self.error_count = 0
+        self.total = 0
+        self.imported_ids = []
+
+    # ------------------------------------------------------------------
+
+    def run(self, rows):
+        started = time.perf_counter()
+        batch = []
+        for row_number, row in rows:
+            self.total += 1
+            batch.append((row_number, row))
+            if len(batch) >= self.batch_size:
+                self._process_batch(batch)
+                batch = []
+        if batch:
+            self._process_batch(batch)
+
+        if self.imported_ids and not self.dry_run:
+            bump_reference_version("employees")
+            bump_principal_versions(self.imported_ids)
+            from Employee.search_index import employee_search_index
+            employee_search_index.refresh(self.imported_ids)
+
+        return {
+            "total": self.total,
+            "imported": 0 if self.dry_run else len(self.imported_ids),
+            "valid": len(self.imported_ids) if self.dry_run else None,
+            "failed": self.error_count,
+            "dry_run": self.dry_run,
+            "errors": self.errors,
+            "errors_truncated": self.error_count > len(self.errors),
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def _error(self, row_number, email, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "email": email, "errors": errors})
+
+    # ------------------------------------------------------------------
+
+    def _process_batch(self, batch):
+        rows = []
+        for row_number, raw in batch:
+            if "__error__" in raw:
+                self._error(row_number, None, {"row": raw["__error__"]})
+                continue
+            rows.append((row_number, _nest(raw)))
+
+        emails = {row.get("email") for _, row in rows} - {None}
+        manager_refs = {
+            ref.strip()
+            for _, row in rows
+            for ref in _MANAGER_SPLIT.split(row.get("reportingManagers") or "")
+            if ref.strip()
+        }
+        taken, managers = self._prefetch(emails, manager_refs)
+
+        documents = []
+        for row_number, row in rows:
+            email = row.get("email")
+            employee, errors = self._build(row, managers)
+            if email and (email in taken or email.lower() in self.file_emails):
+                errors["email"] = "Employee with this email already exists"
+            if errors:
+                self._error(row_number, email, errors)
+                continue
+            self.file_emails[email.lower()] = employee.id
+            self.ancestors[employee.id] = employee.ancestors
+            documents.append((row_number, email, employee.to_mongo().to_dict()))
+
+        if documents:
+            self._insert(documents)
+
+    def _prefetch(self, emails, manager_refs):
+        """Taken emails and reporting managers for a batch (two queries)"""
+        taken = set()
+        if emails:
+            taken = set(Employee._get_collection().distinct("email", {"email": {"$in": list(emails)}}))
+
+        managers = {}
+        ids = [ObjectId(ref) for ref in manager_refs if _is_object_id(ref)]
+        manager_emails = [ref for ref in manager_refs if "@" in ref]
+        if ids or manager_emails:
+            query = {"$or": [{"_id": {"$in": ids}}, {"email": {"$in": manager_emails}}]}
+            for row in Employee._get_collection().find(query, {"email": 1, "ancestors": 1}):
+                self.ancestors[row["_id"]] = row.get("ancestors") or []
+                managers[str(row["_id"])] = row["_id"]
+                if row.get("email"):
+                    managers[row["email"].lower()] = row["_id"]
+        return taken, managers
+
+    def _build(self, row, managers):
+        """Return (Employee or None, {field: error})"""
+        errors = {}
+        data = {field: row[field] for field in SCALAR_FIELDS if row.get(field) is not None}
+
+        for field in ("dob", "doj"):
+            if row.get(field) is None:
+                continue
+            try:
+                data[field] = _parse_date(row[field])
+            except (TypeError, ValueError):
+                errors[field] = "Date must be YYYY-MM-DD"
+
+        for field in REFERENCE_LOOKUPS:
+            if row.get(field) is None:
+                continue
+            value, error = self.resolver.resolve(field, row[field])
+            if error:
+                errors[field] = error
+            else:
+                data[field] = value
+
+        manager_ids = []
+        for ref in _MANAGER_SPLIT.split(row.get("reportingManagers") or ""):
+            ref = ref.strip()
+            if not ref:
+                continue
+            manager_id = managers.get(ref.lower()) or managers.get(ref) or self.file_emails.get(ref.lower())
+            if manager_id is None:
+                errors["reportingManagers"] = f"Reporting manager '{ref}' not found"
+                break
+            manager_ids.append(manager_id)
+        data["reportingManagers"] = manager_ids
+        # Every manager was loaded above or is an earlier row - no query
+        data["ancestors"] = ancestors_for(manager_ids, known=self.ancestors)
+
+        for field in ADDRESS_FIELDS:
+            if isinstance(row.get(field), dict):
+                data[field] = Address(**{k: v for k, v in row[field].items() if k in Address._fields})
+
+        if not data.get("password"):
+            data["password"] = "".join(random.choices(string.ascii_letters + string.digits, k=8))
+
+        employee = Employee(id=ObjectId(), **data)
+        try:
+            employee.validate()
+        except ValidationError as e:
+            for field, message in (e.to_dict() or {}).items():
+                errors.setdefault(field, message if isinstance(message, str) else str(message))
+        return (None if errors else employee), errors
+
+    def _insert(self, documents):
+        if self.dry_run:
+            self.imported_ids.extend(doc["_id"] for _, _, doc in documents)
+            return
+
+        failed = {}
+        try:
+            Employee._get_collection().insert_many([doc for _, _, doc in documents], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                failed[write_error["index"]] = write_error
+
+        for index, (row_number, email, doc) in enumerate(documents):
+            write_error = failed.get(index)
+            if write_error is None:
+                self.imported_ids.append(doc["_id"])
+                continue
+            self.file_emails.pop(email.lower(), None)
+            if write_error.get("code") == 11000:
+                self._error(row_number, email, {"email": "Employee with this email already exists"})
+            else:
+                self._error(row_number, email, {"row": write_error.get("errmsg", "Write failed")})
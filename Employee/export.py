@@ -0,0 +1,207 @@
+# Employee/export.py
+"""
+Streaming employee directory export (CSV / NDJSON)
+
+Rows are generated straight from a server-side MongoDB cursor (fetched
+EXPORT_BATCH_SIZE documents at a time) and written to the response as
+they are produced, so memory stays flat however many employees there are.
+
+References are resolved without per-row queries:
+- organizations, departments, shifts: loaded into dicts once per export
+  (small collections)
+- reporting managers: looked up with one `$in` query per batch for the
+  ids not seen yet, kept in a bounded map
+"""
+import csv
+import json
+
+from django.conf import settings
+
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+DEFAULT_BATCH_SIZE = 1000
+MAX_CACHED_MANAGERS = 20000
+
+SCALAR_FIELDS = (
+    "firstName", "middleName", "lastName", "email", "mobileNumber", "gender",
+    "status", "role", "designationId", "location",
+)
+DATE_FIELDS = ("dob", "doj")
+ADDRESS_FIELDS = ("street", "city", "state", "zip", "country")
+
+PROJECTION = {
+    **{field: 1 for field in SCALAR_FIELDS + DATE_FIELDS},
+    "organizationId": 1,
+    "departmentId": 1,
+    "shiftId": 1,
+    "reportingManagers": 1,
+    "currentAddress": 1,
+    "permanentAddress": 1,
+}
+
+CSV_COLUMNS = (
+    ["id"] + list(SCALAR_FIELDS) + list(DATE_FIELDS)
+    + ["organization", "department", "shift", "shiftFromTime", "shiftEndTime", "reportingManagers"]
+    + [f"currentAddress.{field}" for field in ADDRESS_FIELDS]
+    + [f"permanentAddress.{field}" for field in ADDRESS_FIELDS]
+)
+
+
+class _Echo:
+    """File-like object whose write() returns the line (csv.writer -> generator)"""
+
+    def write(self, value):
+        return value
+
+
+def _reference_maps():
+    """id -> details for organizations, departments and shifts"""
+    from Orgnization.models import Organization
+    from Departments.models import Departments
+    from Shifts.models import Shift
+
+    return {
+        "organizationId": {
+            row["_id"]: {"id": str(row["_id"]), "name": row.get("orgName")}
+            for row in Organization._get_collection().find({}, {"orgName": 1})
+        },
+        "departmentId": {
+            row["_id"]: {"id": str(row["_id"]), "name": row.get("deptName")}
+            for row in Departments._get_collection().find({}, {"deptName": 1})
+        },
+        "shiftId": {
+            row["_id"]: {
+                "id": str(row["_id"]),
+                "name": row.get("shiftType"),
+                "fromTime": row.get("fromTime"),
+                "endTime": row.get("endTime"),
+            }
+            for row in Shift._get_collection().find({}, {"shiftType": 1, "fromTime": 1, "endTime": 1})
+        },
+    }
+
+
+def _ref_id(value):
+    """ObjectId of a stored reference (plain ObjectId or DBRef)"""
+    return getattr(value, "id", value)
+
+
+def _format_date(value):
+    return value.strftime("%Y-%m-%d") if hasattr(value, "strftime") else value
+
+
+class EmployeeExporter:
+    """
+    exporter = EmployeeExporter("csv", filters={"status": "active"})
+    StreamingHttpResponse(exporter.stream(), content_type=exporter.content_type)
+    """
+
+    def __init__(self, fmt="csv", filters=None, batch_size=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}', use one of: {', '.join(FORMATS)}")
+        self.fmt = fmt
+        self.filters = filters or {}
+        self.batch_size = batch_size or getattr(settings, "EXPORT_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+        self._managers = {}
+
+    @property
+    def content_type(self):
+        return FORMATS[self.fmt]
+
+    def _resolve_managers(self, batch):
+        """Load the reporting managers of a batch not seen yet (one query)"""
+        from Employee.models import Employee
+
+        needed = {
+            _ref_id(ref)
+            for row in batch
+            for ref in row.get("reportingManagers") or ()
+        }
+        if len(self._managers) + len(needed - self._managers.keys()) > MAX_CACHED_MANAGERS:
+            # Evict first, so the batch's own managers are loaded again
+            self._managers.clear()
+        missing = needed - self._managers.keys()
+        if not missing:
+            return
+        for row in Employee._get_collection().find(
+            {"_id": {"$in": list(missing)}}, {"firstName": 1, "lastName": 1, "email": 1}
+        ):
+            self._managers[row["_id"]] = {
+                "id": str(row["_id"]),
+                "name": f"{row.get('firstName', '')} {row.get('lastName', '')}".strip(),
+                "email": row.get("email"),
+            }
+
+    def _record(self, row, refs):
+        """Employee document -> export record (nested, NDJSON shape)"""
+        record = {"id": str(row["_id"])}
+        for field in SCALAR_FIELDS:
+            record[field] = row.get(field)
+        for field in DATE_FIELDS:
+            record[field] = _format_date(row.get(field))
+        record["organization"] = refs["organizationId"].get(_ref_id(row.get("organizationId")))
+        record["department"] = refs["departmentId"].get(_ref_id(row.get("departmentId")))
+        record["shift"] = refs["shiftId"].get(_ref_id(row.get("shiftId")))
+        record["reportingManagers"] = [
+            self._managers[_ref_id(ref)]
+            for ref in row.get("reportingManagers") or ()
+            if _ref_id(ref) in self._managers
+        ]
+        for address in ("currentAddress", "permanentAddress"):
+            value = row.get(address) or {}
+            record[address] = {field: value.get(field) for field in ADDRESS_FIELDS}
+        return record
+
+    @staticmethod
+    def _csv_values(record):
+        shift = record["shift"] or {}
+        values = [record["id"]]
+        values += [record[field] for field in SCALAR_FIELDS + DATE_FIELDS]
+        values += [
+            (record["organization"] or {}).get("name"),
+            (record["department"] or {}).get("name"),
+            shift.get("name"),
+            shift.get("fromTime"),
+            shift.get("endTime"),
+            "; ".join(f"{m['name']} <{m['email']}>" for m in record["reportingManagers"]),
+        ]
+        for address in ("currentAddress", "permanentAddress"):
+            values += [record[address][field] for field in ADDRESS_FIELDS]
+        return values
+
+    def _batches(self):
+        from Employee.models import Employee
+
+        cursor = Employee._get_collection().find(
+            self.filters, PROJECTION, batch_size=self.batch_size
+        ).sort("_id", 1)
+        batch = []
+        try:
+            for row in cursor:
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            cursor.close()
+
+    def stream(self):
+        """Generator of response chunks (one per batch)"""
+        refs = _reference_maps()
+        writer = csv.writer(_Echo()) if self.fmt == "csv" else None
+        if writer:
+            yield writer.writerow(CSV_COLUMNS)
+
+        for batch in self._batches():
+            self._resolve_managers(batch)
+            if writer:
+                yield "".join(writer.writerow(self._csv_values(self._record(row, refs))) for row in batch)
+            else:
+                yield "".join(
+                    json.dumps(self._record(row, refs), default=str) + "\n" for row in batch
+                )
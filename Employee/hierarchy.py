@@ -0,0 +1,239 @@
+# Employee/hierarchy.py
+"""
+Materialized reporting hierarchy
+
+Each employee stores `ancestors`: every manager above it, i.e. its
+reportingManagers, their reportingManagers, and so on. Employees can have
+several managers, so this is the union over all of them. With the
+multikey indexes on `reportingManagers` and `ancestors`:
+
+    direct team:   {"reportingManagers": manager_id}
+    whole org:     {"ancestors": manager_id}
+
+are single indexed lookups, and a subtree (org chart) is one query.
+
+Kept current by the employee views:
+- create_emp / bulk import:  ancestors_for(managers) for the new employee
+- update_emp:                update_hierarchy(employee) when its managers
+                             change - recomputes it and its subtree
+- delete_emp:                rebuild_descendants(emp_id)
+`python manage.py rebuild_hierarchy` recomputes everything (backfill).
+"""
+from collections import deque
+
+from pymongo import UpdateOne
+
+
+class HierarchyCycleError(ValueError):
+    """A reporting manager is the employee itself or one of its reports"""
+
+
+def _collection():
+    from Employee.models import Employee
+    return Employee._get_collection()
+
+
+def _ref_id(value):
+    """ObjectId of a stored reference (plain ObjectId, DBRef or document)"""
+    return getattr(value, "id", value)
+
+
+def _ordered_union(lists):
+    seen = set()
+    result = []
+    for values in lists:
+        for value in values:
+            if value not in seen:
+                seen.add(value)
+                result.append(value)
+    return result
+
+
+def ancestors_for(manager_ids, known=None):
+    """
+    Ancestors of an employee reporting to `manager_ids` (one query)
+    known: {id: ancestors} for managers not saved yet (bulk import)
+    """
+    manager_ids = [_ref_id(manager_id) for manager_id in manager_ids or ()]
+    if not manager_ids:
+        return []
+    known = known or {}
+    stored = {}
+    missing = [manager_id for manager_id in manager_ids if manager_id not in known]
+    if missing:
+        stored = {
+            row["_id"]: row.get("ancestors") or []
+            for row in _collection().find({"_id": {"$in": missing}}, {"ancestors": 1})
+        }
+    return _ordered_union(
+        [manager_id] + list(known.get(manager_id, stored.get(manager_id, [])))
+        for manager_id in manager_ids
+    )
+
+
+def descendant_ids(emp_id):
+    """Everyone below an employee (one indexed lookup)"""
+    return [row["_id"] for row in _collection().find({"ancestors": _ref_id(emp_id)}, {"_id": 1})]
+
+
+def team_ids(emp_id, scope="direct"):
+    """
+    Ids of an employee's team
+    scope="direct": employees reporting to it, scope="org": everyone below it
+    """
+    field = "ancestors" if scope == "org" else "reportingManagers"
+    return [row["_id"] for row in _collection().find({field: _ref_id(emp_id)}, {"_id": 1})]
+
+
+def check_managers(emp_id, manager_ids):
+    """Raise HierarchyCycleError if the new managers would create a cycle"""
+    emp_id = _ref_id(emp_id)
+    manager_ids = {_ref_id(manager_id) for manager_id in manager_ids or ()}
+    if not manager_ids:
+        return
+    if emp_id in manager_ids:
+        raise HierarchyCycleError("An employee cannot report to themselves")
+    if _collection().count_documents({"_id": {"$in": list(manager_ids)}, "ancestors": emp_id}, limit=1):
+        raise HierarchyCycleError("A reporting manager cannot be one of the employee's own reports")
+
+
+def _recompute(rows, outside):
+    """
+    {id: ancestors} for `rows` (id -> manager ids), a subtree in any order
+    outside: {id: ancestors} for managers outside the subtree
+    Iterative topological order (managers before their reports).
+    """
+    pending = {emp_id: {m for m in managers if m in rows} for emp_id, managers in rows.items()}
+    reports = {}
+    for emp_id, managers in pending.items():
+        for manager_id in managers:
+            reports.setdefault(manager_id, []).append(emp_id)
+
+    result = {}
+    queue = deque(emp_id for emp_id, managers in pending.items() if not managers)
+    while queue:
+        emp_id = queue.popleft()
+        result[emp_id] = _ordered_union(
+            [manager_id] + (result.get(manager_id) or outside.get(manager_id) or [])
+            for manager_id in rows[emp_id]
+        )
+        for report_id in reports.get(emp_id, ()):
+            pending[report_id].discard(emp_id)
+            if not pending[report_id]:
+                queue.append(report_id)
+
+    # Left-overs are part of a cycle in the stored data - keep direct managers only
+    for emp_id in rows.keys() - result.keys():
+        result[emp_id] = list(rows[emp_id])
+    return result
+
+
+def _rebuild(rows, current):
+    """Recompute `rows` and write the changed ancestors; returns #updated"""
+    outside_ids = {m for managers in rows.values() for m in managers} - rows.keys()
+    outside = {
+        row["_id"]: row.get("ancestors") or []
+        for row in _collection().find({"_id": {"$in": list(outside_ids)}}, {"ancestors": 1})
+    } if outside_ids else {}
+
+    # Managers that no longer exist are dropped, not followed
+    rows = {
+        emp_id: [m for m in managers if m in rows or m in outside]
+        for emp_id, managers in rows.items()
+    }
+    computed = _recompute(rows, outside)
+    updates = [
+        UpdateOne({"_id": emp_id}, {"$set": {"ancestors": ancestors}})
+        for emp_id, ancestors in computed.items()
+        if ancestors != current.get(emp_id)
+    ]
+    if updates:
+        _collection().bulk_write(updates, ordered=False)
+    return len(updates)
+
+
+def _subtree(emp_id, include_root=True):
+    query = {"ancestors": emp_id}
+    if include_root:
+        query = {"$or": [{"_id": emp_id}, query]}
+    rows, current = {}, {}
+    for row in _collection().find(query, {"reportingManagers": 1, "ancestors": 1}):
+        rows[row["_id"]] = [_ref_id(m) for m in row.get("reportingManagers") or []]
+        current[row["_id"]] = row.get("ancestors") or []
+    return rows, current
+
+
+def update_hierarchy(emp_id):
+    """Recompute the ancestors of an employee and everyone below it"""
+    emp_id = _ref_id(emp_id)
+    rows, current = _subtree(emp_id)
+    updated = _rebuild(rows, current)
+    if updated:
+        print(f"🌳 Hierarchy updated for {emp_id}: {updated} employees")
+    return updated
+
+
+def rebuild_descendants(emp_id):
+    """Recompute everyone below an employee (after it was deleted)"""
+    rows, current = _subtree(_ref_id(emp_id), include_root=False)
+    return _rebuild(rows, current) if rows else 0
+
+
+def rebuild_all():
+    """Recompute every employee's ancestors from reportingManagers"""
+    rows, current = {}, {}
+    for row in _collection().find({}, {"reportingManagers": 1, "ancestors": 1}):
+        rows[row["_id"]] = [_ref_id(m) for m in row.get("reportingManagers") or []]
+        current[row["_id"]] = row.get("ancestors") or []
+    return _rebuild(rows, current), len(rows)
+
+
+def org_chart(root_id=None, filters=None):
+    """
+    Nested org chart, built from one query without recursion
+    root_id: subtree of this employee (default: whole organization, every
+    employee without a manager is a root). An employee with several
+    managers is shown under the first one inside the chart.
+    """
+    query = dict(filters or {})
+    if root_id is not None:
+        root_id = _ref_id(root_id)
+        query["$or"] = [{"_id": root_id}, {"ancestors": root_id}]
+
+    nodes = {}
+    managers = {}
+    projection = {"firstName": 1, "lastName": 1, "email": 1, "role": 1, "designationId": 1, "reportingManagers": 1}
+    for row in _collection().find(query, projection).sort("firstName", 1):
+        nodes[row["_id"]] = {
+            "id": str(row["_id"]),
+            "name": f"{row.get('firstName', '')} {row.get('lastName', '')}".strip(),
+            "email": row.get("email"),
+            "role": row.get("role"),
+            "designation": row.get("designationId"),
+            "reports": [],
+        }
+        managers[row["_id"]] = [_ref_id(m) for m in row.get("reportingManagers") or []]
+
+    roots = []
+    for emp_id, node in nodes.items():
+        parent = None
+        if emp_id != root_id:
+            parent = next((m for m in managers[emp_id] if m in nodes and m != emp_id), None)
+        if parent is None:
+            roots.append(node)
+        else:
+            nodes[parent]["reports"].append(node)
+
+    # Team sizes bottom-up: children always come after parents in BFS order
+    order = []
+    queue = deque(roots)
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        queue.extend(node["reports"])
+    for node in reversed(order):
+        node["team_size"] = sum(1 + child["team_size"] for child in node["reports"])
+
+    if root_id is not None:
+        return nodes.get(root_id)
+    return roots
@@ -0,0 +1,326 @@
+# Employee/location_enrichment.py
+"""
+Deferred location enrichment for check-in / check-out
+
+A punch stores its raw coordinates (check_in_latitude/longitude, ...) and
+is answered right away. Its location is resolved inline only when that
+needs no network: the offline gazetteer or a cell already in the
+in-process geocode cache (HRMS.geocoding). Otherwise the location is
+saved as "lat, lng" and a job is queued in `location_enrichment_jobs`.
+
+Workers (LOCATION_ENRICHMENT_BACKEND):
+- thread:  one background thread per process, woken on enqueue (default)
+- celery:  Employee.tasks.enrich_locations_task
+The scheduler also sweeps due jobs every LOCATION_ENRICHMENT_SWEEP_MINUTES
+(retries, jobs left over by a restart).
+
+A worker claims up to LOCATION_ENRICHMENT_BATCH_SIZE due jobs (a lease
+keeps other workers off them), groups them by geohash cell so each cell
+is looked up once, and writes the area onto the attendance rows whose
+coordinates still match. Its geocoder calls are rate-limited
+(HRMS.geocoding, rate_limited=True); punches resolving a location inline
+are not. Failed lookups are retried with exponential backoff;
+after LOCATION_ENRICHMENT_MAX_ATTEMPTS the job is kept as "failed" and
+the location stays "lat, lng".
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+
+from HRMS.geocoding import geocode_cache, resolve_cached
+from utils.timezone_utils import get_current_datetime_ist
+
+
+KINDS = ("check_in", "check_out")
+LEASE_SECONDS = 120
+KNOWN_AREAS = [
+    'Wakad', 'Baner', 'Katraj', 'Tathawade', 'Thergaon', 'Hinjewadi',
+    'Kothrud', 'Aundh', 'Viman Nagar', 'Koregaon Park', 'Hadapsar',
+    'Magarpatta', 'Wagholi', 'Ravet', 'Akurdi', 'Nigdi', 'Chinchwad',
+    'Pimple Saudagar', 'Bavdhan', 'Pashan', 'Sus', 'Mahalunge'
+]
+
+
+def area_from_display_name(full_address):
+    """Extract area name from a full address"""
+    parts = full_address.split(', ')
+
+    for part in parts:
+        for area in KNOWN_AREAS:
+            if area.lower() in part.lower():
+                return area
+
+    if len(parts) >= 4:
+        return parts[3].strip()
+    elif len(parts) >= 3:
+        return parts[2].strip()
+
+    return parts[0].strip() if parts else full_address
+
+
+def placeholder_location(lat, lng):
+    return f"{lat}, {lng}"
+
+
+def describe_location(data, lat, lng):
+    """Area name ("Wakad, Pune") from a reverse-geocode response, else "lat, lng" """
+    if not data:
+        return placeholder_location(lat, lng)
+
+    address_data = data.get('address', {})
+    area = (
+        address_data.get('suburb') or
+        address_data.get('neighbourhood') or
+        address_data.get('city_district') or
+        address_data.get('village') or
+        address_data.get('town') or
+        address_data.get('city') or
+        None
+    )
+    if area:
+        city = address_data.get('city', 'Pune')
+        return f"{area}, {city}"
+
+    return area_from_display_name(data.get('display_name', ''))
+
+
+def locate(lat, lng):
+    """
+    (location, deferred) for a punch
+    Resolved inline when no network call is needed, else a "lat, lng"
+    placeholder with deferred=True (queue it with enqueue_location)
+    """
+    data = resolve_cached(lat, lng)
+    if data is not None:
+        return describe_location(data, lat, lng), False
+    return placeholder_location(lat, lng), True
+
+
+def _collection():
+    from Employee.models import LocationEnrichmentJob
+    return LocationEnrichmentJob._get_collection()
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def enqueue_location(attendance_id, kind, lat, lng):
+    """Queue a punch location for enrichment (one job per attendance and kind)"""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown punch kind '{kind}'")
+    try:
+        _collection().update_one(
+            {"attendance": attendance_id, "kind": kind},
+            {
+                "$set": {
+                    "latitude": lat,
+                    "longitude": lng,
+                    "cell": geocode_cache.cell(lat, lng),
+                    "status": "pending",
+                    "attempts": 0,
+                    "next_attempt_at": _utcnow(),
+                    "last_error": None,
+                    "created_at": get_current_datetime_ist(),
+                },
+                "$unset": {"lease_until": ""},
+            },
+            upsert=True
+        )
+    except Exception as e:
+        print(f"❌ Could not queue location enrichment for {attendance_id}: {e}")
+        return False
+    schedule_enrichment()
+    return True
+
+
+def _claim(limit):
+    """Lease up to `limit` due jobs to this worker"""
+    now = _utcnow()
+    lease_until = now + timedelta(seconds=LEASE_SECONDS)
+    due = {
+        "$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "running", "lease_until": {"$lt": now}},
+        ]
+    }
+    jobs = []
+    for _ in range(limit):
+        job = _collection().find_one_and_update(
+            due,
+            {"$set": {"status": "running", "lease_until": lease_until}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            break
+        jobs.append(job)
+    return jobs
+
+
+def _retry_delay(attempts):
+    base = getattr(settings, "LOCATION_ENRICHMENT_RETRY_SECONDS", 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 6 * 3600))
+
+
+def process_batch(limit=None):
+    """Resolve one batch of due jobs; returns the number of jobs claimed"""
+    from Employee.models import Attendance
+
+    limit = limit or getattr(settings, "LOCATION_ENRICHMENT_BATCH_SIZE", 50)
+    max_attempts = getattr(settings, "LOCATION_ENRICHMENT_MAX_ATTEMPTS", 5)
+    jobs = _claim(limit)
+    if not jobs:
+        return 0
+
+    by_cell = {}
+    for job in jobs:
+        by_cell.setdefault(job["cell"], []).append(job)
+
+    attendance_updates, job_updates = [], []
+    now = _utcnow()
+    for cell, cell_jobs in by_cell.items():
+        first = cell_jobs[0]
+        try:
+            data = geocode_cache.reverse(first["latitude"], first["longitude"], rate_limited=True)
+            error = None if data else "geocoder returned no result"
+        except Exception as e:
+            data, error = None, str(e)
+
+        for job in cell_jobs:
+            if data:
+                kind = job["kind"]
+                attendance_updates.append(UpdateOne(
+                    # Skip rows whose punch changed since the job was queued
+                    {
+                        "_id": job["attendance"],
+                        f"{kind}_latitude": job["latitude"],
+                        f"{kind}_longitude": job["longitude"],
+                    },
+                    {"$set": {f"{kind}_location": describe_location(data, job["latitude"], job["longitude"])}}
+                ))
+                job_updates.append(DeleteOne({"_id": job["_id"], "lease_until": job["lease_until"]}))
+                continue
+
+            attempts = job.get("attempts", 0) + 1
+            failed = attempts >= max_attempts
+            job_updates.append(UpdateOne(
+                {"_id": job["_id"], "lease_until": job["lease_until"]},
+                {
+                    "$set": {
+                        "status": "failed" if failed else "pending",
+                        "attempts": attempts,
+                        "next_attempt_at": now + _retry_delay(attempts),
+                        "last_error": error,
+                    },
+                    "$unset": {"lease_until": ""},
+                }
+            ))
+
+    if attendance_updates:
+        Attendance._get_collection().bulk_write(attendance_updates, ordered=False)
+    if job_updates:
+        _collection().bulk_write(job_updates, ordered=False)
+
+    print(f"📍 Location enrichment: {len(jobs)} jobs, {len(by_cell)} cells, "
+          f"{len(attendance_updates)} resolved")
+    return len(jobs)
+
+
+def process_due(max_batches=None):
+    """Work through due jobs batch by batch; returns the number processed"""
+    processed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        claimed = process_batch()
+        if not claimed:
+            break
+        processed += claimed
+        batches += 1
+    return processed
+
+
+def retry_failed():
+    """Put failed jobs back in the queue"""
+    result = _collection().update_many(
+        {"status": "failed"},
+        {"$set": {"status": "pending", "attempts": 0, "next_attempt_at": _utcnow()}}
+    )
+    if result.modified_count:
+        schedule_enrichment()
+    return result.modified_count
+
+
+def backlog():
+    """Queue summary for the admin endpoint"""
+    collection = _collection()
+    now = _utcnow()
+    counts = {row["_id"]: row["count"] for row in collection.aggregate([
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ])}
+    oldest = collection.find_one({"status": {"$in": ["pending", "running"]}}, sort=[("created_at", 1)])
+    failures = collection.find({"status": "failed"}).sort("next_attempt_at", -1).limit(20)
+    return {
+        "pending": counts.get("pending", 0),
+        "running": counts.get("running", 0),
+        "failed": counts.get("failed", 0),
+        "due": collection.count_documents({"status": "pending", "next_attempt_at": {"$lte": now}}),
+        "cells": len(collection.distinct("cell", {"status": {"$in": ["pending", "running"]}})),
+        "oldest_pending_at": oldest.get("created_at") if oldest else None,
+        "recent_failures": [
+            {
+                "attendance": str(job["attendance"]),
+                "kind": job["kind"],
+                "latitude": job["latitude"],
+                "longitude": job["longitude"],
+                "attempts": job.get("attempts", 0),
+                "last_error": job.get("last_error"),
+                "created_at": job.get("created_at"),
+            }
+            for job in failures
+        ],
+        "geocoder": dict(geocode_cache.stats),
+    }
+
+
+class _Worker:
+    """Background thread draining the queue, woken by enqueue_location"""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def wake(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="location-enrichment", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        poll_seconds = getattr(settings, "LOCATION_ENRICHMENT_POLL_SECONDS", 30)
+        while True:
+            self._wake.wait(poll_seconds)
+            self._wake.clear()
+            try:
+                process_due()
+            except Exception as e:
+                print(f"❌ Location enrichment failed: {e}")
+
+
+_worker = _Worker()
+
+
+def schedule_enrichment():
+    """Have a worker drain the queue soon"""
+    if getattr(settings, "LOCATION_ENRICHMENT_BACKEND", "thread") == "celery":
+        try:
+            from Employee.tasks import enrich_locations_task
+            enrich_locations_task.delay()
+            return
+        except Exception as e:
+            print(f"⚠️  Could not queue location enrichment task, using local worker: {e}")
+    _worker.wake()
@@ -0,0 +1,88 @@
+# Employee/management/commands/backfill_attendance_keys.py
+from django.core.management.base import BaseCommand
+from mongoengine.connection import get_db
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from Employee.models import Attendance
+from utils.timezone_utils import date_keys
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill in the integer date keys (day = yyyymmdd, month = yyyymm) on "
+        "attendance rows written before they existed; resumable: rows that "
+        "already have them are skipped, so an interrupted run can be rerun"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows read and updated per bulk operation (default: 1000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would change'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("🔑 ATTENDANCE DATE KEY BACKFILL STARTED"))
+        self.stdout.write("="*70 + "\n")
+
+        # Raw collection: Attendance._get_collection() would build the
+        # model's indexes first (and fail while the legacy ones remain)
+        collection = get_db()[Attendance._meta['collection']]
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        missing = {'$or': [{'day': {'$exists': False}}, {'month': {'$exists': False}}]}
+        self.stdout.write(f"📋 Rows without date keys: {collection.count_documents(missing)}")
+
+        updated = 0
+        invalid = 0
+        last_id = None
+
+        while True:
+            # Walk _id order from the last row seen: invalid dates left
+            # without keys are not read twice
+            query = dict(missing, _id={'$gt': last_id}) if last_id else missing
+            rows = list(collection.find(query, {'date': 1}).sort('_id', 1).limit(batch_size))
+            if not rows:
+                break
+            last_id = rows[-1]['_id']
+
+            operations = []
+            for row in rows:
+                day, month = date_keys(row.get('date'))
+                if day is None:
+                    invalid += 1
+                    self.stdout.write(self.style.WARNING(f"⚠️  {row['_id']}: invalid date {row.get('date')!r}"))
+                    continue
+                operations.append(UpdateOne({'_id': row['_id']}, {'$set': {'day': day, 'month': month}}))
+
+            if operations and not dry_run:
+                collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            self.stdout.write(f"   ... {updated} rows (last _id {last_id})")
+
+        if not dry_run:
+            # Indexes on the keys, built once they are filled in
+            try:
+                Attendance.ensure_indexes()
+            except OperationFailure as e:
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️  Could not create the attendance indexes ({e}); "
+                    "run `manage.py dedupe_attendance` first"
+                ))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Filled in {updated} rows, {invalid} with an invalid date"
+            + (" (dry run)" if dry_run else "")
+        ))
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("✅ BACKFILL COMPLETED"))
+        self.stdout.write("="*70 + "\n")
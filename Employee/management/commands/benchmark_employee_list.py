@@ -0,0 +1,115 @@
+# Employee/management/commands/benchmark_employee_list.py
+import time
+
+import mongoengine
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import monitoring, uri_parser
+
+from Employee.models import Employee
+from Employee.serializer import EmployeeSerializer
+from HRMS.identity_map import _current_map, IdentityMap
+
+
+class QueryCounter(monitoring.CommandListener):
+    """Counts read commands sent to MongoDB"""
+
+    COMMANDS = {"find", "getMore", "aggregate", "count"}
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        if event.command_name in self.COMMANDS:
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark EmployeeSerializer list rendering: MongoDB queries and time "
+        "per page, with the batched reference prefetch and row by row"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mongo-uri',
+            type=str,
+            default='mongodb://localhost:27017/hrms_loadtest',
+            help='Database to run against, must not be the configured one '
+                 '(default: local mongod, hrms_loadtest as seeded by loadtest_checkins)'
+        )
+        parser.add_argument(
+            '--page-sizes',
+            type=str,
+            default='10,25,50,100',
+            help='Comma separated page sizes (default: 10,25,50,100)'
+        )
+        parser.add_argument(
+            '--skip-baseline',
+            action='store_true',
+            help='Do not run the row-by-row (no prefetch) serialization'
+        )
+
+    def handle(self, *args, **options):
+        database = uri_parser.parse_uri(options['mongo_uri']).get('database')
+        if not database:
+            raise CommandError("--mongo-uri must name a database")
+        if database == settings.MONGO_DB:
+            raise CommandError(f"Refusing to benchmark the configured database '{database}'")
+
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("⏱️  EMPLOYEE LIST BENCHMARK"))
+        self.stdout.write("="*70 + "\n")
+
+        # Listeners only apply to clients created after registration,
+        # so reconnect the default alias with the counter attached
+        counter = QueryCounter()
+        monitoring.register(counter)
+        mongoengine.disconnect(alias="default")
+        mongoengine.connect(host=options['mongo_uri'], alias="default", tz_aware=True, tzinfo=None)
+
+        page_sizes = [int(size) for size in options['page_sizes'].split(',') if size.strip()]
+        total = Employee.objects.count()
+        self.stdout.write(f"👥 Employees in collection: {total}\n")
+
+        self.stdout.write(f"{'page size':>10} {'rows':>6} {'prefetch q':>11} {'prefetch ms':>12} {'row-by-row q':>13} {'row-by-row ms':>14}")
+        self.stdout.write("-"*70)
+
+        for page_size in page_sizes:
+            rows, prefetch_queries, prefetch_ms = self._measure(counter, page_size, batched=True)
+            if options['skip_baseline']:
+                baseline_queries, baseline_ms = "-", "-"
+            else:
+                _, baseline_queries, baseline_ms = self._measure(counter, page_size, batched=False)
+                baseline_ms = f"{baseline_ms:.1f}"
+
+            self.stdout.write(
+                f"{page_size:>10} {rows:>6} {prefetch_queries:>11} {prefetch_ms:>12.1f} "
+                f"{baseline_queries:>13} {baseline_ms:>14}"
+            )
+
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("✅ BENCHMARK COMPLETED"))
+        self.stdout.write("="*70 + "\n")
+
+    def _measure(self, counter, page_size, batched):
+        """Serialize the first page with a fresh identity map, as list_emp would"""
+        token = _current_map.set(IdentityMap())
+        try:
+            counter.count = 0
+            started = time.perf_counter()
+            page = Employee.objects.all()[:page_size]
+            if batched:
+                data = EmployeeSerializer(page, many=True).data
+            else:
+                data = [EmployeeSerializer(employee).data for employee in page]
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            return len(data), counter.count, elapsed_ms
+        finally:
+            _current_map.reset(token)
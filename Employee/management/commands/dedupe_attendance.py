@@ -0,0 +1,101 @@
+# Employee/management/commands/dedupe_attendance.py
+from django.core.management.base import BaseCommand
+from mongoengine.connection import get_db
+from pymongo import DeleteOne
+
+from Employee.models import Attendance
+
+
+# Fields that make a row worth keeping, most significant first
+PUNCH_FIELDS = ("check_out_time", "check_in_time", "check_in_location", "remarks")
+
+
+class Command(BaseCommand):
+    help = (
+        "One-off migration to the unique (employee, date) attendance index: "
+        "removes duplicate rows (keeping the one with the most punch data) "
+        "and replaces the old non-unique index"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rows deleted per bulk operation (default: 500)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would change'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("🔄 ATTENDANCE DEDUPLICATION STARTED"))
+        self.stdout.write("="*70 + "\n")
+
+        # Raw collection: Attendance._get_collection() would try to build
+        # the unique index before the duplicates are gone
+        collection = get_db()[Attendance._meta['collection']]
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        groups = collection.aggregate([
+            {'$group': {
+                '_id': {'employee': '$employee', 'date': '$date'},
+                'ids': {'$push': '$_id'},
+                'count': {'$sum': 1},
+            }},
+            {'$match': {'count': {'$gt': 1}}},
+        ], allowDiskUse=True)
+
+        duplicated = 0
+        removed = 0
+        operations = []
+
+        for group in groups:
+            rows = list(collection.find({'_id': {'$in': group['ids']}}))
+            rows.sort(key=self._rank, reverse=True)
+            keep, extra = rows[0], rows[1:]
+            duplicated += 1
+            self.stdout.write(
+                f"📅 {group['_id']['employee']} {group['_id']['date']}: "
+                f"keeping {keep['_id']}, removing {len(extra)}"
+            )
+
+            for row in extra:
+                operations.append(DeleteOne({'_id': row['_id']}))
+                removed += 1
+
+            if len(operations) >= batch_size:
+                if not dry_run:
+                    collection.bulk_write(operations, ordered=False)
+                operations = []
+
+        if operations and not dry_run:
+            collection.bulk_write(operations, ordered=False)
+
+        # Same keys as the new unique index, so it has to go first
+        if 'employee_1_date_1' in collection.index_information():
+            self.stdout.write("🗑️  Dropping legacy index: employee_1_date_1")
+            if not dry_run:
+                collection.drop_index('employee_1_date_1')
+
+        if not dry_run:
+            Attendance.ensure_indexes()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {duplicated} duplicated employee/days, removed {removed} rows"
+            + (" (dry run)" if dry_run else "")
+        ))
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("✅ MIGRATION COMPLETED"))
+        self.stdout.write("="*70 + "\n")
+
+    def _rank(self, row):
+        """Rows with punches beat empty ones; ties go to the latest update"""
+        return (
+            tuple(bool(row.get(field)) for field in PUNCH_FIELDS),
+            row.get('updated_at') or '',
+        )
@@ -0,0 +1,103 @@
+# Employee/management/commands/explain_queries.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from HRMS.query_plans import (
+    QUERY_SHAPES, DEFAULT_RATIO_THRESHOLD, apply_proposal, explain_shape, sample_values
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run explain() on the query shapes used by the views and scheduler "
+        "jobs (HRMS.query_plans) and report COLLSCANs, examined/returned "
+        "ratios and missing compound indexes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shape',
+            action='append',
+            default=[],
+            help='Only shapes whose name starts with this (repeatable, e.g. attendance.)'
+        )
+        parser.add_argument(
+            '--ratio-threshold',
+            type=float,
+            default=DEFAULT_RATIO_THRESHOLD,
+            help=f'Flag shapes examining this many docs per doc returned (default: {DEFAULT_RATIO_THRESHOLD})'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the full report as JSON'
+        )
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Create the proposed indexes'
+        )
+
+    def handle(self, *args, **options):
+        shapes = [
+            shape for shape in QUERY_SHAPES
+            if not options['shape'] or any(shape.name.startswith(prefix) for prefix in options['shape'])
+        ]
+        if not shapes:
+            raise CommandError(f"No query shape matches {options['shape']}")
+
+        samples = sample_values()
+        reports = [explain_shape(shape, samples, options['ratio_threshold']) for shape in shapes]
+
+        # Several shapes can ask for the same index
+        proposals = {}
+        for report in reports:
+            proposal = report['proposal']
+            if proposal:
+                key = (proposal['collection'], tuple(proposal['keys']))
+                proposals.setdefault(key, {**proposal, 'shapes': []})['shapes'].append(report['name'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(
+                {'reports': reports, 'proposals': list(proposals.values())}, indent=2, default=str
+            ))
+        else:
+            self._print_report(reports, proposals)
+
+        if options['apply']:
+            for proposal in proposals.values():
+                name = apply_proposal(proposal)
+                self.stdout.write(self.style.SUCCESS(f"🛠️  Created index {proposal['collection']}.{name}"))
+
+    def _print_report(self, reports, proposals):
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("🔍 QUERY PLAN ADVISOR"))
+        self.stdout.write("="*70 + "\n")
+
+        for report in reports:
+            plan = " > ".join(report['stages']) or "-"
+            line = (
+                f"{report['name']:<28} {plan:<28} "
+                f"returned {report['returned']:>6} | docs {report['docs_examined']:>7} | "
+                f"keys {report['keys_examined']:>7} | {report['millis']} ms"
+            )
+            if report['problems']:
+                self.stdout.write(self.style.WARNING(f"⚠️  {line}"))
+                self.stdout.write(f"     {', '.join(report['problems'])} — {report['source']}")
+            else:
+                self.stdout.write(f"✅ {line}")
+
+        if proposals:
+            self.stdout.write("\n📐 Proposed indexes:")
+            for proposal in proposals.values():
+                self.stdout.write(f"\n  {proposal['collection']} ({', '.join(proposal['shapes'])})")
+                self.stdout.write(f"    meta['indexes']: {proposal['meta']}")
+                self.stdout.write(f"    mongosh:         {proposal['shell']}")
+
+        flagged = sum(1 for report in reports if report['problems'])
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Shapes: {len(reports)} | Flagged: {flagged} | Proposed indexes: {len(proposals)}"
+        ))
+        self.stdout.write("="*70 + "\n")
@@ -0,0 +1,48 @@
+# Employee/management/commands/generate_photo_thumbnails.py
+from django.core.management.base import BaseCommand
+
+from Employee.models import Employee
+from Employee.photo_thumbnails import expected_thumbnails, generate_photo_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate missing photo thumbnails for existing employees "
+        "(uploads after Employee.photo_thumbnails get them automatically)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate even when the employee already lists thumbnails'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("🖼️  PHOTO THUMBNAILS STARTED"))
+        self.stdout.write("="*70 + "\n")
+
+        generated = skipped = failed = 0
+        employees = Employee.objects(documents__photo__nin=[None, ""]).only("id", "documents")
+
+        for employee in employees:
+            photo = employee.documents.photo
+            current = dict(employee.documents.photoThumbnails or {})
+            if not options['force'] and current == expected_thumbnails(photo):
+                skipped += 1
+                continue
+            try:
+                if generate_photo_thumbnails(str(employee.id), photo) is None:
+                    failed += 1
+                else:
+                    generated += 1
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"❌ {employee.id} ({photo}): {e}"))
+
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Generated: {generated} | Up to date: {skipped} | Failed: {failed}"
+        ))
+        self.stdout.write("="*70 + "\n")
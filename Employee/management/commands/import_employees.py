@@ -0,0 +1,71 @@
+# Employee/management/commands/import_employees.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Employee.bulk_import import (
+    EmployeeImporter, ImportFormatError, DEFAULT_BATCH_SIZE, detect_format, read_rows
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import employees from a CSV, XLSX or NDJSON file "
+        "(same columns as the api/employee/import/ endpoint)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'xlsx', 'ndjson'],
+            help='File format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Rows validated and inserted per batch (default: {DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate only, insert nothing'
+        )
+        parser.add_argument(
+            '--report',
+            help='Write the full JSON report (with per-row errors) to this file'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("📥 EMPLOYEE BULK IMPORT STARTED"))
+        self.stdout.write("="*70 + "\n")
+
+        try:
+            fmt = detect_format(options['path'], options['format'])
+            importer = EmployeeImporter(batch_size=options['batch_size'], dry_run=options['dry_run'])
+            with open(options['path'], 'rb') as stream:
+                report = importer.run(read_rows(stream, fmt))
+        except (ImportFormatError, OSError) as e:
+            raise CommandError(str(e))
+
+        for error in report['errors'][:20]:
+            self.stdout.write(self.style.ERROR(
+                f"❌ Row {error['row']} ({error['email'] or '-'}): {error['errors']}"
+            ))
+        if report['failed'] > 20:
+            self.stdout.write(f"   ... {report['failed'] - 20} more failed rows")
+
+        if options['report']:
+            with open(options['report'], 'w') as report_file:
+                json.dump(report, report_file, indent=2, default=str)
+            self.stdout.write(f"📝 Report written to {options['report']}")
+
+        self.stdout.write("\n" + "="*70)
+        if options['dry_run']:
+            summary = f"✅ Valid: {report['valid']} | Failed: {report['failed']} | Total: {report['total']}"
+        else:
+            summary = f"✅ Imported: {report['imported']} | Failed: {report['failed']} | Total: {report['total']}"
+        self.stdout.write(self.style.SUCCESS(f"{summary} | {report['took_ms']:.0f} ms"))
+        self.stdout.write("="*70 + "\n")
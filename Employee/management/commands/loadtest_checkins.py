@@ -0,0 +1,453 @@
+# Employee/management/commands/loadtest_checkins.py
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import mongoengine
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from pymongo import monitoring, uri_parser
+
+import Employee.views as attendance_views
+from Departments.models import Departments
+from Employee.models import Address, Attendance, Employee
+from HRMS.geocoding import geocode_cache
+from Orgnization.models import Organization
+from Shifts.models import Shift
+from utils.timezone_utils import get_current_date_ist
+
+
+SEED_DOMAIN = "loadtest.local"
+SEED_SHIFTS = [
+    # (shiftType, fromTime, endTime, share of employees)
+    ("Day", "09:00:00", "18:00:00", 0.7),
+    ("Day", "09:15:00", "18:15:00", 0.2),
+    ("Day", "08:45:00", "17:45:00", 0.1),
+]
+# (latitude, longitude, share of punches); the last one is outside the
+# offline gazetteer, so those punches take the deferred geocoding path
+PUNCH_SITES = [
+    (18.5912, 73.7389, 0.5),   # Hinjawadi Phase 1
+    (18.5590, 73.7868, 0.25),  # Baner
+    (18.5157, 73.9263, 0.2),   # Magarpatta
+    (18.7546, 73.4062, 0.05),  # Lonavala
+]
+STUB_LOCATION = {
+    "address": {"suburb": "Load Test", "city": "Pune"},
+    "display_name": "Load Test, Pune",
+}
+
+
+class OpCounter(monitoring.CommandListener):
+    """
+    Counts commands sent to MongoDB by the request threads
+    (connection handshakes and the location enrichment worker excluded)
+    """
+
+    IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart", "saslContinue"}
+    IGNORED_THREADS = {"location-enrichment"}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def started(self, event):
+        if event.command_name in self.IGNORED_COMMANDS:
+            return
+        if threading.current_thread().name in self.IGNORED_THREADS:
+            return
+        with self._lock:
+            self.counts[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        with self._lock:
+            counts = dict(self.counts)
+            self.counts.clear()
+        return counts
+
+
+def parse_clock(value):
+    """ "HH:MM" or "HH:MM:SS" -> seconds since midnight"""
+    parts = [int(part) for part in value.split(":")]
+    while len(parts) < 3:
+        parts.append(0)
+    return parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+
+def format_clock(seconds):
+    seconds = int(seconds) % 86400
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test check-in/check-out: seed employees in a dedicated database, "
+        "replay the morning arrival burst and the evening check-outs against "
+        "the views (geocoder stubbed) and report latency percentiles, "
+        "throughput, error rate and MongoDB commands per request"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mongo-uri',
+            type=str,
+            default='mongodb://localhost:27017/hrms_loadtest',
+            help='Database to run against, must not be the configured one (default: local mongod, hrms_loadtest)'
+        )
+        parser.add_argument(
+            '--employees',
+            type=int,
+            default=1000,
+            help='Number of employees to seed and punch (default: 1000)'
+        )
+        parser.add_argument(
+            '--window',
+            type=str,
+            default='08:55-09:10',
+            help='Simulated check-in window (default: 08:55-09:10)'
+        )
+        parser.add_argument(
+            '--peak',
+            type=str,
+            default='09:00',
+            help='Busiest moment of the check-in window (default: 09:00)'
+        )
+        parser.add_argument(
+            '--spread',
+            type=float,
+            default=180,
+            help='Standard deviation of arrivals around the peak, in simulated seconds (default: 180)'
+        )
+        parser.add_argument(
+            '--checkout-window',
+            type=str,
+            default='18:00-18:20',
+            help='Simulated check-out window, arrivals spread evenly (default: 18:00-18:20)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=60,
+            help='Real seconds each window is replayed in (default: 60)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Requests handled in parallel, like server worker threads (default: 16)'
+        )
+        parser.add_argument(
+            '--double-tap',
+            type=float,
+            default=0.05,
+            help='Share of employees that punch twice in a row (default: 0.05)'
+        )
+        parser.add_argument(
+            '--geocoder-latency-ms',
+            type=float,
+            default=300,
+            help='Latency of the stubbed geocoder (default: 300)'
+        )
+        parser.add_argument(
+            '--skip-checkout',
+            action='store_true',
+            help='Only replay the check-in window'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed for the arrival curve and punch sites (default: 42)'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the report as JSON (for comparing runs)'
+        )
+
+    def handle(self, *args, **options):
+        database = uri_parser.parse_uri(options['mongo_uri']).get('database')
+        if not database:
+            raise CommandError("--mongo-uri must name a database")
+        if database == settings.MONGO_DB:
+            raise CommandError(f"Refusing to load test the configured database '{database}'")
+
+        if not options['json']:
+            self.stdout.write("\n" + "="*70)
+            self.stdout.write(self.style.SUCCESS("🏋️  CHECK-IN LOAD TEST"))
+            self.stdout.write("="*70 + "\n")
+
+        # Listeners only apply to clients created after registration,
+        # so reconnect the default alias with the counter attached
+        counter = OpCounter()
+        monitoring.register(counter)
+        mongoengine.disconnect(alias="default")
+        mongoengine.connect(host=options['mongo_uri'], alias="default", tz_aware=True, tzinfo=None)
+        Attendance.ensure_indexes()
+
+        rng = random.Random(options['seed'])
+        employee_ids = self._seed(options['employees'], rng)
+        today = get_current_date_ist()
+        Attendance._get_collection().delete_many({"employee": {"$in": employee_ids}, "date": today})
+        self._log(options, f"👥 {len(employee_ids)} employees seeded in '{database}', attendance for {today} reset")
+
+        self._stub_geocoder(options['geocoder_latency_ms'] / 1000)
+        tokens = [self._token(employee_id) for employee_id in employee_ids]
+        sites = [site[:2] for site in PUNCH_SITES]
+        weights = [site[2] for site in PUNCH_SITES]
+        punch_sites = rng.choices(sites, weights=weights, k=len(tokens))
+
+        window_start, window_end = (parse_clock(value) for value in options['window'].split("-"))
+        peak = parse_clock(options['peak'])
+        arrivals = []
+        for token, site in zip(tokens, punch_sites):
+            # Resample until the arrival falls inside the window
+            while True:
+                at = rng.gauss(peak, options['spread'])
+                if window_start <= at < window_end:
+                    break
+            arrivals.append((at, token, site))
+
+        reports = [self._run_phase(
+            "check-in", "/api/employee/checkin/", arrivals, window_start, window_end, counter, rng, options
+        )]
+
+        if not options['skip_checkout']:
+            checkout_start, checkout_end = (parse_clock(value) for value in options['checkout_window'].split("-"))
+            departures = [
+                (rng.uniform(checkout_start, checkout_end), token, site)
+                for token, site in zip(tokens, punch_sites)
+            ]
+            reports.append(self._run_phase(
+                "check-out", "/api/employee/checkout/", departures, checkout_start, checkout_end, counter, rng, options
+            ))
+
+        duplicates = next(Attendance._get_collection().aggregate([
+            {"$match": {"employee": {"$in": employee_ids}, "date": today}},
+            {"$group": {"_id": "$employee", "rows": {"$sum": 1}}},
+            {"$match": {"rows": {"$gt": 1}}},
+            {"$count": "employees"},
+        ]), {}).get("employees", 0)
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                "database": database,
+                "employees": len(employee_ids),
+                "phases": reports,
+                "duplicate_rows": duplicates,
+                "geocoder": dict(geocode_cache.stats),
+            }, indent=2))
+            return
+
+        for report in reports:
+            self._print_phase(report)
+
+        self.stdout.write(f"\n🗺️  Geocoder: {dict(geocode_cache.stats)}")
+        if duplicates:
+            self.stdout.write(self.style.ERROR(f"❌ {duplicates} employees have more than one attendance row today"))
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("✅ LOAD TEST COMPLETED"))
+        self.stdout.write("="*70 + "\n")
+
+    def _log(self, options, message):
+        if not options['json']:
+            self.stdout.write(message)
+
+    def _seed(self, count, rng):
+        """Seed employees (idempotent across runs); returns their ids"""
+        organization = Organization.objects(orgEmail=f"org@{SEED_DOMAIN}").first()
+        if organization is None:
+            organization = Organization(
+                orgName="Load Test",
+                orgLocation="Pune",
+                orgContact="9999999999",
+                orgEmail=f"org@{SEED_DOMAIN}",
+                orgLink=f"https://{SEED_DOMAIN}",
+                orgStatus="Active"
+            ).save()
+
+        department = Departments.objects(deptCode="LOADTEST").first()
+        if department is None:
+            department = Departments(
+                deptName="Load Test",
+                deptCode="LOADTEST",
+                deptDesc="Seeded by loadtest_checkins",
+                orgId=organization,
+                orgStatus="Active"
+            ).save()
+
+        shifts, shares = [], []
+        for shift_type, from_time, end_time, share in SEED_SHIFTS:
+            shift = Shift.objects(fromTime=from_time, endTime=end_time).first()
+            if shift is None:
+                shift = Shift(shiftType=shift_type, fromTime=from_time, endTime=end_time)
+                shift.clean()
+                shift.save()
+            shifts.append(shift)
+            shares.append(share)
+
+        collection = Employee._get_collection()
+        existing = {
+            row["email"]: row["_id"]
+            for row in collection.find({"email": {"$regex": f"@{SEED_DOMAIN}$"}}, {"email": 1})
+        }
+
+        address = Address(street="1 Load Test Road", city="Pune", state="Maharashtra", zip="411057", country="India")
+        missing = []
+        for index in range(count):
+            email = f"employee{index:06d}@{SEED_DOMAIN}"
+            if email in existing:
+                continue
+            employee = Employee(
+                firstName="Load",
+                lastName=f"Test {index}",
+                email=email,
+                mobileNumber=f"9{index:09d}",
+                gender="other",
+                dob=datetime(1990, 1, 1).date(),
+                doj=datetime(2024, 1, 1).date(),
+                status="active",
+                role="JR_employee",
+                organizationId=organization,
+                departmentId=department,
+                shiftId=rng.choices(shifts, weights=shares)[0],
+                currentAddress=address,
+                permanentAddress=address
+            )
+            if not missing:
+                employee.validate()
+            missing.append(employee.to_mongo().to_dict())
+
+        for start in range(0, len(missing), 1000):
+            result = collection.insert_many(missing[start:start + 1000], ordered=False)
+            for document, inserted_id in zip(missing[start:start + 1000], result.inserted_ids):
+                existing[document["email"]] = inserted_id
+
+        return [existing[f"employee{index:06d}@{SEED_DOMAIN}"] for index in range(count)]
+
+    def _token(self, employee_id):
+        """Access token shaped like the ones login_emp issues"""
+        now_utc = datetime.now(timezone.utc)
+        return jwt.encode(
+            {
+                "empId": str(employee_id),
+                "role": "JR_employee",
+                "jti": f"loadtest-{employee_id}",
+                "iat": now_utc,
+                "exp": now_utc + timedelta(days=1),
+            },
+            settings.SECRET_KEY,
+            algorithm="HS256"
+        )
+
+    def _stub_geocoder(self, latency):
+        """Nominatim replaced by a fixed answer after `latency` seconds"""
+        def fetch(latitude, longitude):
+            time.sleep(latency)
+            return STUB_LOCATION
+
+        geocode_cache.fetch = fetch
+        geocode_cache.clear()
+
+    def _run_phase(self, name, path, arrivals, window_start, window_end, counter, rng, options):
+        """
+        Replay one window: each arrival is sent at its scaled time whether or
+        not earlier requests have finished (open loop), so latency includes
+        the time spent waiting for a free worker
+        """
+        scale = options['duration'] / (window_end - window_start)
+        schedule = []
+        for at, token, (latitude, longitude) in arrivals:
+            body = {"latitude": latitude + rng.uniform(-0.0005, 0.0005), "longitude": longitude + rng.uniform(-0.0005, 0.0005)}
+            schedule.append(((at - window_start) * scale, at, token, body))
+            if rng.random() < options['double_tap']:
+                schedule.append(((at + 3 - window_start) * scale, at + 3, token, body))
+        schedule.sort(key=lambda item: item[0])
+
+        local = threading.local()
+        simulated = threading.local()
+        lock = threading.Lock()
+        results = []
+
+        def punch(due, at, token, body):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = Client()
+            simulated.clock = format_clock(at)
+            try:
+                response = client.post(path, data=json.dumps(body), content_type="application/json", HTTP_AUTHORIZATION=f"Bearer {token}")
+                status_code = response.status_code
+            except Exception:
+                status_code = None
+            latency = time.perf_counter() - (started + due)
+            with lock:
+                results.append((latency, status_code))
+
+        # The views read the clock through get_current_time_ist; give each
+        # request its simulated arrival time instead
+        real_clock = attendance_views.get_current_time_ist
+        attendance_views.get_current_time_ist = lambda: getattr(simulated, "clock", None) or real_clock()
+        counter.reset()
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                for due, at, token, body in schedule:
+                    wait = started + due - time.perf_counter()
+                    if wait > 0:
+                        time.sleep(wait)
+                    pool.submit(punch, due, at, token, body)
+            elapsed = time.perf_counter() - started
+        finally:
+            attendance_views.get_current_time_ist = real_clock
+        ops = counter.reset()
+
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        statuses = Counter(str(status_code) for _, status_code in results)
+        failed = sum(count for code, count in statuses.items() if not code.startswith("2"))
+        return {
+            "phase": name,
+            "requests": len(results),
+            "seconds": round(elapsed, 2),
+            "throughput": round(len(results) / elapsed, 1) if elapsed else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 0.50), 1),
+                "p95": round(percentile(latencies, 0.95), 1),
+                "p99": round(percentile(latencies, 0.99), 1),
+                "max": round(latencies[-1], 1) if latencies else 0.0,
+            },
+            "statuses": dict(statuses),
+            "error_rate": round(failed / len(results), 4) if results else 0.0,
+            "mongo_ops": ops,
+            "mongo_ops_per_request": round(sum(ops.values()) / len(results), 2) if results else 0.0,
+        }
+
+    def _print_phase(self, report):
+        latency = report['latency_ms']
+        self.stdout.write(f"\n📊 {report['phase']}: {report['requests']} requests in {report['seconds']} s "
+                          f"| {report['throughput']} req/s")
+        self.stdout.write(f"   latency ms   p50 {latency['p50']} | p95 {latency['p95']} | "
+                          f"p99 {latency['p99']} | max {latency['max']}")
+        statuses = " | ".join(f"{code}: {count}" for code, count in sorted(report['statuses'].items()))
+        line = f"   responses    {statuses} | error rate {report['error_rate']:.2%}"
+        self.stdout.write(self.style.WARNING(line) if report['error_rate'] else line)
+        ops = ", ".join(f"{name} {count}" for name, count in sorted(report['mongo_ops'].items(), key=lambda item: -item[1]))
+        self.stdout.write(f"   mongo ops    {report['mongo_ops_per_request']} / request ({ops or '-'})")
@@ -0,0 +1,121 @@
+# Employee/management/commands/migrate_token_blacklist.py
+from datetime import datetime, timezone
+
+import jwt
+from django.core.management.base import BaseCommand
+from mongoengine.connection import get_db
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from Employee.models import TokenBlacklist
+from HRMS.revocation import revocation_key
+
+
+class Command(BaseCommand):
+    help = (
+        "One-off migration of token_blacklist rows from raw JWT strings to "
+        "jti keys with a BSON expires_at date (TTL index)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rows written per bulk operation (default: 500)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would change'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("🔄 TOKEN BLACKLIST MIGRATION STARTED"))
+        self.stdout.write("="*70 + "\n")
+
+        # Raw collection: TokenBlacklist._get_collection() would try to build
+        # the unique jti index while legacy rows have no jti
+        collection = get_db()[TokenBlacklist._meta['collection']]
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        now_utc = datetime.now(timezone.utc)
+
+        # The old unique index on `token` would reject rows once the field is unset
+        index_names = collection.index_information().keys()
+        for name in [n for n in index_names if n.startswith('token_')]:
+            self.stdout.write(f"🗑️  Dropping legacy index: {name}")
+            if not dry_run:
+                collection.drop_index(name)
+
+        converted = 0
+        removed = 0
+        seen_keys = set()
+        operations = []
+
+        legacy_rows = collection.find(
+            {'token': {'$exists': True}},
+            {'token': 1, 'expires_at': 1}
+        )
+
+        for row in legacy_rows:
+            raw_token = row.get('token') or ''
+            try:
+                payload = jwt.decode(raw_token, options={"verify_signature": False})
+            except jwt.InvalidTokenError:
+                payload = {}
+
+            key = revocation_key(raw_token, payload)
+
+            if payload.get('exp'):
+                expires_at = datetime.fromtimestamp(payload['exp'], tz=timezone.utc)
+            else:
+                try:
+                    expires_at = datetime.strptime(
+                        row.get('expires_at'), "%Y-%m-%d %H:%M:%S"
+                    ).replace(tzinfo=timezone.utc)
+                except (TypeError, ValueError):
+                    expires_at = now_utc
+
+            # Already expired or duplicate key - nothing left to revoke
+            if expires_at <= now_utc or key in seen_keys:
+                operations.append(DeleteOne({'_id': row['_id']}))
+                removed += 1
+            else:
+                seen_keys.add(key)
+                operations.append(UpdateOne(
+                    {'_id': row['_id']},
+                    {'$set': {'jti': key, 'expires_at': expires_at}, '$unset': {'token': ''}}
+                ))
+                converted += 1
+
+            if len(operations) >= batch_size:
+                if not dry_run:
+                    self._write(collection, operations)
+                operations = []
+
+        if operations and not dry_run:
+            self._write(collection, operations)
+
+        if not dry_run:
+            # Creates the jti unique index and the expires_at TTL index
+            TokenBlacklist.ensure_indexes()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Converted {converted} rows, removed {removed} expired/duplicate rows"
+            + (" (dry run)" if dry_run else "")
+        ))
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("✅ MIGRATION COMPLETED"))
+        self.stdout.write("="*70 + "\n")
+
+    def _write(self, collection, operations):
+        """Unordered bulk write; rows whose jti already exists are reported and skipped"""
+        try:
+            collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            self.stdout.write(self.style.WARNING(
+                f"⚠️  {len(errors)} rows skipped (jti already present)"
+            ))
@@ -0,0 +1,28 @@
+# Employee/management/commands/rebuild_hierarchy.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from Employee.hierarchy import rebuild_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every employee's materialized `ancestors` from "
+        "reportingManagers (backfill / repair, see Employee.hierarchy)"
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("🌳 REPORTING HIERARCHY REBUILD STARTED"))
+        self.stdout.write("="*70 + "\n")
+
+        started = time.perf_counter()
+        updated, total = rebuild_all()
+
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Updated: {updated} | Employees: {total} | "
+            f"{(time.perf_counter() - started) * 1000:.0f} ms"
+        ))
+        self.stdout.write("="*70 + "\n")
@@ -0,0 +1,36 @@
+# Employee/management/commands/sync_attendance_snapshots.py
+from django.core.management.base import BaseCommand
+
+from Employee.attendance_snapshot import propagate_snapshots
+from Employee.models import Attendance
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the embedded employee snapshot on attendance rows "
+        "(Employee.attendance_snapshot): backfills rows without one, or "
+        "refreshes every stale snapshot with --all"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Also rewrite existing snapshots that no longer match the employee'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("🧾 ATTENDANCE SNAPSHOT SYNC STARTED"))
+        self.stdout.write("="*70 + "\n")
+
+        missing = Attendance._get_collection().count_documents({"employee_snapshot": {"$exists": False}})
+        self.stdout.write(f"📋 Rows without a snapshot: {missing}")
+
+        # Safe to rerun: rows that already match are skipped
+        modified = propagate_snapshots({}, only_missing=not options['all'])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Updated {modified} attendance rows"))
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("✅ SYNC COMPLETED"))
+        self.stdout.write("="*70 + "\n")
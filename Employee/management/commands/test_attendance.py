@@ -90,8 +90,8 @@ class Command(BaseCommand):
                 cutoff = get_shift_absent_cutoff_time(shift)
                 self.stdout.write(
                     f"  📌 {shift.shiftType}: "
-                    f"Start: {shift.fromTime.time()}, "
-                    f"End: {shift.endTime.time()}, "
+                    f"Start: {shift.fromTime}, "
+                    f"End: {shift.endTime}, "
                     f"Cutoff (End-2hrs): {cutoff}"
                 )
             self.stdout.write("")
@@ -1,8 +1,10 @@
 from mongoengine import Document, StringField, IntField, EmailField, EmbeddedDocument, \
-                        EmbeddedDocumentField, DateField, ReferenceField, BooleanField, FloatField, ListField
+                        EmbeddedDocumentField, DateField, DateTimeField, ReferenceField, BooleanField, \
+                        FloatField, ListField, MapField, ObjectIdField, DictField
 from Orgnization.models import Organization
 from Departments.models import Departments
 from Shifts.models import Shift
+from utils.timezone_utils import date_keys
 
 
 class LeavePolicy(EmbeddedDocument):
@@ -48,6 +50,8 @@ class Documents(EmbeddedDocument):
     degree = StringField(required=False)
     experienceLetter = StringField(required=False)
     photo = StringField(required=False)
+    # Resized copies of photo, "<size>.<format>" -> path (Employee.photo_thumbnails)
+    photoThumbnails = MapField(StringField(), required=False)
 
 
 class Employee(Document):
@@ -70,6 +74,8 @@ class Employee(Document):
 
     # reportingManager = ReferenceField("Employee", required=False)
     reportingManagers = ListField(ReferenceField("Employee"), required=False, default=list)
+    # Every manager above this employee (Employee.hierarchy), maintained by the views
+    ancestors = ListField(ObjectIdField(), default=list)
     # Relations
     organizationId = ReferenceField(Organization, required=True, reverse_delete_rule=0)
     departmentId = ReferenceField(Departments, required=True, reverse_delete_rule=0)
@@ -104,10 +110,42 @@ class Employee(Document):
 
     meta = {
         "collection": "employees",
-        "strict": True
+        "strict": True,
+        "indexes": [
+            # Reporting hierarchy (multikey): direct team / whole org below a manager
+            "reportingManagers",
+            "ancestors",
+            # Fallback for Employee.search_index when the in-process index is unavailable
+            {
+                "fields": ["$firstName", "$lastName", "$email", "$mobileNumber", "$designationId"],
+                "default_language": "none",
+                "weights": {"firstName": 3, "lastName": 3, "email": 2, "designationId": 2, "mobileNumber": 1},
+                "name": "employee_search_text"
+            }
+        ]
     }
 
 
+class GeofenceResult(EmbeddedDocument):
+    """Where a punch was relative to the organization's sites"""
+    site = StringField()            # containing site, else the nearest one
+    inside = BooleanField()
+    distance_m = FloatField()       # metres outside the site, 0 inside
+    evaluated_at = StringField()    # "YYYY-MM-DD HH:MM:SS"
+
+
+class EmployeeSnapshot(EmbeddedDocument):
+    """
+    Copy of the employee fields attendance lists show
+    (kept in sync by Employee.attendance_snapshot)
+    """
+    name = StringField()
+    email = StringField()
+    deptName = StringField()
+    shiftType = StringField()
+    orgId = ObjectIdField()
+
+
 class Attendance(Document):
     """
     Attendance model with string-based datetime storage in IST
@@ -116,9 +154,16 @@ class Attendance(Document):
     Time format: "HH:MM:SS" in 24-hour IST (e.g., "09:30:00", "18:45:30")
     """
     employee = ReferenceField(Employee, required=True, reverse_delete_rule=2)
+    # Lists read this instead of dereferencing `employee`
+    employee_snapshot = EmbeddedDocumentField(EmployeeSnapshot)
 
     # Date stored as string in "YYYY-MM-DD" format
     date = StringField(required=True)
+    # Integer keys of `date` for range queries, filled in by clean() and
+    # the check-in upsert: day = yyyymmdd, month = yyyymm
+    # (`manage.py backfill_attendance_keys` fills in older rows)
+    day = IntField()
+    month = IntField()
     
     # Time stored as string in "HH:MM:SS" format (IST timezone)
     check_in_time = StringField()  # e.g., "09:30:00"
@@ -139,6 +184,18 @@ class Attendance(Document):
     check_in_location = StringField()
     check_out_location = StringField()
 
+    # Raw punch coordinates; the locations above are filled in from them
+    # in the background when they need a geocoder call
+    # (Employee.location_enrichment)
+    check_in_latitude = FloatField()
+    check_in_longitude = FloatField()
+    check_out_latitude = FloatField()
+    check_out_longitude = FloatField()
+
+    # Punch coordinates checked against the organization's sites (HRMS.geofence)
+    check_in_geofence = EmbeddedDocumentField(GeofenceResult)
+    check_out_geofence = EmbeddedDocumentField(GeofenceResult)
+
     # Auto detected device 
     check_in_ip = StringField()
     check_in_device = StringField()    
@@ -155,31 +212,201 @@ class Attendance(Document):
     created_at = StringField()  # "YYYY-MM-DD HH:MM:SS"
     updated_at = StringField()  # "YYYY-MM-DD HH:MM:SS"
 
+    def clean(self):
+        """
+        Fill in the date keys, and snapshot the employee on rows created
+        with a loaded Employee
+        """
+        self.day, self.month = date_keys(self.date)
+
+        employee = self._data.get("employee")
+        if self.employee_snapshot is None and isinstance(employee, Employee):
+            from Employee.attendance_snapshot import snapshot_from_employee
+            self.employee_snapshot = EmployeeSnapshot(**snapshot_from_employee(employee))
+
     meta = {
         "collection": "attendance",
         "strict": True,
         "indexes": [
-            ("employee", "date"),  # Compound index for faster queries
+            # One row per employee per day; punches upsert on it
+            # (run `manage.py dedupe_attendance` before deploying)
+            # (named, so it never collides with the legacy non-unique
+            # employee_1_date_1 index dedupe_attendance drops)
+            {"fields": ["employee", "date"], "unique": True, "name": "employee_date_unique"},
             "date",
-            "status"
+            "status",
+            # Keyset (cursor) pagination sort orders
+            ("-date", "-id"),
+            ("employee", "-date", "-id"),
+            # Period filters on the date keys (utils.filters.apply_date_filters,
+            # utils.attendance_filters.apply_month_year_filter)
+            ("employee", "day"),
+            ("month", "status")
         ]
     }
 
 
 class TokenBlacklist(Document):
-    token = StringField(required=True, unique=True)
+    """
+    Revoked tokens, keyed by the JWT `jti` claim
+    (or a 16-byte token hash for tokens minted before jti was added)
+
+    expires_at is a real BSON date with a TTL index, so MongoDB removes
+    rows by itself once the token could no longer be used anyway.
+    """
+    jti = StringField(required=True, unique=True, max_length=64)
     empId = StringField(required=True, max_length=255)
     blacklisted_at = StringField(required=True)  # "YYYY-MM-DD HH:MM:SS" IST
-    expires_at = StringField(required=True)  # "YYYY-MM-DD HH:MM:SS" IST
+    expires_at = DateTimeField(required=True)  # UTC, token "exp"
     
     meta = {
         "collection": "token_blacklist",
         "indexes": [
-            'token',
-            'empId'
+            'empId',
+            'blacklisted_at',
+            {
+                'fields': ['expires_at'],
+                'expireAfterSeconds': 0
+            }
         ],
         "strict": True
     }
     
     def __str__(self):
-        return f"Blacklisted token for {self.empId}"
\ No newline at end of file
+        return f"Blacklisted token for {self.empId}"
+
+
+class PrincipalVersion(Document):
+    """
+    Per-employee version counter used to invalidate cached principals
+    Bumped whenever an employee is created or its role/status/credentials
+    may have changed; the employee search index also follows it
+    """
+    empId = StringField(required=True, unique=True, max_length=255)
+    version = IntField(default=0)
+    updated_at = StringField(required=True)  # "YYYY-MM-DD HH:MM:SS" IST
+
+    meta = {
+        "collection": "principal_versions",
+        "indexes": [
+            'empId',
+            'updated_at'
+        ],
+        "strict": True
+    }
+
+    def __str__(self):
+        return f"Principal version {self.version} for {self.empId}"
+
+
+class ReferenceDataVersion(Document):
+    """
+    Per-collection version counter for the cached reference-data lookups
+    (organizations, departments, shifts, employees). Bumped by the
+    create/update/delete views of each collection.
+    """
+    name = StringField(required=True, unique=True, max_length=50)
+    version = IntField(default=0)
+    updated_at = StringField(required=True)  # "YYYY-MM-DD HH:MM:SS" IST
+
+    meta = {
+        "collection": "reference_data_versions",
+        "indexes": [
+            'name'
+        ],
+        "strict": True
+    }
+
+    def __str__(self):
+        return f"Reference data {self.name} v{self.version}"
+
+
+class StoredFile(Document):
+    """
+    Reference count for a content-addressed document file
+    (see HRMS.document_storage). `path` is relative to the storage root;
+    the file is deleted when ref_count drops to 0. `deleting` marks a row
+    whose bytes are being deleted; saves of the same path wait for it.
+    """
+    path = StringField(required=True, unique=True, max_length=255)
+    sha256 = StringField(required=True, max_length=64)
+    size = IntField(default=0)
+    ref_count = IntField(default=0)
+    derived = ListField(StringField(), default=list)  # e.g. thumbnail paths
+    deleting = BooleanField(default=False)
+    created_at = StringField()  # "YYYY-MM-DD HH:MM:SS" IST
+    updated_at = StringField()  # "YYYY-MM-DD HH:MM:SS" IST
+
+    meta = {
+        "collection": "stored_files",
+        "indexes": [
+            'path',
+            'sha256',
+            'ref_count'
+        ],
+        "strict": True
+    }
+
+    def __str__(self):
+        return f"{self.path} ({self.ref_count} refs)"
+
+
+class GeocodeCell(Document):
+    """
+    Persistent reverse-geocoding cache (see HRMS.geocoding), one row per
+    geohash cell. expires_at has a TTL index so stale addresses are
+    looked up again after GEOCODE_CACHE_TTL_DAYS.
+    """
+    cell = StringField(required=True, unique=True, max_length=12)  # geohash
+    latitude = FloatField()   # coordinates of the first lookup in the cell
+    longitude = FloatField()
+    response = DictField()    # {"address": {...}, "display_name": "..."}
+    created_at = StringField()  # "YYYY-MM-DD HH:MM:SS" IST
+    expires_at = DateTimeField(required=True)  # UTC
+
+    meta = {
+        "collection": "geocode_cells",
+        "indexes": [
+            'cell',
+            {
+                'fields': ['expires_at'],
+                'expireAfterSeconds': 0
+            }
+        ],
+        "strict": True
+    }
+
+    def __str__(self):
+        return f"Geocode cell {self.cell}"
+
+
+class LocationEnrichmentJob(Document):
+    """
+    A punch location waiting to be reverse geocoded
+    (see Employee.location_enrichment). Deleted once resolved; kept with
+    status "failed" after the last retry.
+    """
+    attendance = ObjectIdField(required=True)
+    kind = StringField(required=True, choices=("check_in", "check_out"))
+    latitude = FloatField(required=True)
+    longitude = FloatField(required=True)
+    cell = StringField(required=True, max_length=12)  # geohash, for batching
+    status = StringField(choices=("pending", "running", "failed"), default="pending")
+    attempts = IntField(default=0)
+    next_attempt_at = DateTimeField(required=True)  # UTC
+    lease_until = DateTimeField()  # UTC, while a worker holds the job
+    last_error = StringField()
+    created_at = StringField()  # "YYYY-MM-DD HH:MM:SS" IST
+
+    meta = {
+        "collection": "location_enrichment_jobs",
+        "indexes": [
+            {'fields': ['attendance', 'kind'], 'unique': True},
+            ('status', 'next_attempt_at'),
+            ('status', 'lease_until'),
+        ],
+        "strict": True
+    }
+
+    def __str__(self):
+        return f"Location job {self.kind} {self.attendance} ({self.status})"
@@ -0,0 +1,174 @@
+# Employee/photo_thumbnails.py
+"""
+Background thumbnails for employee photos
+
+When a photo is uploaded (create_emp / update_emp) the view calls
+schedule_photo_thumbnails(employee). A worker then writes resized copies
+
+    photos/thumbs/<stem[:2]>/<stem>_<size>.<webp|jpg>
+
+for every size in PHOTO_THUMBNAIL_SIZES and format in
+PHOTO_THUMBNAIL_FORMATS, and stores their paths on
+`documents.photoThumbnails` ("128.webp" -> path) if the photo has not
+changed meanwhile. <stem> is the photo's content hash, so an identical
+photo reuses existing thumbnails. They are recorded as derived files of
+the photo in document storage and deleted with it.
+
+Workers (PHOTO_THUMBNAIL_BACKEND):
+- thread:  in-process pool of PHOTO_THUMBNAIL_WORKERS threads (default)
+- celery:  Employee.tasks.generate_photo_thumbnails_task
+
+Pillow is required to render thumbnails; without it photos are served as
+uploaded and no thumbnails are scheduled.
+"""
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from HRMS.document_storage import document_store
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional dependency
+    Image = ImageOps = None
+
+
+THUMBNAIL_FOLDER = "photos/thumbs/"
+
+# format -> (file extension, Pillow format, save options)
+FORMATS = {
+    "webp": ("webp", "WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def thumbnail_sizes():
+    """Configured sizes, largest first"""
+    return sorted({int(size) for size in getattr(settings, "PHOTO_THUMBNAIL_SIZES", (64, 128, 512))}, reverse=True)
+
+
+def thumbnail_formats():
+    return [fmt for fmt in getattr(settings, "PHOTO_THUMBNAIL_FORMATS", ("webp", "jpeg")) if fmt in FORMATS]
+
+
+def thumbnail_path(photo_path, size, fmt):
+    stem = os.path.splitext(os.path.basename(photo_path))[0]
+    return f"{THUMBNAIL_FOLDER}{stem[:2]}/{stem}_{size}.{FORMATS[fmt][0]}"
+
+
+def expected_thumbnails(photo_path):
+    """{"<size>.<format>": path} for a photo"""
+    return {
+        f"{size}.{fmt}": thumbnail_path(photo_path, size, fmt)
+        for size in thumbnail_sizes()
+        for fmt in thumbnail_formats()
+    }
+
+
+def render_thumbnails(source):
+    """Yield (size, format, bytes) for an open photo file"""
+    sizes = thumbnail_sizes()
+    formats = thumbnail_formats()
+    with Image.open(source) as original:
+        # JPEG: let the decoder scale down instead of decoding full resolution
+        original.draft("RGB", (sizes[0], sizes[0]))
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        # Each size is resized from the previous (larger) one
+        for size in sizes:
+            image = image.copy()
+            image.thumbnail((size, size), Image.LANCZOS)
+            for fmt in formats:
+                _, pillow_format, options = FORMATS[fmt]
+                buffer = io.BytesIO()
+                image.save(buffer, pillow_format, **options)
+                yield size, fmt, buffer.getvalue()
+
+
+def generate_photo_thumbnails(emp_id, photo_path):
+    """
+    Render the thumbnails of `photo_path` and attach them to the employee
+    Returns the thumbnail paths, or None if the photo is gone.
+    """
+    from Employee.models import Employee
+
+    expected = expected_thumbnails(photo_path)
+    backend = document_store.backend
+
+    if not all(backend.exists(path) for path in expected.values()):
+        if Image is None:
+            print("⚠️  Pillow is not installed, skipping photo thumbnails")
+            return None
+        with backend.open(photo_path) as source:
+            for size, fmt, data in render_thumbnails(source):
+                if not document_store.store_derived(photo_path, expected[f"{size}.{fmt}"], [data]):
+                    print(f"⚠️  Photo {photo_path} was removed, thumbnails dropped")
+                    return None
+
+    # Only if the employee still has this photo
+    Employee.objects(id=emp_id, documents__photo=photo_path).update_one(
+        set__documents__photoThumbnails=expected
+    )
+    print(f"🖼️  Thumbnails ready for {emp_id}: {sorted(expected)}")
+    return expected
+
+
+# ============================================================================
+# SCHEDULING
+# ============================================================================
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "PHOTO_THUMBNAIL_WORKERS", 2),
+                    thread_name_prefix="photo-thumbnails"
+                )
+    return _executor
+
+
+def _run(emp_id, photo_path):
+    try:
+        generate_photo_thumbnails(emp_id, photo_path)
+    except Exception as e:
+        print(f"❌ Error generating thumbnails for {emp_id}: {e}")
+
+
+def schedule_photo_thumbnails(employee):
+    """Queue thumbnail generation if the employee's photo does not have them yet"""
+    documents = employee.documents
+    photo = getattr(documents, "photo", None) if documents else None
+    if not photo:
+        return False
+    if dict(documents.photoThumbnails or {}) == expected_thumbnails(photo):
+        return False
+
+    emp_id = str(employee.id)
+    if getattr(settings, "PHOTO_THUMBNAIL_BACKEND", "thread") == "celery":
+        try:
+            from Employee.tasks import generate_photo_thumbnails_task
+            generate_photo_thumbnails_task.delay(emp_id, photo)
+            return True
+        except Exception as e:
+            print(f"⚠️  Could not queue thumbnail task, using local workers: {e}")
+
+    if Image is None:
+        return False
+    _get_executor().submit(_run, emp_id, photo)
+    return True
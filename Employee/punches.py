@@ -0,0 +1,201 @@
+# Employee/punches.py
+"""
+Atomic check-in / check-out
+
+Each punch is a single find_one_and_update on the unique
+(employee, date) attendance index; the status is computed by the update
+itself from values already in the document, so no read-modify-write:
+
+check_in:   upsert, filter {check_in_time: null, status != absent}
+            status "wfh" stays "wfh" (is_onWFH), anything else -> "present";
+            is_late from the compiled shift (HRMS.shift_registry)
+check_out:  filter {check_in_time set, check_out_time: null}
+            on a shift crossing midnight, a morning check-out with no
+            open row today closes the previous day's row;
+            total_work_hours from the stored check_in_time (wrapping
+            past midnight), then
+            < HALF_DAY_HOURS -> absent, < FULL_DAY_HOURS -> half_day,
+            else present (and is_late cleared)
+
+When the filter does not match, the row is read once to tell a repeated
+tap (returned as is, idempotent) from a punch that is not allowed
+(PunchRejected).
+
+The daily jobs create the pending rows with create_pending_attendance(),
+an insert-only upsert on the same index, so they never collide with a
+check-in (or another worker running the same job).
+"""
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from HRMS.shift_registry import NOON, SECONDS_PER_DAY, seconds_of
+from utils.timezone_utils import add_days_to_date, date_keys
+
+
+HALF_DAY_HOURS = 5
+FULL_DAY_HOURS = 9
+
+
+class PunchRejected(Exception):
+    """The punch is not allowed for today's attendance row"""
+
+    def __init__(self, message, attendance=None):
+        super().__init__(message)
+        self.attendance = attendance
+
+
+def _collection():
+    from Employee.models import Attendance
+    return Attendance._get_collection()
+
+
+def _seconds_expr(field):
+    """Aggregation expression: "HH:MM:SS" field -> seconds since midnight"""
+    return {"$add": [
+        {"$multiply": [{"$toInt": {"$substrBytes": [field, 0, 2]}}, 3600]},
+        {"$multiply": [{"$toInt": {"$substrBytes": [field, 3, 2]}}, 60]},
+        {"$toInt": {"$substrBytes": [field, 6, 2]}},
+    ]}
+
+
+def determine_checkin_status(checkin_time_str, shift):
+    """
+    (status expression, is_late) for a check-in against a CompiledShift
+    On time up to the shift start; a WFH day keeps its "wfh" status
+    """
+    is_late = shift.is_late(seconds_of(checkin_time_str))
+    status = {"$cond": [{"$eq": ["$status", "wfh"]}, "wfh", "present"]}
+    return status, is_late
+
+
+def create_pending_attendance(employee, date_str, now_str):
+    """
+    Insert the pending row of a loaded Employee for a date unless it
+    already exists; returns True if this call created it
+    """
+    from Employee.models import Attendance
+
+    # Built and validated like a saved row (date keys, employee snapshot)
+    attendance = Attendance(
+        employee=employee,
+        date=date_str,
+        status="pending",
+        created_at=now_str,
+        updated_at=now_str
+    )
+    attendance.validate()
+    document = attendance.to_mongo().to_dict()
+    document.pop("_id", None)
+
+    try:
+        result = _collection().update_one(
+            {"employee": employee.id, "date": date_str},
+            {"$setOnInsert": document},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Inserted concurrently (check-in, another worker)
+        return False
+    return result.upserted_id is not None
+
+
+def check_in(emp_id, shift, date_str, time_str, now_str, details, snapshot=None):
+    """
+    Record today's check-in against a CompiledShift; returns
+    (attendance document, created); created is False for a repeated tap
+    (the stored check-in is returned)
+    details: check_in_location / _latitude / _longitude / _device / _ip
+    snapshot: employee snapshot for a row created by this check-in
+    (Employee.attendance_snapshot)
+    """
+    status, is_late = determine_checkin_status(time_str, shift)
+    key = {"employee": emp_id, "date": date_str}
+    day, month = date_keys(date_str)
+    update = [{"$set": {
+        "day": day,
+        "month": month,
+        "check_in_time": time_str,
+        "is_late": is_late,
+        "is_onWFH": {"$or": [{"$eq": ["$status", "wfh"]}, {"$ifNull": ["$is_onWFH", False]}]},
+        "status": status,
+        "is_valid": {"$ifNull": ["$is_valid", False]},
+        "is_overtime": {"$ifNull": ["$is_overtime", False]},
+        "created_at": {"$ifNull": ["$created_at", now_str]},
+        "employee_snapshot": {"$ifNull": ["$employee_snapshot", {"$literal": snapshot}]},
+        "updated_at": now_str,
+        **{field: {"$literal": value} for field, value in details.items()},
+    }}]
+
+    # A concurrent insert of the same row (scheduler, another tap) makes
+    # the upsert fail once; the second attempt sees that row
+    for _ in range(2):
+        try:
+            attendance = _collection().find_one_and_update(
+                {**key, "check_in_time": None, "status": {"$ne": "absent"}},
+                update,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return attendance, True
+        except DuplicateKeyError:
+            existing = _collection().find_one(key)
+            if existing is None:
+                continue
+            if existing.get("check_in_time"):
+                return existing, False
+            if existing.get("status") == "absent":
+                raise PunchRejected("Cannot check in, marked absent for today", existing)
+    raise PunchRejected("Check-in conflicted with another update, please retry")
+
+
+def check_out(emp_id, date_str, time_str, now_str, details, shift=None):
+    """
+    Record today's check-out; returns (attendance document, created)
+    created is False for a repeated tap (the stored check-out is returned)
+    details: check_out_location / _latitude / _longitude / _device / _ip
+    shift: the employee's CompiledShift; when it crosses midnight, a
+    check-out before noon also looks at the previous day's row
+    """
+    dates = [date_str]
+    if shift is not None and shift.crosses_midnight and seconds_of(time_str) < NOON:
+        dates.append(add_days_to_date(date_str, -1))
+    worked = {"$subtract": [seconds_of(time_str), _seconds_expr("$check_in_time")]}
+    update = [
+        {"$set": {
+            "check_out_time": time_str,
+            "total_work_hours": {"$round": [{"$divide": [
+                {"$cond": [{"$lt": [worked, 0]}, {"$add": [worked, SECONDS_PER_DAY]}, worked]},
+                3600
+            ]}, 2]},
+            "updated_at": now_str,
+            **{field: {"$literal": value} for field, value in details.items()},
+        }},
+        {"$set": {
+            "status": {"$switch": {
+                "branches": [
+                    {"case": {"$lt": ["$total_work_hours", HALF_DAY_HOURS]}, "then": "absent"},
+                    {"case": {"$lt": ["$total_work_hours", FULL_DAY_HOURS]}, "then": "half_day"},
+                ],
+                "default": "present",
+            }},
+            # Working full hours overrides a late check-in
+            "is_late": {"$cond": [
+                {"$gte": ["$total_work_hours", FULL_DAY_HOURS]}, False, {"$ifNull": ["$is_late", False]}
+            ]},
+        }},
+    ]
+
+    for day in dates:
+        attendance = _collection().find_one_and_update(
+            {"employee": emp_id, "date": day, "check_in_time": {"$ne": None}, "check_out_time": None},
+            update,
+            return_document=ReturnDocument.AFTER
+        )
+        if attendance is not None:
+            return attendance, True
+
+    rows = [_collection().find_one({"employee": emp_id, "date": day}) for day in dates]
+    for existing in rows:
+        if existing and existing.get("check_out_time"):
+            return existing, False
+    raise PunchRejected("No check-in record found for today. Please check-in first.", rows[0])
@@ -1,11 +1,13 @@
 # Employee/scheduler.py
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from django.conf import settings
 from utils.timezone_utils import (
     get_current_datetime_ist, get_current_date_ist, get_current_time_ist
 )
 from Employee.models import Employee, Attendance
+from Employee.punches import create_pending_attendance
 from Employee.attendance_checker import (
     mark_absent_for_date, 
     check_and_mark_all_absent,
@@ -38,19 +40,9 @@ def create_attendance_records_job():
         created_count = 0
         
         for employee in active_employees:
-            existing = Attendance.objects(
-                employee=employee.id,
-                date=current_date_str
-            ).first()
-            
-            if not existing:
-                Attendance(
-                    employee=employee,
-                    date=current_date_str,
-                    status='pending',  # Always start as pending
-                    created_at=current_datetime_str,
-                    updated_at=current_datetime_str
-                ).save()
+            # Insert-only upsert: rows created meanwhile (check-in, another
+            # worker) are left alone; status always starts as pending
+            if create_pending_attendance(employee, current_date_str, current_datetime_str):
                 created_count += 1
                 logger.info(f"✅ Created attendance for {employee.firstName} {employee.lastName}")
         
@@ -138,6 +130,20 @@ def comprehensive_absent_check_job():
         traceback.print_exc()
 
 
+def location_enrichment_job():
+    """
+    Sweep due punch-location jobs: retries, and jobs queued by a process
+    that stopped before resolving them (Employee.location_enrichment)
+    """
+    try:
+        from Employee.location_enrichment import process_due
+        processed = process_due()
+        if processed:
+            logger.info(f"📍 Location enrichment sweep: {processed} jobs")
+    except Exception as e:
+        logger.error(f"❌ Error in location_enrichment_job: {e}")
+
+
 def start_scheduler():
     """Start the APScheduler with all necessary jobs"""
     global scheduler
@@ -265,6 +271,19 @@ def start_scheduler():
     )
     logger.info("✅ Scheduled: Comprehensive check every 6 hours")
     
+    # ============================================================================
+    # Job 5: Punch location enrichment sweep
+    # ============================================================================
+    sweep_minutes = getattr(settings, "LOCATION_ENRICHMENT_SWEEP_MINUTES", 5)
+    scheduler.add_job(
+        location_enrichment_job,
+        trigger=IntervalTrigger(minutes=sweep_minutes),
+        id='location_enrichment_sweep',
+        replace_existing=True,
+        name=f'Location Enrichment Sweep (Every {sweep_minutes} minutes)'
+    )
+    logger.info(f"✅ Scheduled: Location enrichment sweep every {sweep_minutes} minutes")
+    
     # Start the scheduler
     scheduler.start()
     logger.info("🎯 Attendance scheduler started successfully!")
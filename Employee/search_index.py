@@ -0,0 +1,388 @@
+# Employee/search_index.py
+"""
+In-process employee search index
+
+Indexes firstName / lastName / email / mobileNumber / designationId as
+exact-word and word-prefix postings, kept separately for the name fields
+and the other fields so ranking is done with set operations only.
+Every indexed word is also broken into trigrams ("  p", " pr", "pra",
+... "sh "); a query term with no word or prefix match is matched fuzzily
+against the words sharing trigrams with it, ranked by Jaccard similarity
+of the trigram sets ("prakesh" finds "prakash", 5 of 11 shared).
+Substring matches ("kash" in "Prakash") are found by a scan of the
+compact normalized text when word matches do not fill the page.
+
+Per query term:  name word  >  other word  >  name prefix  >  other prefix
+>  fuzzy (by similarity)  >  substring. Terms are ANDed and their scores
+added.
+
+The index is loaded lazily on the first search and kept current
+incrementally:
+- views writing employees call employee_search_index.refresh([...ids])
+- other workers pick the changes up from the `principal_versions`
+  high-water mark (bumped on every employee create/update/delete)
+
+If the index cannot be loaded, search falls back to the MongoDB text index
+on Employee.
+"""
+import heapq
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+
+SEARCH_FIELDS = ("firstName", "lastName", "email", "mobileNumber", "designationId")
+NAME_FIELDS = ("firstName", "lastName")
+RESULT_FIELDS = SEARCH_FIELDS + ("role", "status")
+
+# Posting key prefix -> score per matching query term (best tier wins)
+TIERS = (
+    ("=n:", 30),    # whole word of firstName / lastName
+    ("=o:", 20),    # whole word of email / mobile / designation
+    ("^n:", 18),    # prefix of a name word
+    ("^o:", 12),    # prefix of another word
+)
+SUBSTRING_SCORE = 4
+FUZZY_SCORE = 10            # at similarity 1.0, scaled down with it
+FUZZY_THRESHOLD = 0.3       # minimum trigram Jaccard similarity
+MIN_FUZZY_LENGTH = 3
+MAX_PREFIX_LENGTH = 10
+
+_WORD_SPLIT = re.compile(r"[^0-9a-z]+")
+_EMPTY = frozenset()
+
+
+def normalize(value):
+    return (value or "").strip().lower()
+
+
+def words(value):
+    return [word for word in _WORD_SPLIT.split(value) if word]
+
+
+def trigrams(word):
+    """Trigrams of a word padded like pg_trgm: "ab" -> {"  a", " ab", "ab "}"""
+    padded = "  " + word + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class EmployeeSearchIndex:
+    """Word / prefix / trigram postings over the searchable employee fields"""
+
+    def __init__(self, sync_interval=None):
+        self.sync_interval = (
+            sync_interval if sync_interval is not None
+            else getattr(settings, "EMPLOYEE_SEARCH_SYNC_SECONDS", 10)
+        )
+        self._lock = threading.RLock()
+        self._records = {}      # emp id (str) -> result dict
+        self._texts = {}        # emp id -> (" name words", " other words", all words) for matching
+        self._sort_keys = {}    # emp id -> (firstName, lastName, id) for tie-breaking
+        self._postings = {}     # posting key -> set of emp ids
+        self._keys = {}         # emp id -> tuple of posting keys (for removal)
+        self._trigrams = {}     # trigram -> set of indexed words (fuzzy matching)
+        self._high_water = None
+        self._last_sync = 0.0
+        self._loaded = False
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _index_keys(norm, status):
+        keys = {"s:" + (status or "")}
+        for field, value in norm.items():
+            if not value:
+                continue
+            if field == "email":
+                # The domain is shared by everyone, only the local part is useful
+                value = value.split("@", 1)[0]
+            group = "n:" if field in NAME_FIELDS else "o:"
+            for word in words(value):
+                keys.add("=" + group + word)
+                for length in range(1, min(len(word), MAX_PREFIX_LENGTH) + 1):
+                    keys.add("^" + group + word[:length])
+        return keys
+
+    def _add(self, row):
+        emp_id = str(row["_id"])
+        self._remove(emp_id)
+        record = {field: row.get(field) for field in RESULT_FIELDS}
+        record["id"] = emp_id
+        norm = {field: normalize(row.get(field)) for field in SEARCH_FIELDS}
+        keys = tuple(sys.intern(key) for key in self._index_keys(norm, record.get("status")))
+        for key in keys:
+            posting = self._postings.setdefault(key, set())
+            if not posting and key[0] == "=":
+                self._add_word(key[3:])
+            posting.add(emp_id)
+        self._records[emp_id] = record
+        name_words = " " + " ".join(w for f in NAME_FIELDS for w in words(norm[f]))
+        other_words = " " + " ".join(
+            w for f in SEARCH_FIELDS if f not in NAME_FIELDS for w in words(norm[f])
+        )
+        self._texts[emp_id] = (name_words, other_words, name_words + other_words)
+        self._sort_keys[emp_id] = (norm["firstName"], norm["lastName"], emp_id)
+        self._keys[emp_id] = keys
+
+    def _remove(self, emp_id):
+        for key in self._keys.pop(emp_id, ()):
+            posting = self._postings.get(key)
+            if posting is not None:
+                posting.discard(emp_id)
+                if not posting:
+                    del self._postings[key]
+                    if key[0] == "=":
+                        self._remove_word(key[3:])
+        self._records.pop(emp_id, None)
+        self._texts.pop(emp_id, None)
+        self._sort_keys.pop(emp_id, None)
+
+    def _add_word(self, word):
+        for trigram in trigrams(word):
+            self._trigrams.setdefault(trigram, set()).add(word)
+
+    def _remove_word(self, word):
+        # Still indexed in the other field group
+        if "=n:" + word in self._postings or "=o:" + word in self._postings:
+            return
+        for trigram in trigrams(word):
+            posting = self._trigrams.get(trigram)
+            if posting is not None:
+                posting.discard(word)
+                if not posting:
+                    del self._trigrams[trigram]
+
+    def _fetch(self, ids=None):
+        from Employee.models import Employee
+        queryset = Employee.objects
+        if ids is not None:
+            queryset = queryset.filter(id__in=list(ids))
+        return list(queryset.only(*RESULT_FIELDS).as_pymongo())
+
+    def load(self):
+        """Full (re)build from MongoDB"""
+        from Employee.models import PrincipalVersion
+
+        started = time.monotonic()
+        latest = PrincipalVersion.objects.order_by("-updated_at").only("updated_at").first()
+        rows = self._fetch()
+        with self._lock:
+            self._records.clear()
+            self._texts.clear()
+            self._sort_keys.clear()
+            self._postings.clear()
+            self._keys.clear()
+            self._trigrams.clear()
+            for row in rows:
+                self._add(row)
+            self._high_water = latest.updated_at if latest else None
+            self._last_sync = time.monotonic()
+            self._loaded = True
+        print(f"🔎 Employee search index loaded: {len(rows)} employees "
+              f"in {(time.monotonic() - started) * 1000:.0f} ms")
+
+    def refresh(self, emp_ids):
+        """Re-index the given employees (removes those that no longer exist)"""
+        if not self._loaded:
+            return
+        emp_ids = {str(emp_id) for emp_id in emp_ids}
+        try:
+            rows = self._fetch(emp_ids)
+        except Exception as e:
+            print(f"Error refreshing employee search index: {e}")
+            return
+        with self._lock:
+            found = set()
+            for row in rows:
+                self._add(row)
+                found.add(str(row["_id"]))
+            for emp_id in emp_ids - found:
+                self._remove(emp_id)
+
+    def sync(self, force=False):
+        """Load on first use, then apply employee changes from other workers"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_sync < self.sync_interval:
+                return
+            self._last_sync = now
+            high_water = self._high_water
+
+        from Employee.models import PrincipalVersion
+        try:
+            queryset = PrincipalVersion.objects.only("empId", "updated_at")
+            if high_water:
+                # >= because updated_at has one-second resolution
+                queryset = queryset.filter(updated_at__gte=high_water)
+            changes = [(row.empId, row.updated_at) for row in queryset]
+        except Exception as e:
+            print(f"Error syncing employee search index: {e}")
+            return
+
+        if changes:
+            self.refresh(emp_id for emp_id, _ in changes)
+            with self._lock:
+                latest = max(updated_at for _, updated_at in changes if updated_at)
+                if self._high_water is None or latest > self._high_water:
+                    self._high_water = latest
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def _word_matches(self, term):
+        """Tier postings for whole-word / word-prefix matches of a term"""
+        if len(term) <= MAX_PREFIX_LENGTH:
+            return [(score, self._postings.get(key + term, _EMPTY)) for key, score in TIERS]
+
+        # Prefix postings are capped, narrow longer terms by checking the words
+        capped = term[:MAX_PREFIX_LENGTH]
+        prefix = " " + term
+        tiers = []
+        for key, score in TIERS:
+            if key[0] == "=":
+                tiers.append((score, self._postings.get(key + term, _EMPTY)))
+            else:
+                text_index = 0 if key == "^n:" else 1
+                tiers.append((score, {
+                    emp_id for emp_id in self._postings.get(key + capped, _EMPTY)
+                    if prefix in self._texts[emp_id][text_index]
+                }))
+        return tiers
+
+    def _fuzzy_matches(self, term):
+        """Tiers of employees with a word similar to `term`, best similarity first"""
+        if len(term) < MIN_FUZZY_LENGTH:
+            return []
+        term_trigrams = trigrams(term)
+        shared = {}
+        for trigram in term_trigrams:
+            for word in self._trigrams.get(trigram, _EMPTY):
+                shared[word] = shared.get(word, 0) + 1
+
+        by_score = {}
+        for word, count in shared.items():
+            similarity = count / (len(term_trigrams) + len(trigrams(word)) - count)
+            if similarity < FUZZY_THRESHOLD:
+                continue
+            score = max(SUBSTRING_SCORE + 1, round(FUZZY_SCORE * similarity))
+            group = by_score.setdefault(score, set())
+            for key in ("=n:", "=o:"):
+                group |= self._postings.get(key + word, _EMPTY)
+        return sorted(by_score.items(), key=lambda item: -item[0])
+
+    def _substring_matches(self, term):
+        """Employees with `term` anywhere in a searchable value (linear scan)"""
+        return {emp_id for emp_id, texts in self._texts.items() if term in texts[2]}
+
+    def search(self, query, limit=20, status=None):
+        """Return (ranked records, total matches)"""
+        self.sync()
+        terms = words(normalize(query))
+        if not terms:
+            return [], 0
+
+        with self._lock:
+            per_term = []
+            for term in terms:
+                tiers = self._word_matches(term)
+                if not any(posting for _, posting in tiers):
+                    # No word or prefix match - try similar words
+                    tiers = self._fuzzy_matches(term)
+                per_term.append(tiers)
+            matched = [set().union(*(posting for _, posting in tiers)) for tiers in per_term]
+
+            candidates = self._intersect(matched)
+            if len(candidates) < limit:
+                # Word prefixes do not fill the page - add substring matches
+                matched = [m | self._substring_matches(term) for m, term in zip(matched, terms)]
+                candidates = self._intersect(matched)
+            if status and candidates:
+                candidates = candidates & self._postings.get("s:" + status, _EMPTY)
+
+            # Split the candidates into groups of equal score with set
+            # operations only: for each term, the best tier an id falls in
+            groups = [(0, candidates)] if candidates else []
+            for tiers in per_term:
+                next_groups = []
+                for score, group in groups:
+                    remaining = group
+                    for tier_score, posting in tiers:
+                        hit = remaining & posting
+                        if hit:
+                            next_groups.append((score + tier_score, hit))
+                            remaining = remaining - hit
+                            if not remaining:
+                                break
+                    if remaining:
+                        next_groups.append((score + SUBSTRING_SCORE, remaining))
+                groups = next_groups
+            groups.sort(key=lambda item: -item[0])
+
+            results = []
+            for score, group in groups:
+                needed = limit - len(results)
+                if needed <= 0:
+                    break
+                for emp_id in heapq.nsmallest(needed, group, key=self._sort_keys.__getitem__):
+                    results.append(dict(self._records[emp_id], score=score))
+        return results, len(candidates)
+
+    @staticmethod
+    def _intersect(sets):
+        result = None
+        for posting in sorted(sets, key=len):
+            result = set(posting) if result is None else result & posting
+            if not result:
+                break
+        return result or set()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def __len__(self):
+        return len(self._records)
+
+
+employee_search_index = EmployeeSearchIndex()
+
+
+def search_employees_mongo(query, limit=20, status=None):
+    """Fallback search using the MongoDB text index on Employee"""
+    from Employee.models import Employee
+
+    queryset = Employee.objects.search_text(query)
+    if status:
+        queryset = queryset.filter(status=status)
+    total = queryset.count()
+    results = []
+    for emp in queryset.order_by("$text_score").only(*RESULT_FIELDS)[:limit]:
+        record = {field: getattr(emp, field) for field in RESULT_FIELDS}
+        record["id"] = str(emp.id)
+        record["score"] = round(emp.get_text_score() or 0, 2)
+        results.append(record)
+    return results, total
+
+
+def search_employees(query, limit=20, status=None):
+    """Search the in-process index, falling back to MongoDB text search"""
+    if getattr(settings, "EMPLOYEE_SEARCH_BACKEND", "index") == "index":
+        try:
+            results, total = employee_search_index.search(query, limit=limit, status=status)
+            return results, total, "index"
+        except Exception as e:
+            print(f"Employee search index unavailable, using text index: {e}")
+    results, total = search_employees_mongo(query, limit=limit, status=status)
+    return results, total, "mongo"
@@ -1,10 +1,14 @@
 from rest_framework_mongoengine.serializers import DocumentSerializer, EmbeddedDocumentSerializer
 from rest_framework import serializers
+from django.conf import settings
 from Employee.models import Employee, Address, Documents, Attendance
 from Shifts.models import Shift
 from Orgnization.models import Organization
 from Departments.models import Departments
 from utils.timezone_utils import format_date_display, format_time_display, format_datetime_display
+from HRMS.identity_map import prefetch_references, EMPLOYEE_REFERENCE_FIELDS
+from utils.sparse_fields import SparseFieldsetMixin
+from Employee.attendance_snapshot import snapshot_from_employee
 
 
 # ============== EMBEDDED DOCUMENT SERIALIZERS ==============
@@ -70,16 +74,51 @@ class DepartmentSerializer(DocumentSerializer):
 
 
 # ============== EMPLOYEE SERIALIZER ==============
-class EmployeeSerializer(DocumentSerializer):
+
+class EmployeePrefetchListSerializer(serializers.ListSerializer):
+    """
+    List serializer used for EmployeeSerializer(many=True)
+    Loads the organizations, departments, shifts and reporting managers of
+    the whole page with one `$in` query per collection before the rows are
+    serialized, so the get_*_details methods never hit the database
+    """
+
+    def to_representation(self, data):
+        # With ?fields= only prefetch the references that will be rendered
+        needed = set(self.child.source_fields(self.child.fields.keys()))
+        refs = [name for name in EMPLOYEE_REFERENCE_FIELDS if name in needed]
+        employees = prefetch_references(data, refs)
+        return super().to_representation(employees)
+
+
+class EmployeeSerializer(SparseFieldsetMixin, DocumentSerializer):
     """
     Complete Employee serializer with proper reference field expansion
     """
     
+    # Document fields read by the computed fields (for ?fields= projections)
+    field_sources = {
+        'currentAddress_obj': ('currentAddress',),
+        'permanentAddress_obj': ('permanentAddress',),
+        'documents_obj': ('documents',),
+        'photo_thumbnails': ('documents',),
+        'organizationId_details': ('organizationId',),
+        'departmentId_details': ('departmentId',),
+        'shiftId_details': ('shiftId',),
+        'reportingManagers_details': ('reportingManagers',),
+        'dob_display': ('dob',),
+        'doj_display': ('doj',),
+    }
+    
     # Embedded documents (read-only nested objects)
     currentAddress_obj = AddressSerializer(source='currentAddress', read_only=True)
     permanentAddress_obj = AddressSerializer(source='permanentAddress', read_only=True)
     documents_obj = DocumentsSerializer(source='documents', read_only=True)
     
+    # Resized photo URLs {"128": {"webp": url, "jpeg": url}}, filled in by
+    # the background thumbnail workers (Employee.photo_thumbnails)
+    photo_thumbnails = serializers.SerializerMethodField()
+    
     # Reference fields expanded with full details
     organizationId_details = serializers.SerializerMethodField()
     departmentId_details = serializers.SerializerMethodField()
@@ -97,7 +136,9 @@ class EmployeeSerializer(DocumentSerializer):
         fields = '__all__'
         extra_kwargs = {
             'password': {'write_only': True, 'required': False},
+            'ancestors': {'read_only': True},
         }
+        list_serializer_class = EmployeePrefetchListSerializer
     
     def get_organizationId_details(self, obj):
         """Get full organization details"""
@@ -166,6 +207,19 @@ class EmployeeSerializer(DocumentSerializer):
                 return []
         return []
     
+    def get_photo_thumbnails(self, obj):
+        """Thumbnail URLs by size and format, None until they are generated"""
+        documents = obj.documents
+        if not documents or not documents.photo or not documents.photoThumbnails:
+            return None
+        request = self.context.get('request')
+        thumbnails = {}
+        for key, path in documents.photoThumbnails.items():
+            size, fmt = key.split('.', 1)
+            url = settings.MEDIA_URL + path
+            thumbnails.setdefault(size, {})[fmt] = request.build_absolute_uri(url) if request else url
+        return thumbnails
+    
     def get_dob_display(self, obj):
         """Format DOB for display"""
         if obj.dob:
@@ -183,18 +237,20 @@ class EmployeeSerializer(DocumentSerializer):
         data = super().to_representation(instance)
         
         # Convert reference fields to string IDs for backward compatibility
-        if instance.organizationId:
+        # (skipped for fields left out with ?fields=)
+        if 'organizationId' in data and instance.organizationId:
             data['organizationId'] = str(instance.organizationId.id)
-        if instance.departmentId:
+        if 'departmentId' in data and instance.departmentId:
             data['departmentId'] = str(instance.departmentId.id)
-        if instance.shiftId:
+        if 'shiftId' in data and instance.shiftId:
             data['shiftId'] = str(instance.shiftId.id)
         
         # CHANGED: Convert list of reporting managers to list of IDs
-        if instance.reportingManagers:
-            data['reportingManagers'] = [str(manager.id) for manager in instance.reportingManagers if manager]
-        else:
-            data['reportingManagers'] = []
+        if 'reportingManagers' in data:
+            if instance.reportingManagers:
+                data['reportingManagers'] = [str(manager.id) for manager in instance.reportingManagers if manager]
+            else:
+                data['reportingManagers'] = []
         
         return data
     
@@ -210,7 +266,40 @@ class EmployeeSerializer(DocumentSerializer):
 
 # ============== ATTENDANCE SERIALIZER ==============
 
-class AttendanceSerializer(DocumentSerializer):
+def attendance_employee(attendance):
+    """
+    {"id", "name", "email", "deptName", "shiftType", "orgId"} of the row's
+    employee, from the embedded snapshot (rows written before snapshots
+    existed fall back to the reference until they are backfilled)
+    """
+    ref = attendance._data.get("employee")
+    if ref is None:
+        return None
+    snapshot = attendance.employee_snapshot
+    if snapshot is not None:
+        data = {field: getattr(snapshot, field) for field in ("name", "email", "deptName", "shiftType", "orgId")}
+    elif attendance.employee:
+        data = snapshot_from_employee(attendance.employee)
+    else:
+        return None
+    data["orgId"] = str(data["orgId"]) if data.get("orgId") else None
+    return {"id": str(getattr(ref, "id", ref)), **data}
+
+
+class AttendanceSerializer(SparseFieldsetMixin, DocumentSerializer):
+    # Document fields read by the display fields (for ?fields= projections)
+    field_sources = {
+        'employee_snapshot': ('employee', 'employee_snapshot'),
+        'date_display': ('date',),
+        'check_in_display': ('check_in_time',),
+        'check_out_display': ('check_out_time',),
+        'created_at_display': ('created_at',),
+        'updated_at_display': ('updated_at',),
+    }
+    
+    # Compact employee {id, name, email, deptName, shiftType, orgId}
+    employee_snapshot = serializers.SerializerMethodField()
+    
     # Add display fields that show formatted versions
     date_display = serializers.SerializerMethodField()
     check_in_display = serializers.SerializerMethodField()
@@ -223,6 +312,9 @@ class AttendanceSerializer(DocumentSerializer):
         fields = "__all__"
         depth = 1
 
+    def get_employee_snapshot(self, obj):
+        return attendance_employee(obj)
+
     def get_date_display(self, obj):
         """Return date in DD-MM-YYYY format"""
         if obj.date:
@@ -253,6 +345,28 @@ class AttendanceSerializer(DocumentSerializer):
             return format_datetime_display(obj.updated_at)
         return None
 
+
+class AttendanceSnapshotSerializer(AttendanceSerializer):
+    """
+    Attendance list pages: `employee` is the row's snapshot instead of the
+    nested employee document, so a page never dereferences employees
+    """
+    field_sources = {
+        **AttendanceSerializer.field_sources,
+        'employee': ('employee', 'employee_snapshot'),
+    }
+
+    employee = serializers.SerializerMethodField()
+    employee_snapshot = None
+
+    class Meta:
+        model = Attendance
+        exclude = ("employee_snapshot",)
+        depth = 1
+
+    def get_employee(self, obj):
+        return attendance_employee(obj)
+
 # ============== SIMPLIFIED LIST SERIALIZERS ==============
 
 class EmployeeListSerializer(DocumentSerializer):
@@ -304,12 +418,12 @@ class AttendanceListSerializer(DocumentSerializer):
         ]
     
     def get_employee_name(self, obj):
-        if obj.employee:
-            return f"{obj.employee.firstName} {obj.employee.lastName}"
-        return None
+        employee = attendance_employee(obj)
+        return employee["name"] if employee else None
     
     def get_employee_email(self, obj):
-        return obj.employee.email if obj.employee else None
+        employee = attendance_employee(obj)
+        return employee["email"] if employee else None
     
     def get_date_display(self, obj):
         return format_date_display(obj.date) if obj.date else None
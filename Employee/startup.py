@@ -3,6 +3,7 @@ from utils.timezone_utils import (
     get_current_datetime_ist, get_current_date_ist
 )
 from Employee.models import Employee, Attendance
+from Employee.punches import create_pending_attendance
 from Employee.attendance_checker import check_and_mark_all_absent, mark_absent_for_date
 import logging
 
@@ -31,22 +32,9 @@ def create_missing_attendance_records():
         existing_count = 0
         
         for employee in active_employees:
-            # Check if attendance record exists for today
-            existing = Attendance.objects(
-                employee=employee,
-                date=current_date_str
-            ).first()
-            
-            if not existing:
-                # Create new attendance record
-                attendance = Attendance(
-                    employee=employee,
-                    date=current_date_str,
-                    status='pending',
-                    created_at=current_datetime_str,
-                    updated_at=current_datetime_str
-                )
-                attendance.save()
+            # Insert-only upsert: every gunicorn worker runs this at start,
+            # and check-ins may already have created the row
+            if create_pending_attendance(employee, current_date_str, current_datetime_str):
                 created_count += 1
                 logger.info(f"✅ Created attendance for {employee.firstName} {employee.lastName}")
             else:
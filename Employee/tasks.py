@@ -3,6 +3,7 @@ from celery import shared_task
 from datetime import time as dt_time
 from utils.timezone_utils import now, today, current_time
 from models import Employee, Attendance
+from Employee.punches import create_pending_attendance
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,22 +28,8 @@ def create_daily_attendance_records():
         skipped_count = 0
         
         for employee in active_employees:
-            # Check if attendance record already exists
-            existing = Attendance.objects(
-                employee=employee,
-                date=current_date
-            ).first()
-            
-            if not existing:
-                # Create new attendance record
-                attendance = Attendance(
-                    employee=employee,
-                    date=current_date,
-                    status='pending',
-                    created_at=current_time,
-                    updated_at=current_time
-                )
-                attendance.save()
+            # Insert-only upsert: leaves rows created meanwhile alone
+            if create_pending_attendance(employee, current_date, current_time):
                 created_count += 1
                 logger.info(f"Created attendance for {employee.firstName} {employee.lastName}")
             else:
@@ -128,4 +115,25 @@ def mark_absent_for_no_checkin():
 def test_task():
     """Simple test task to verify Celery is working"""
     logger.info("Test task executed successfully!")
-    return "Test task completed"
\ No newline at end of file
+    return "Test task completed"
+
+@shared_task(name='employee.tasks.generate_photo_thumbnails')
+def generate_photo_thumbnails_task(emp_id, photo_path):
+    """Resize an uploaded employee photo (see Employee.photo_thumbnails)"""
+    from Employee.photo_thumbnails import generate_photo_thumbnails
+    return generate_photo_thumbnails(emp_id, photo_path)
+
+
+@shared_task(name='employee.tasks.enrich_locations')
+def enrich_locations_task():
+    """Resolve queued punch locations (see Employee.location_enrichment)"""
+    from Employee.location_enrichment import process_due
+    return process_due()
+
+
+@shared_task(name='employee.tasks.propagate_attendance_snapshots')
+def propagate_attendance_snapshots_task(key, value):
+    """Refresh attendance snapshots after an employee change (see Employee.attendance_snapshot)"""
+    from bson import ObjectId
+    from Employee.attendance_snapshot import propagate_snapshots
+    return propagate_snapshots({key: ObjectId(value)})
@@ -1,3 +1,519 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import SkipTest, mock
 
-# Create your tests here.
+import mongoengine
+from bson import ObjectId
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
+from mongoengine.connection import get_db
+from pymongo.errors import PyMongoError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from Employee.attendance_snapshot import propagate_snapshots, snapshot_from_employee
+from Employee.export import CSV_COLUMNS, EmployeeExporter
+from Employee.models import Attendance, Employee, StoredFile
+from Employee.punches import PunchRejected, check_in, check_out, create_pending_attendance
+from Employee.search_index import EmployeeSearchIndex
+from Employee.views import export_emp
+from HRMS.document_storage import DocumentStore, LocalFileSystemBackend, content_path
+from HRMS.principal_cache import Principal
+from HRMS.shift_registry import CompiledShift
+from utils.attendance_filters import apply_date_range_filter, apply_month_year_filter
+from utils.filters import apply_date_filters, month_key_filter
+from utils.timezone_utils import date_keys, month_day_key_range, month_key
+
+
+# Throwaway database the tests run against; dropped before every test
+TEST_MONGO_URI = os.getenv("TEST_MONGO_URI", "mongodb://localhost:27017/hrms_test")
+
+
+class MongoTestCase(SimpleTestCase):
+    """
+    Runs against TEST_MONGO_URI instead of the configured database
+    (skipped when no MongoDB server answers there)
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        mongoengine.disconnect(alias="default")
+        mongoengine.connect(
+            host=TEST_MONGO_URI, alias="default", tz_aware=True, tzinfo=None,
+            serverSelectionTimeoutMS=2000
+        )
+        db = get_db()
+        if db.name == settings.MONGO_DB:
+            raise RuntimeError("TEST_MONGO_URI must not point at the configured MONGO_DB")
+        try:
+            db.client.admin.command("ping")
+        except PyMongoError:
+            raise SkipTest(f"No MongoDB server at {TEST_MONGO_URI}")
+
+    @classmethod
+    def tearDownClass(cls):
+        get_db().client.drop_database(get_db().name)
+        mongoengine.disconnect(alias="default")
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        get_db().client.drop_database(get_db().name)
+
+
+class RecordingQuerySet:
+    """Stands in for a queryset; records the filters applied to it"""
+
+    def __init__(self):
+        self.filters = {}
+        self.emptied = False
+
+    def filter(self, **kwargs):
+        self.filters.update(kwargs)
+        return self
+
+    def none(self):
+        self.emptied = True
+        return self
+
+
+def query_request(**params):
+    return SimpleNamespace(query_params=params)
+
+
+class DateKeyTests(SimpleTestCase):
+
+    def test_date_keys(self):
+        self.assertEqual(date_keys("2024-12-27"), (20241227, 202412))
+        self.assertEqual(date_keys("2024-01-01"), (20240101, 202401))
+        self.assertEqual(date_keys("2024-02-29"), (20240229, 202402))
+
+    def test_date_keys_of_invalid_dates(self):
+        for value in (None, "", "2023-02-29", "2024-13-01", "27-12-2024", "2024-12-27 09:00:00", 20241227):
+            self.assertEqual(date_keys(value), (None, None), value)
+
+    def test_month_key(self):
+        self.assertEqual(month_key(2024, 12), 202412)
+        self.assertEqual(month_key("2024", "03"), 202403)
+        for year, month in ((2024, 0), (2024, 13), ("2024", "ab"), (None, 1), (0, 1)):
+            self.assertIsNone(month_key(year, month), (year, month))
+
+    def test_month_day_key_range(self):
+        self.assertEqual(month_day_key_range(2024, 2), (20240201, 20240231))
+        self.assertEqual(month_day_key_range(2024, 13), (None, None))
+
+    def test_month_key_filter(self):
+        self.assertEqual(
+            month_key_filter("2024", "12"),
+            {"month": 202412, "day__gte": 20241201, "day__lte": 20241231}
+        )
+        # Every real day of the month falls inside the day range
+        first_day, last_day = month_day_key_range(2024, 2)
+        self.assertTrue(first_day <= date_keys("2024-02-29")[0] <= last_day)
+        self.assertFalse(first_day <= date_keys("2024-03-01")[0] <= last_day)
+        self.assertIsNone(month_key_filter("2024", "13"))
+
+    def test_apply_date_filters(self):
+        queryset = apply_date_filters(RecordingQuerySet(), query_request(month="3", year="2024"))
+        self.assertEqual(queryset.filters, {"month": 202403, "day__gte": 20240301, "day__lte": 20240331})
+
+        queryset = apply_date_filters(
+            RecordingQuerySet(), query_request(start_date="2024-01-30", end_date="2024-02-02")
+        )
+        self.assertEqual(queryset.filters, {
+            "month__gte": 202401, "month__lte": 202402, "day__gte": 20240130, "day__lte": 20240202,
+        })
+
+        queryset = apply_date_filters(RecordingQuerySet(), query_request(date="2024-12-27"))
+        self.assertEqual(queryset.filters, {"date": "2024-12-27"})
+
+    def test_apply_date_filters_with_an_invalid_month(self):
+        queryset = apply_date_filters(RecordingQuerySet(), query_request(month="13", year="2024"))
+        self.assertTrue(queryset.emptied)
+        self.assertEqual(queryset.filters, {})
+
+    def test_apply_month_year_filter(self):
+        queryset = apply_month_year_filter(RecordingQuerySet(), query_request(month="12", year="2024"))
+        self.assertEqual(queryset.filters, {"month": 202412, "day__gte": 20241201, "day__lte": 20241231})
+
+        # Invalid month/year: unfiltered
+        queryset = apply_month_year_filter(RecordingQuerySet(), query_request(month="x", year="2024"))
+        self.assertEqual(queryset.filters, {})
+        self.assertFalse(queryset.emptied)
+
+    def test_apply_date_range_filter(self):
+        queryset = apply_date_range_filter(
+            RecordingQuerySet(), query_request(start_date="2024-12-01", end_date="bad")
+        )
+        self.assertEqual(queryset.filters, {"month__gte": 202412, "day__gte": 20241201})
+
+
+class DocumentStoreTests(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        StoredFile.ensure_indexes()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        # Small chunks so uploads are streamed in several pieces
+        self.store = DocumentStore(backend=LocalFileSystemBackend(root=self.root), chunk_size=4)
+
+    def upload(self, content=b"same document bytes", name="pan.pdf"):
+        return SimpleUploadedFile(name, content)
+
+    def test_path_is_the_content_hash(self):
+        path = self.store.save(self.upload(), "documents/pan")
+
+        digest = hashlib.sha256(b"same document bytes").hexdigest()
+        self.assertEqual(path, content_path("documents/pan", digest, ".pdf"))
+        with self.store.backend.open(path) as stored:
+            self.assertEqual(stored.read(), b"same document bytes")
+
+    def test_same_bytes_are_stored_once(self):
+        first = self.store.save(self.upload(), "documents/pan")
+        second = self.store.save(self.upload(name="copy.PDF"), "documents/pan")
+
+        self.assertEqual(first, second)
+        self.assertEqual(StoredFile.objects.get(path=first).ref_count, 2)
+        self.assertEqual(os.listdir(self.store.backend.temp_dir), [])
+
+    def test_different_bytes_are_stored_apart(self):
+        first = self.store.save(self.upload(), "documents/pan")
+        second = self.store.save(self.upload(b"other bytes"), "documents/pan")
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(StoredFile.objects.get(path=first).ref_count, 1)
+        self.assertEqual(StoredFile.objects.get(path=second).ref_count, 1)
+
+    def test_release_deletes_the_file_with_the_last_reference(self):
+        path = self.store.save(self.upload(), "documents/pan")
+        self.store.save(self.upload(), "documents/pan")
+
+        self.store.release(path)
+        self.assertTrue(self.store.backend.exists(path))
+        self.assertEqual(StoredFile.objects.get(path=path).ref_count, 1)
+
+        self.store.release(path)
+        self.assertFalse(self.store.backend.exists(path))
+        self.assertEqual(StoredFile.objects(path=path).count(), 0)
+
+    def test_save_waits_for_a_release_in_progress(self):
+        path = self.store.save(self.upload(), "documents/pan")
+        # release() has tombstoned the row and is about to delete the bytes
+        StoredFile.objects(path=path).update_one(set__ref_count=0, set__deleting=True)
+
+        def finish_release(delay):
+            self.store.backend.delete(path)
+            StoredFile.objects(path=path, deleting=True).delete()
+
+        with mock.patch("HRMS.document_storage.time.sleep", side_effect=finish_release) as sleep:
+            self.assertEqual(self.store.save(self.upload(), "documents/pan"), path)
+
+        sleep.assert_called_once()
+        self.assertTrue(self.store.backend.exists(path))
+        row = StoredFile.objects.get(path=path)
+        self.assertEqual((row.ref_count, row.deleting), (1, False))
+
+    def test_retain_takes_another_reference(self):
+        path = self.store.save(self.upload(), "documents/pan")
+
+        self.assertTrue(self.store.retain(path))
+        self.assertEqual(StoredFile.objects.get(path=path).ref_count, 2)
+
+    def test_release_deletes_derived_files(self):
+        path = self.store.save(self.upload(b"photo bytes", "photo.jpg"), "documents/photos")
+        thumbnail = "documents/photos/thumbs/photo.jpg"
+        self.assertTrue(self.store.store_derived(path, thumbnail, [b"thumb"]))
+
+        self.store.release(path)
+        self.assertFalse(self.store.backend.exists(thumbnail))
+
+    def test_release_of_untracked_path_deletes_the_file(self):
+        legacy = "documents/pan/legacy.pdf"
+        os.makedirs(os.path.join(self.root, "documents/pan"))
+        with open(os.path.join(self.root, legacy), "wb") as f:
+            f.write(b"old upload")
+
+        self.store.release(legacy)
+        self.assertFalse(self.store.backend.exists(legacy))
+
+
+class EmployeeExportTests(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        collection = Employee._get_collection()
+        self.manager_id = collection.insert_one({
+            "firstName": "Maya", "lastName": "Rao", "email": "maya@example.com",
+            "status": "inactive", "role": "hr",  # kept out of ?status=active
+        }).inserted_id
+        collection.insert_many([
+            {
+                "firstName": f"Emp{index}", "lastName": "Test", "email": f"emp{index}@example.com",
+                "status": "active" if index % 2 else "inactive", "role": "JR_employee",
+                "reportingManagers": [self.manager_id],
+            }
+            for index in range(5)
+        ])
+        self.factory = APIRequestFactory()
+        self.hr = Principal(self.manager_id, "maya@example.com", "hr", "active")
+
+    def export(self, query="", user=None):
+        request = self.factory.get(f"/api/employee/export/{query}")
+        force_authenticate(request, user=user or self.hr)
+        return export_emp(request)
+
+    def streamed(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_is_streamed_with_header(self):
+        response = self.export()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertRegex(response["Content-Disposition"], r'filename="employees_\d{8}_\d{4}\.csv"')
+        rows = list(csv.reader(io.StringIO(self.streamed(response))))
+        self.assertEqual(rows[0], CSV_COLUMNS)
+        self.assertEqual(len(rows), 7)
+
+    def test_ndjson_with_filters(self):
+        response = self.export("?file_format=ndjson&status=active")
+
+        self.assertEqual(response.status_code, 200)
+        records = [json.loads(line) for line in self.streamed(response).splitlines()]
+        self.assertEqual(len(records), 2)
+        for record in records:
+            self.assertEqual(record["status"], "active")
+            self.assertEqual(
+                record["reportingManagers"],
+                [{"id": str(self.manager_id), "name": "Maya Rao", "email": "maya@example.com"}]
+            )
+
+    def test_invalid_format_and_filter(self):
+        self.assertEqual(self.export("?file_format=xlsx").status_code, 400)
+        self.assertEqual(self.export("?departmentId=nope").status_code, 400)
+
+    def test_employees_cannot_export(self):
+        user = Principal(ObjectId(), "emp@example.com", "JR_employee", "active")
+        self.assertEqual(self.export(user=user).status_code, 403)
+
+    def test_batches_resolve_managers(self):
+        exporter = EmployeeExporter("ndjson", filters={"role": "JR_employee"}, batch_size=2)
+        chunks = list(exporter.stream())
+
+        # One chunk per batch of two
+        self.assertEqual(len(chunks), 3)
+        records = [json.loads(line) for line in "".join(chunks).splitlines()]
+        self.assertEqual(len(records), 5)
+        self.assertTrue(all(len(record["reportingManagers"]) == 1 for record in records))
+
+    def test_managers_survive_cache_eviction(self):
+        second_id = Employee._get_collection().insert_one({
+            "firstName": "Ravi", "lastName": "Iyer", "email": "ravi@example.com",
+            "status": "active", "role": "hr",
+        }).inserted_id
+        Employee._get_collection().update_many(
+            {"role": "JR_employee", "status": "active"}, {"$push": {"reportingManagers": second_id}}
+        )
+        exporter = EmployeeExporter("ndjson", filters={"role": "JR_employee"}, batch_size=1)
+
+        with mock.patch("Employee.export.MAX_CACHED_MANAGERS", 1):
+            records = [json.loads(line) for line in "".join(exporter.stream()).splitlines()]
+
+        for record in records:
+            expected = 2 if record["status"] == "active" else 1
+            self.assertEqual(len(record["reportingManagers"]), expected, record["email"])
+
+
+class EmployeeSearchIndexTests(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Employee._get_collection().insert_many([
+            {"firstName": "Prakash", "lastName": "Patil", "email": "prakash.patil@example.com",
+             "status": "active"},
+            {"firstName": "Asha", "lastName": "Kulkarni", "email": "asha@example.com",
+             "status": "active"},
+        ])
+        self.index = EmployeeSearchIndex(sync_interval=60)
+
+    def names(self, query):
+        results, _ = self.index.search(query)
+        return [record["firstName"] for record in results]
+
+    def test_typo_finds_the_similar_name(self):
+        self.assertEqual(self.names("Prakesh"), ["Prakash"])
+        self.assertEqual(self.names("kulkarmi"), ["Asha"])
+
+    def test_fuzzy_ranks_below_prefix_matches(self):
+        exact, _ = self.index.search("prak")
+        fuzzy, _ = self.index.search("prakesh")
+        self.assertGreater(exact[0]["score"], fuzzy[0]["score"])
+
+    def test_dissimilar_term_finds_nothing(self):
+        self.assertEqual(self.names("zebra"), [])
+
+    def test_removed_words_leave_the_trigram_index(self):
+        self.index.sync()
+        asha = str(Employee._get_collection().find_one({"firstName": "Asha"})["_id"])
+        with self.index._lock:
+            self.index._remove(asha)
+        self.assertEqual(self.names("kulkarmi"), [])
+        self.assertFalse(any("kulkarni" in words for words in self.index._trigrams.values()))
+
+
+class PunchTests(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Attendance.ensure_indexes()
+        self.emp_id = ObjectId()
+        self.day_shift = CompiledShift("day", "Day", "09:30:00", "18:30:00")
+        self.night_shift = CompiledShift("night", "Night", "22:00:00", "07:00:00")
+
+    def punch_in(self, time_str, date_str="2024-12-27", shift=None):
+        return check_in(
+            self.emp_id, shift or self.day_shift, date_str, time_str,
+            f"{date_str} {time_str}", {"check_in_location": "Office"}
+        )
+
+    def punch_out(self, time_str, date_str="2024-12-27", shift=None):
+        return check_out(
+            self.emp_id, date_str, time_str, f"{date_str} {time_str}",
+            {"check_out_location": "Office"}, shift=shift
+        )
+
+    def test_check_in_creates_the_row(self):
+        attendance, created = self.punch_in("09:15:00")
+
+        self.assertTrue(created)
+        self.assertEqual(attendance["status"], "present")
+        self.assertFalse(attendance["is_late"])
+        self.assertEqual((attendance["day"], attendance["month"]), (20241227, 202412))
+
+    def test_repeated_check_in_returns_the_stored_row(self):
+        first, _ = self.punch_in("09:45:00")
+        again, created = self.punch_in("10:30:00")
+
+        self.assertFalse(created)
+        self.assertEqual(again["_id"], first["_id"])
+        self.assertEqual(again["check_in_time"], "09:45:00")
+        self.assertTrue(again["is_late"])
+        self.assertEqual(Attendance._get_collection().count_documents({"employee": self.emp_id}), 1)
+
+    def test_check_in_fills_a_pending_row(self):
+        Attendance._get_collection().insert_one(
+            {"employee": self.emp_id, "date": "2024-12-27", "status": "pending", "check_in_time": None}
+        )
+        attendance, created = self.punch_in("09:00:00")
+
+        self.assertTrue(created)
+        self.assertEqual(attendance["status"], "present")
+
+    def test_check_in_keeps_wfh(self):
+        Attendance._get_collection().insert_one(
+            {"employee": self.emp_id, "date": "2024-12-27", "status": "wfh", "check_in_time": None}
+        )
+        attendance, _ = self.punch_in("09:00:00")
+
+        self.assertEqual(attendance["status"], "wfh")
+        self.assertTrue(attendance["is_onWFH"])
+
+    def test_absent_row_rejects_check_in(self):
+        Attendance._get_collection().insert_one(
+            {"employee": self.emp_id, "date": "2024-12-27", "status": "absent", "check_in_time": None}
+        )
+        with self.assertRaises(PunchRejected):
+            self.punch_in("17:00:00")
+
+    def test_check_out_computes_hours_and_status(self):
+        self.punch_in("09:00:00")
+        attendance, created = self.punch_out("18:30:00")
+
+        self.assertTrue(created)
+        self.assertEqual(attendance["total_work_hours"], 9.5)
+        self.assertEqual(attendance["status"], "present")
+
+        self.punch_in("09:00:00", date_str="2024-12-28")
+        attendance, _ = self.punch_out("15:00:00", date_str="2024-12-28")
+        self.assertEqual(attendance["status"], "half_day")
+
+    def test_repeated_check_out_returns_the_stored_row(self):
+        self.punch_in("09:00:00")
+        first, _ = self.punch_out("18:30:00")
+        again, created = self.punch_out("19:00:00")
+
+        self.assertFalse(created)
+        self.assertEqual(again["_id"], first["_id"])
+        self.assertEqual(again["check_out_time"], "18:30:00")
+
+    def test_check_out_without_check_in_is_rejected(self):
+        with self.assertRaises(PunchRejected):
+            self.punch_out("18:30:00")
+
+    def test_overnight_check_out_closes_the_previous_day(self):
+        self.punch_in("22:00:00", date_str="2024-12-27", shift=self.night_shift)
+        attendance, created = self.punch_out("07:00:00", date_str="2024-12-28", shift=self.night_shift)
+
+        self.assertTrue(created)
+        self.assertEqual(attendance["date"], "2024-12-27")
+        self.assertEqual(attendance["total_work_hours"], 9.0)
+        self.assertEqual(attendance["status"], "present")
+
+        again, created = self.punch_out("07:05:00", date_str="2024-12-28", shift=self.night_shift)
+        self.assertFalse(created)
+        self.assertEqual(again["_id"], attendance["_id"])
+
+    def test_day_shift_does_not_close_the_previous_day(self):
+        self.punch_in("09:00:00", date_str="2024-12-27")
+        with self.assertRaises(PunchRejected):
+            self.punch_out("07:00:00", date_str="2024-12-28", shift=self.day_shift)
+
+    def pending_employee(self):
+        Employee._get_collection().insert_one({
+            "_id": self.emp_id, "firstName": "Asha", "lastName": "Patil",
+            "email": "asha@example.com", "status": "active", "role": "JR_employee",
+        })
+        return Employee.objects.get(id=self.emp_id)
+
+    def test_pending_row_is_created_once(self):
+        employee = self.pending_employee()
+
+        self.assertTrue(create_pending_attendance(employee, "2024-12-27", "2024-12-27 00:01:00"))
+        self.assertFalse(create_pending_attendance(employee, "2024-12-27", "2024-12-27 00:02:00"))
+
+        row = Attendance._get_collection().find_one({"employee": self.emp_id})
+        self.assertEqual(row["status"], "pending")
+        self.assertEqual((row["day"], row["month"]), (20241227, 202412))
+        self.assertEqual(row["employee_snapshot"]["name"], "Asha Patil")
+        self.assertEqual(row["created_at"], "2024-12-27 00:01:00")
+
+    def test_pending_row_leaves_a_check_in_alone(self):
+        employee = self.pending_employee()
+        self.punch_in("00:30:00")
+
+        self.assertFalse(create_pending_attendance(employee, "2024-12-27", "2024-12-27 00:31:00"))
+        row = Attendance._get_collection().find_one({"employee": self.emp_id})
+        self.assertEqual(row["check_in_time"], "00:30:00")
+        self.assertEqual(Attendance._get_collection().count_documents({"employee": self.emp_id}), 1)
+
+    def test_snapshots_from_both_paths_are_not_rewritten(self):
+        # No department, shift or organization: the snapshot has no values for them
+        employee = self.pending_employee()
+        create_pending_attendance(employee, "2024-12-26", "2024-12-26 00:01:00")
+        check_in(
+            self.emp_id, self.day_shift, "2024-12-27", "09:00:00", "2024-12-27 09:00:00",
+            {"check_in_location": "Office"}, snapshot=snapshot_from_employee(employee)
+        )
+
+        snapshots = [row["employee_snapshot"] for row in Attendance._get_collection().find()]
+        self.assertEqual(snapshots[0], snapshots[1])
+        self.assertEqual(propagate_snapshots({"_id": self.emp_id}), 0)
@@ -21,10 +21,15 @@ urlpatterns = [
     # Employee CRUD
     # ============================
     path("fetch/", views.list_emp, name="list_emp"),
+    path("search/", views.search_emp, name="search_emp"),
+    path("org-chart/", views.org_chart_emp, name="org_chart_emp"),
     path("create/", views.create_emp, name="create_emp"),
+    path("import/", views.import_emp, name="import_emp"),
+    path("export/", views.export_emp, name="export_emp"),
     path("fetch/<str:pk>/", views.get_emp, name="get_emp"),
     path("update/<str:pk>/", views.update_emp, name="update_emp"),
     path("delete/<str:pk>/", views.delete_emp, name="delete_emp"),
+    path("reference-data/", views.reference_data, name="reference_data"),
 
     # ============================
     # Profile
@@ -65,6 +70,11 @@ urlpatterns = [
         OverallAttendanceListView.as_view(),
         name="overall_attendance",
     ),
+    path(
+        "Attendance/location-backlog/",
+        views.location_backlog_view,
+        name="location_backlog",
+    ),
     path(
         "Attendance/allmark/",
         EmpMarkAllView.as_view(),
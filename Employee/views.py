@@ -1,17 +1,41 @@
-from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes, throttle_classes
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from Employee.models import Employee, Attendance, Documents
-from Employee.serializer import EmployeeSerializer, AttendanceSerializer
+from Employee.serializer import EmployeeSerializer, AttendanceSerializer, AttendanceSnapshotSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
 from HRMS.auth import MongoJWTAuthentication
+from HRMS.revocation import revocation_cache, revocation_key
+from HRMS.identity_map import get_request_employee
+from HRMS.principal_cache import bump_principal_version
+from HRMS.throttling import LoginRateThrottle, AttendancePunchRateThrottle
+from Employee.search_index import employee_search_index, search_employees
+from HRMS.document_storage import document_store
+from HRMS.geocoding import reverse_geocode
+from HRMS.geofence import check_geofence
+from Employee.location_enrichment import (
+    describe_location, enqueue_location, locate, backlog as location_backlog, retry_failed as retry_failed_locations
+)
+from Employee.photo_thumbnails import schedule_photo_thumbnails
+from Employee.punches import PunchRejected, check_in, check_out
+from Employee.attendance_snapshot import schedule_propagation, snapshot_changed, snapshot_for_user
+from Employee.hierarchy import (
+    HierarchyCycleError, ancestors_for, check_managers, update_hierarchy, rebuild_descendants, org_chart
+)
+from Employee.export import EmployeeExporter, FORMATS as EXPORT_FORMATS
+from Employee.bulk_import import (
+    EmployeeImporter, ImportFormatError, DEFAULT_BATCH_SIZE, detect_format, read_rows
+)
+from HRMS.reference_data import LOOKUPS, reference_data_cache, bump_reference_version, get_lookups, wants_lookups
+from HRMS.shift_registry import get_compiled_shift
 from Employee.models import TokenBlacklist
 
 from HRMS.permissions import IsAdmin, IsHR, IsSREmployee, IsJREmployee, IsAuthenticated, AllowAny
 
 from datetime import datetime, timedelta
 from django.conf import settings
+from django.http import StreamingHttpResponse
 import jwt
 from bson import ObjectId
 from django.core.mail import send_mail
@@ -20,6 +44,7 @@ from Shifts.models import Shift
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from Orgnization.models import Organization
 import os
+import time
 import uuid
 from mongoengine.errors import DoesNotExist, MultipleObjectsReturned
 from datetime import date
@@ -27,12 +52,14 @@ from rest_framework.generics import ListAPIView
 from utils.timezone_utils import (
     now, today, current_time,
     format_datetime_display, format_time_display, format_date_display,
-    calculate_work_hours, calculate_work_duration_display,
+    calculate_work_duration_display,
     is_time_after, is_time_before,
-    get_current_date_ist, get_current_time_ist, get_current_datetime_ist
+    get_current_date_ist, get_current_time_ist, get_current_datetime_ist,
+    KOLKATA_TZ
 )
 import requests
 from utils.pagination import CustomPagination
+from utils.sparse_fields import get_requested_fields, sparse_queryset
 from utils.filters import apply_date_filters,apply_wfh_date_filters,apply_leave_date_filters
 
 # ============================================================================
@@ -46,61 +73,158 @@ def list_emp(request):
     # Initialize paginator
     paginator = CustomPagination()
     
-    # Get all employees
-    employees = Employee.objects.all()
+    # Get all employees (projected to the ?fields= subset, if any)
+    fields = get_requested_fields(request)
+    employees = sparse_queryset(Employee.objects.all(), EmployeeSerializer, fields)
     
     # Apply pagination to the queryset
     paginated_employees = paginator.paginate_queryset(employees, request)
     
     # Serialize the paginated data
-    serializer = EmployeeSerializer(paginated_employees, many=True)
-    
-    # Get additional data (not paginated)
-    reporting_roles = ["admin", "hr", "SR_employee"]
-    reporting_managers = Employee.objects.filter(
-        role__in=reporting_roles
-    ).only("id", "firstName")
+    serializer = EmployeeSerializer(paginated_employees, many=True, fields=fields)
     
     # Prepare the response data
     response_data = {
         "results": serializer.data,
-        "organizations": [
-            {"id": str(org.id), "orgName": org.orgName}
-            for org in Organization.objects.only("orgName")
-        ],
-        "departments": [
-            {"id": str(dept.id), "deptName": dept.deptName}
-            for dept in Departments.objects.only("deptName")
-        ],
-        "shifts": [
-            {"id": str(shift.id), "shiftType": shift.shiftType}
-            for shift in Shift.objects.only("shiftType")
-        ],
-        "reporting_managers": [
-            {
-                "id": str(emp.id),
-                "firstName": emp.firstName
-            }
-            for emp in reporting_managers
-        ],
     }
     
+    # Dropdown lookups come from the reference-data cache; clients using
+    # api/employee/reference-data/ can skip them with ?lookups=false
+    if wants_lookups(request):
+        response_data.update(get_lookups("organizations", "departments", "shifts", "reporting_managers"))
+    
     # Return paginated response
     return paginator.get_paginated_response(response_data)
 
 
+#API END POINT = api/employee/search/?q=rahul&limit=20
+@api_view(["GET"])
+@permission_classes([IsAuthenticated | IsHR | IsAdmin | IsSREmployee | IsJREmployee])
+def search_emp(request):
+    """
+    Ranked employee search over name, email, mobile number and designation
+    Served from the in-process search index (MongoDB text index fallback)
+    """
+    query = request.query_params.get("q", "").strip()
+    if not query:
+        return Response({"error": "Query parameter 'q' is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = min(max(int(request.query_params.get("limit", 20)), 1), 100)
+    except ValueError:
+        return Response({"error": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+    started = time.perf_counter()
+    results, total, source = search_employees(
+        query, limit=limit, status=request.query_params.get("status")
+    )
+
+    return Response({
+        "statusCode": 200,
+        "message": "Employees fetched successfully",
+        "data": results,
+        "meta": {
+            "total": total,
+            "limit": limit,
+            "source": source,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+    }, status=status.HTTP_200_OK)
+
+
+#API END POINT = api/employee/org-chart/?root=<emp-id>
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def org_chart_emp(request):
+    """
+    Reporting tree from the materialized hierarchy (one query, no recursion)
+    HR/Admin: whole organization or ?root=<emp-id>; optional ?organizationId=
+    Others: their own subtree
+    """
+    employee = get_request_employee(request, refs=None)
+    root = request.query_params.get("root")
+    filters = {}
+
+    if employee.role not in ["hr", "admin"]:
+        root = str(employee.id)
+    if root and not ObjectId.is_valid(root):
+        return Response({"error": "Invalid root"}, status=status.HTTP_400_BAD_REQUEST)
+    org_id = request.query_params.get("organizationId")
+    if org_id:
+        if not ObjectId.is_valid(org_id):
+            return Response({"error": "Invalid organizationId"}, status=status.HTTP_400_BAD_REQUEST)
+        filters["organizationId"] = ObjectId(org_id)
+
+    chart = org_chart(ObjectId(root) if root else None, filters=filters)
+    if root and chart is None:
+        return Response({"error": "Employee not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        "statusCode": 200,
+        "message": "Org chart fetched successfully",
+        "data": chart
+    }, status=status.HTTP_200_OK)
+
+
+#API END POINT = api/employee/reference-data/?include=organizations,shifts
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def reference_data(request):
+    """
+    Cached id/name lookups for dropdowns
+    Served with an ETag derived from the collection versions; a matching
+    If-None-Match gets 304 Not Modified without touching the lookups
+    """
+    include = request.query_params.get("include")
+    names = [name.strip() for name in include.split(",") if name.strip()] if include else list(LOOKUPS)
+
+    unknown = [name for name in names if name not in LOOKUPS]
+    if unknown:
+        return Response({
+            "error": f"Unknown lookups: {', '.join(unknown)}",
+            "available": list(LOOKUPS)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    etag = reference_data_cache.etag(names)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("If-None-Match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response({
+        "statusCode": 200,
+        "message": "Reference data fetched successfully",
+        "data": reference_data_cache.get(names),
+        "version": etag.strip('"')
+    }, status=status.HTTP_200_OK, headers=headers)
+
+
+# Storage folders (relative to MEDIA_ROOT) per document type, files are
+# stored by content hash inside them - see HRMS.document_storage
 DOCUMENT_FOLDERS = {
-    'adharCard': '/media/documents/adhar/',
-    'panCard': '/media/documents/pan/',
-    'bankBook': '/media/documents/bank/',
-    'xStandardMarksheet': '/media/documents/marksheets/10th/',
-    'xiiStandardMarksheet': '/media/documents/marksheets/12th/',
-    'degree': '/media/documents/degrees/',
-    'experienceLetter': '/media/documents/experience/',
-    'photo': '/media/photos/'
+    'adharCard': 'documents/adhar/',
+    'panCard': 'documents/pan/',
+    'bankBook': 'documents/bank/',
+    'xStandardMarksheet': 'documents/marksheets/10th/',
+    'xiiStandardMarksheet': 'documents/marksheets/12th/',
+    'degree': 'documents/degrees/',
+    'experienceLetter': 'documents/experience/',
+    'photo': 'photos/'
 }
 
 
+def document_paths(documents):
+    """{doc_type: path} of the filled slots of an embedded Documents"""
+    if not documents:
+        return {}
+    return {
+        doc_type: getattr(documents, doc_type)
+        for doc_type in DOCUMENT_FOLDERS
+        if getattr(documents, doc_type, None)
+    }
+
+
 #API END POINT = api/employee/create/
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsHR | IsAdmin])
@@ -165,44 +289,23 @@ def create_emp(request):
     try:
         # Create employee with text data
         employee = serializer.save()
+        if employee.reportingManagers:
+            employee.ancestors = ancestors_for(employee.reportingManagers)
+            employee.update(set__ancestors=employee.ancestors)
+        bump_principal_version(employee.id)
+        bump_reference_version("employees")
+        employee_search_index.refresh([employee.id])
         print(f"✅ Employee created with ID: {employee.id}")
         
-        # Handle file uploads
+        # Handle file uploads (streamed, stored by content hash)
         documents_data = {}
         
         if 'documents' in restructured_files:
             for doc_type, file_obj in restructured_files['documents'].items():
                 if hasattr(file_obj, 'name') and doc_type in DOCUMENT_FOLDERS:
                     try:
-                        # Get folder for this document type
-                        folder = DOCUMENT_FOLDERS[doc_type]
-                        
-                        # Create folder if it doesn't exist
-                        full_folder = os.path.join(settings.MEDIA_ROOT, folder)
-                        os.makedirs(full_folder, exist_ok=True)
-                        
-                        # Generate unique filename
-                        original_name = file_obj.name
-                        name, ext = os.path.splitext(original_name)
-                        
-                        # Use employee ID and document type in filename
-                        unique_name = f"{employee.id}_{doc_type}_{uuid.uuid4().hex[:6]}{ext}"
-                        
-                        # Remove any special characters
-                        unique_name = "".join(c for c in unique_name if c.isalnum() or c in ['_', '.', '-'])
-                        
-                        # Full relative path
-                        relative_path = os.path.join(folder, unique_name)
-                        full_path = os.path.join(settings.MEDIA_ROOT, relative_path)
-                        
-                        # Save file
-                        with open(full_path, 'wb') as destination:
-                            for chunk in file_obj.chunks():
-                                destination.write(chunk)
-                        
-                        # Store relative path in documents data
+                        relative_path = document_store.save(file_obj, DOCUMENT_FOLDERS[doc_type])
                         documents_data[doc_type] = relative_path
-                        
                         print(f"✅ Saved {doc_type}: {relative_path} ({file_obj.size} bytes)")
                         
                     except Exception as file_error:
@@ -212,8 +315,13 @@ def create_emp(request):
         # Update employee with document paths
         if documents_data:
             employee.documents = Documents(**documents_data)
-            employee.save()
+            try:
+                employee.save()
+            except Exception:
+                document_store.release_many(documents_data.values())
+                raise
             print(f"📄 Documents saved: {list(documents_data.keys())}")
+            schedule_photo_thumbnails(employee)
         else:
             print("⚠️  No documents saved")
         
@@ -245,6 +353,99 @@ def create_emp(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+#API END POINT = api/employee/import/   (multipart: file=<csv|xlsx|ndjson>)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsHR | IsAdmin])
+@parser_classes([MultiPartParser, FormParser])
+def import_emp(request):
+    """
+    Bulk employee import (see Employee.bulk_import)
+    Optional: file_format=csv|xlsx|ndjson (default: from the file name),
+    dry_run=true (validate only), batch_size=<rows per insert>
+    """
+    file_obj = request.FILES.get("file")
+    if not file_obj:
+        return Response({"error": "Upload the employees file as 'file'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    params = request.query_params
+    dry_run = str(request.data.get("dry_run", params.get("dry_run", "false"))).lower() in ("true", "1", "yes")
+    try:
+        batch_size = int(request.data.get("batch_size", params.get("batch_size", DEFAULT_BATCH_SIZE)))
+    except ValueError:
+        return Response({"error": "batch_size must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        fmt = detect_format(file_obj.name, request.data.get("file_format") or params.get("file_format"))
+        importer = EmployeeImporter(batch_size=batch_size, dry_run=dry_run)
+        report = importer.run(read_rows(getattr(file_obj, "file", file_obj), fmt))
+    except ImportFormatError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        print(f"❌ Bulk import failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return Response({
+            "success": False,
+            "error": str(e),
+            "message": "Failed to import employees"
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    print(f"📥 Bulk import: {report['imported']} imported, {report['failed']} failed "
+          f"of {report['total']} rows in {report['took_ms']} ms")
+    message = "Employees validated successfully" if dry_run else "Employees imported successfully"
+    if report["failed"]:
+        message = f"{report['failed']} of {report['total']} rows failed"
+    return Response({
+        "statusCode": 200,
+        "message": message,
+        "data": report
+    }, status=status.HTTP_200_OK)
+
+
+#API END POINT = api/employee/export/?file_format=csv|ndjson&status=active
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsHR | IsAdmin])
+def export_emp(request):
+    """
+    Full employee directory with organization, department, shift and
+    reporting managers resolved, streamed as CSV or NDJSON
+    Optional filters: status, role, organizationId, departmentId
+    """
+    params = request.query_params
+    # Not ?format=, DRF reserves it for renderer selection
+    fmt = params.get("file_format", "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        return Response({"error": "file_format must be csv or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+
+    filters = {}
+    for field in ("status", "role"):
+        if params.get(field):
+            filters[field] = params[field]
+    for field in ("organizationId", "departmentId"):
+        if params.get(field):
+            if not ObjectId.is_valid(params[field]):
+                return Response({"error": f"Invalid {field}"}, status=status.HTTP_400_BAD_REQUEST)
+            filters[field] = ObjectId(params[field])
+
+    exporter = EmployeeExporter(fmt, filters=filters)
+    response = StreamingHttpResponse(exporter.stream(), content_type=exporter.content_type)
+    filename = f"employees_{datetime.now(KOLKATA_TZ).strftime('%Y%m%d_%H%M')}.{fmt}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def reporting_cycle_error(emp, serializer):
+    """400 response if the new reportingManagers would make a reporting cycle"""
+    if 'reportingManagers' not in serializer.validated_data:
+        return None
+    try:
+        check_managers(emp.id, serializer.validated_data['reportingManagers'])
+    except HierarchyCycleError as e:
+        print(f"❌ Reporting cycle: {e}")
+        return Response({"reportingManagers": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+    return None
+
+
 def get_employee_object(pk):
     try:
         return Employee.objects.get(id=ObjectId(pk))
@@ -295,9 +496,20 @@ def update_emp(request, pk):
                 print(f"  {field}: {errors}")
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
+        cycle_error = reporting_cycle_error(emp, serializer)
+        if cycle_error:
+            return cycle_error
+        
         try:
             # Save the employee data
             updated_employee = serializer.save()
+            if 'reportingManagers' in serializer.validated_data:
+                update_hierarchy(updated_employee.id)
+            bump_principal_version(updated_employee.id)
+            bump_reference_version("employees")
+            employee_search_index.refresh([updated_employee.id])
+            if snapshot_changed(serializer.validated_data):
+                schedule_propagation("_id", updated_employee.id)
             print(f"✅ Employee updated: {updated_employee.id}")
             print("=" * 80)
             
@@ -365,56 +577,19 @@ def update_emp(request, pk):
         
         print(f"📎 Files to update: {list(restructured_files.keys())}")
         
-        # Track existing documents for cleanup
-        documents_to_delete = set()
+        # Current slot values, references move to the new ones after save
+        current_docs = document_paths(emp.documents)
         documents_data = {}
+        uploaded_types = set()
         
-        # If we have new documents, we'll replace old ones
+        # Handle new file uploads (streamed, stored by content hash)
         if 'documents' in restructured_files:
-            # Get current documents if they exist
-            current_docs = {}
-            if emp.documents:
-                current_docs = emp.documents.__dict__
-            
-            # Mark current documents for deletion (if they exist on disk)
-            for doc_type, doc_path in current_docs.items():
-                if doc_path and doc_path != '' and os.path.exists(os.path.join(settings.MEDIA_ROOT, doc_path)):
-                    documents_to_delete.add(doc_path)
-                    print(f"🗑️  Marked for deletion: {doc_path}")
-            
-            # Handle new file uploads
             for doc_type, file_obj in restructured_files['documents'].items():
                 if hasattr(file_obj, 'name') and doc_type in DOCUMENT_FOLDERS:
                     try:
-                        # Get folder for this document type
-                        folder = DOCUMENT_FOLDERS[doc_type]
-                        
-                        # Create folder if it doesn't exist
-                        full_folder = os.path.join(settings.MEDIA_ROOT, folder)
-                        os.makedirs(full_folder, exist_ok=True)
-                        
-                        # Generate unique filename
-                        original_name = file_obj.name
-                        name, ext = os.path.splitext(original_name)
-                        
-                        # Use employee ID and document type in filename
-                        unique_name = f"{emp.id}_{doc_type}_{uuid.uuid4().hex[:6]}{ext}"
-                        
-                        # Remove any special characters
-                        unique_name = "".join(c for c in unique_name if c.isalnum() or c in ['_', '.', '-'])
-                        
-                        # Full relative path
-                        relative_path = os.path.join(folder, unique_name)
-                        full_path = os.path.join(settings.MEDIA_ROOT, relative_path)
-                        
-                        # Save file
-                        with open(full_path, 'wb') as destination:
-                            for chunk in file_obj.chunks():
-                                destination.write(chunk)
-                        
-                        # Store relative path in documents data
+                        relative_path = document_store.save(file_obj, DOCUMENT_FOLDERS[doc_type])
                         documents_data[doc_type] = relative_path
-                        
+                        uploaded_types.add(doc_type)
                         print(f"✅ Saved {doc_type}: {relative_path} ({file_obj.size} bytes)")
                         
                     except Exception as file_error:
@@ -427,17 +602,6 @@ def update_emp(request, pk):
                 if doc_type not in documents_data:  # Don't override uploaded files
                     documents_data[doc_type] = doc_value
         
-        # Remove documents that are being cleared (empty string or null)
-        if 'documents' in restructured_text:
-            for doc_type, doc_value in restructured_text['documents'].items():
-                if doc_value in ['', None]:
-                    # Check if this document exists in current documents
-                    if emp.documents and hasattr(emp.documents, doc_type):
-                        current_path = getattr(emp.documents, doc_type)
-                        if current_path and current_path != '' and os.path.exists(os.path.join(settings.MEDIA_ROOT, current_path)):
-                            documents_to_delete.add(current_path)
-                            print(f"🗑️  Marked for deletion (cleared): {current_path}")
-        
         # Update text data with merged documents
         if documents_data:
             restructured_text['documents'] = documents_data
@@ -456,45 +620,45 @@ def update_emp(request, pk):
             for field, errors in serializer.errors.items():
                 print(f"  {field}: {errors}")
             
-            # Clean up any uploaded files if validation failed
-            if documents_data:
-                print("🧹 Cleaning up uploaded files due to validation error...")
-                for doc_path in documents_data.values():
-                    if doc_path and os.path.exists(os.path.join(settings.MEDIA_ROOT, doc_path)):
-                        try:
-                            os.remove(os.path.join(settings.MEDIA_ROOT, doc_path))
-                            print(f"  ✅ Deleted: {doc_path}")
-                        except Exception as e:
-                            print(f"  ❌ Failed to delete {doc_path}: {e}")
+            # Drop the references taken by this request's uploads
+            if uploaded_types:
+                print("🧹 Releasing uploaded files due to validation error...")
+                document_store.release_many(documents_data[doc_type] for doc_type in uploaded_types)
             
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
+        cycle_error = reporting_cycle_error(emp, serializer)
+        if cycle_error:
+            if uploaded_types:
+                document_store.release_many(documents_data[doc_type] for doc_type in uploaded_types)
+            return cycle_error
+        
+        updated_employee = None
         try:
             print("✅ Validation successful")
             
             # Save the employee data
             updated_employee = serializer.save()
+            if 'reportingManagers' in serializer.validated_data:
+                update_hierarchy(updated_employee.id)
+            bump_principal_version(updated_employee.id)
+            bump_reference_version("employees")
+            employee_search_index.refresh([updated_employee.id])
+            if snapshot_changed(serializer.validated_data):
+                schedule_propagation("_id", updated_employee.id)
             print(f"✅ Employee updated: {updated_employee.id}")
             
-            # Clean up old files that were replaced
-            if documents_to_delete:
-                print("🧹 Cleaning up old files...")
-                for old_file_path in documents_to_delete:
-                    full_path = os.path.join(settings.MEDIA_ROOT, old_file_path)
-                    if os.path.exists(full_path):
-                        try:
-                            os.remove(full_path)
-                            print(f"  ✅ Deleted old file: {old_file_path}")
-                        except Exception as e:
-                            print(f"  ⚠️  Warning: Could not delete {old_file_path}: {e}")
+            # Release replaced / cleared documents (files go when unreferenced)
+            if 'documents' in restructured_text:
+                document_store.replace_references(
+                    current_docs, document_paths(updated_employee.documents), uploaded_types
+                )
+                schedule_photo_thumbnails(updated_employee)
             
             # Generate full URLs for response
             documents_with_urls = {}
-            if updated_employee.documents:
-                doc_dict = updated_employee.documents.__dict__
-                for doc_type, path in doc_dict.items():
-                    if path and not doc_type.startswith('_'):  # Skip private attributes
-                        documents_with_urls[doc_type] = request.build_absolute_uri(settings.MEDIA_URL + path)
+            for doc_type, path in document_paths(updated_employee.documents).items():
+                documents_with_urls[doc_type] = request.build_absolute_uri(settings.MEDIA_URL + path)
             
             print("=" * 80)
             print("✅ UPDATE COMPLETE")
@@ -513,16 +677,10 @@ def update_emp(request, pk):
             import traceback
             traceback.print_exc()
             
-            # Clean up any uploaded files if save failed
-            if documents_data:
-                print("🧹 Cleaning up uploaded files due to save error...")
-                for doc_path in documents_data.values():
-                    if doc_path and os.path.exists(os.path.join(settings.MEDIA_ROOT, doc_path)):
-                        try:
-                            os.remove(os.path.join(settings.MEDIA_ROOT, doc_path))
-                            print(f"  ✅ Deleted: {doc_path}")
-                        except Exception:
-                            pass
+            # Drop the references taken by this request's uploads
+            if uploaded_types and updated_employee is None:
+                print("🧹 Releasing uploaded files due to save error...")
+                document_store.release_many(documents_data[doc_type] for doc_type in uploaded_types)
             
             return Response({
                 "success": False,
@@ -557,7 +715,18 @@ def delete_emp(request, pk):
     if not emp:
         return Response({"error": "Employee not found"}, status=status.HTTP_404_NOT_FOUND)
 
+    documents = document_paths(emp.documents)
     emp.delete()
+    rebuild_descendants(emp.id)
+    bump_principal_version(pk)
+    bump_reference_version("employees")
+    employee_search_index.refresh([pk])
+
+    # Last: the employee is gone whether or not the files can be released
+    try:
+        document_store.release_many(documents.values())
+    except Exception as e:
+        print(f"⚠️  Warning: Could not release documents of {pk}: {e}")
     return Response({"message": "Employee deleted successfully"}, status=status.HTTP_200_OK)
 
 
@@ -569,6 +738,7 @@ from datetime import datetime, timedelta, timezone
 #API END POINT = api/employee/login/
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@throttle_classes([LoginRateThrottle])
 def login_emp(request):
     email = request.data.get("email")
     password = request.data.get("password")
@@ -588,6 +758,7 @@ def login_emp(request):
     access_payload = {
         "empId": str(emp.id),
         "role": emp.role,
+        "jti": uuid.uuid4().hex,
         "iat": now_utc,
         "exp": now_utc + timedelta(days=7),
     }
@@ -602,6 +773,7 @@ def login_emp(request):
     refresh_payload = {
         "empId": str(emp.id),
         "type": "refresh",
+        "jti": uuid.uuid4().hex,
         "iat": now_utc,
         "exp": now_utc + timedelta(days=30),
     }
@@ -628,6 +800,34 @@ def login_emp(request):
     }, status=status.HTTP_200_OK)
 
 
+def blacklist_token(raw_token, current_datetime):
+    """
+    Revoke a single JWT by its jti (or token hash for tokens without a jti)
+    Returns True if a new blacklist entry was created
+    """
+    payload = jwt.decode(
+        raw_token, 
+        settings.SECRET_KEY, 
+        algorithms=["HS256"]
+    )
+    key = revocation_key(raw_token, payload)
+    expires_at = datetime.fromtimestamp(payload.get("exp"), tz=timezone.utc)
+
+    # Single upsert - no separate "already blacklisted?" lookup
+    result = TokenBlacklist.objects(jti=key).update_one(
+        set_on_insert__empId=payload.get("empId"),
+        set_on_insert__expires_at=expires_at,
+        set_on_insert__blacklisted_at=current_datetime,
+        upsert=True,
+        full_result=True
+    )
+
+    # Reject the token in this worker right away
+    revocation_cache.add(key, expires_at)
+
+    return result.upserted_id is not None
+
+
 #API END POINT = api/employee/logout/
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
@@ -647,30 +847,12 @@ def logout_emp(request):
         blacklisted_count = 0
         current_datetime = get_current_datetime_ist()
         
-        # Blacklist access token
-        if access_token:
+        for token_name, raw_token in (("access", access_token), ("refresh", refresh_token)):
+            if not raw_token:
+                continue
             try:
-                payload = jwt.decode(
-                    access_token, 
-                    settings.SECRET_KEY, 
-                    algorithms=["HS256"]
-                )
-                
-                # Check if already blacklisted (MongoEngine query)
-                if not TokenBlacklist.objects(token=access_token).first():
-                    # Convert exp timestamp to IST string
-                    exp_timestamp = payload.get("exp")
-                    exp_datetime = datetime.fromtimestamp(exp_timestamp)
-                    exp_ist = exp_datetime.strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    TokenBlacklist(
-                        token=access_token,
-                        empId=payload.get("empId"),
-                        expires_at=exp_ist,
-                        blacklisted_at=current_datetime
-                    ).save()
+                if blacklist_token(raw_token, current_datetime):
                     blacklisted_count += 1
-                    
             except jwt.ExpiredSignatureError:
                 # Token already expired, no need to blacklist
                 pass
@@ -678,40 +860,7 @@ def logout_emp(request):
                 # Invalid token, skip
                 pass
             except Exception as e:
-                print(f"Error blacklisting access token: {e}")
-        
-        # Blacklist refresh token
-        if refresh_token:
-            try:
-                payload = jwt.decode(
-                    refresh_token, 
-                    settings.SECRET_KEY, 
-                    algorithms=["HS256"]
-                )
-                
-                # Check if already blacklisted (MongoEngine query)
-                if not TokenBlacklist.objects(token=refresh_token).first():
-                    # Convert exp timestamp to IST string
-                    exp_timestamp = payload.get("exp")
-                    exp_datetime = datetime.fromtimestamp(exp_timestamp)
-                    exp_ist = exp_datetime.strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    TokenBlacklist(
-                        token=refresh_token,
-                        empId=payload.get("empId"),
-                        expires_at=exp_ist,
-                        blacklisted_at=current_datetime
-                    ).save()
-                    blacklisted_count += 1
-                    
-            except jwt.ExpiredSignatureError:
-                # Token already expired, no need to blacklist
-                pass
-            except jwt.InvalidTokenError:
-                # Invalid token, skip
-                pass
-            except Exception as e:
-                print(f"Error blacklisting refresh token: {e}")
+                print(f"Error blacklisting {token_name} token: {e}")
         
         return Response({
             "message": "Logout successful",
@@ -733,6 +882,8 @@ def logout_emp(request):
 def cleanup_blacklist(request):
     """
     Admin endpoint to clean up expired tokens from blacklist
+    No longer needed in normal operation: the TTL index on expires_at lets
+    MongoDB expire entries by itself. Kept for manual/legacy use.
     """
     try:
         # Only allow admin to run this
@@ -741,12 +892,9 @@ def cleanup_blacklist(request):
                 "error": "Permission denied"
             }, status=status.HTTP_403_FORBIDDEN)
         
-        current_datetime = get_current_datetime_ist()
-        
         # Delete tokens that have expired (MongoEngine query)
-        # Compare string dates
         deleted_count = TokenBlacklist.objects(
-            expires_at__lt=current_datetime
+            expires_at__lt=datetime.now(timezone.utc)
         ).delete()
         
         return Response({
@@ -825,6 +973,7 @@ def forgot_password(request):
     if employee_present:
         employee_present.password = new_password
         employee_present.save()
+        bump_principal_version(employee_present.id)
         return Response({"message": "Password changed successfully"}, status=200)
     else:
         return Response({"error": "Invalid Credentials"}, status=400)
@@ -1022,6 +1171,20 @@ def dashboardData(request):
 # Display: Already in IST, just format for display
 # ============================================================================
 
+def punch_identity(user):
+    """
+    (employee id, shift id, organization id) of the authenticated user,
+    read from the cached Principal (or the Employee loaded on a cache
+    miss) without dereferencing anything
+    """
+    data = getattr(user, "_data", None)
+    if data is not None:
+        shift, organization = data.get("shiftId"), data.get("organizationId")
+    else:
+        shift, organization = getattr(user, "shiftId", None), getattr(user, "organizationId", None)
+    return user.id, getattr(shift, "id", shift), getattr(organization, "id", organization)
+
+
 class CheckInView(APIView):
     """
     Check-In API with string-based datetime storage (IST)
@@ -1030,13 +1193,16 @@ class CheckInView(APIView):
     - All comparisons done with string times
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [AttendancePunchRateThrottle]
     
     def post(self, request):
         try:
-            # Get employee using MongoEngine
-            employee = Employee.objects.get(id=request.user.id)
+            # Ids from the authenticated principal, shift times from the
+            # shift registry: the punch itself is the only query
+            emp_id, shift_id, org_id = punch_identity(request.user)
+            shift = get_compiled_shift(shift_id)
             
-            if not employee.shiftId:
+            if not shift:
                 return Response({"error": "No shift assigned"}, status=400)
             
             # Get current IST date and time as strings
@@ -1047,74 +1213,59 @@ class CheckInView(APIView):
             print(f"✅ Check-in date (IST): {current_date_ist}")
             print(f"✅ Check-in time (IST): {current_time_ist}")
             
-            # Get or create attendance record for today (MongoEngine query)
-            attendance = Attendance.objects(employee=employee, date=current_date_ist).first()
-
-            if attendance.status == 'absent':
-                return Response({
-                    "error": "Cannot check in, marked absent for today"
-                }, status=400)
-            
-            # FALLBACK: Create if doesn't exist
-            if not attendance:
-                print(f"⚠️  No attendance record found for {employee.firstName}, creating now...")
-                attendance = Attendance(
-                    employee=employee,
-                    date=current_date_ist,
-                    status='pending',
-                    created_at=current_datetime_ist,
-                    updated_at=current_datetime_ist
-                )
-            
-            # Check if already checked in
-            if attendance.check_in_time:
-                return Response({
-                    "error": "Already checked in today",
-                    "check_in_time": format_time_display(attendance.check_in_time)
-                }, status=400)
-            
             # Extract location data
             location_data = self.extract_location_data(request)
             
-            # Determine check-in status (compare time strings)
-            attendance_status = self.determine_checkin_status(
-                attendance,
-                current_time_ist, 
-                employee.shiftId.fromTime,
-                employee.shiftId.lateMarkTime
-            )
-            print(f"✅ Check-in status: {attendance_status}")
+            # One atomic upsert on (employee, date); status computed by the update
+            try:
+                attendance, created = check_in(
+                    emp_id,
+                    shift,
+                    current_date_ist,
+                    current_time_ist,
+                    current_datetime_ist,
+                    {
+                        "check_in_location": location_data.get('address', 'Unknown Location'),
+                        "check_in_latitude": location_data.get('latitude'),
+                        "check_in_longitude": location_data.get('longitude'),
+                        "check_in_geofence": check_geofence(org_id, location_data.get('latitude'), location_data.get('longitude')),
+                        "check_in_device": self.detect_device_type(request),
+                        "check_in_ip": self.get_client_ip(request),
+                    },
+                    snapshot=snapshot_for_user(request.user)
+                )
+            except PunchRejected as e:
+                return Response({"error": str(e)}, status=400)
+            
+            if created and location_data.get('deferred'):
+                enqueue_location(attendance["_id"], "check_in", location_data['latitude'], location_data['longitude'])
             
-            # Update attendance record (Store as string in IST)
-            attendance.check_in_time = current_time_ist
-            attendance.check_in_location = location_data.get('address', 'Unknown Location')
-            attendance.check_in_device = self.detect_device_type(request)
-            attendance.check_in_ip = self.get_client_ip(request)
-            attendance.status = attendance_status
-            attendance.updated_at = current_datetime_ist
-            attendance.save()  # MongoEngine save
+            print(f"✅ Check-in status: {attendance['status']}" + ("" if created else " (repeated tap)"))
             
-            # Return response (already in IST)
+            # Return response (already in IST); a repeated tap gets the
+            # stored check-in back
+            check_in_time_str = attendance["check_in_time"]
             return Response({
-                "message": "Check-in successful",
-                "status": attendance_status,
-                "location": location_data.get('address', 'Unknown Location'),
-                "check_in_time": format_time_display(current_time_ist),  # 12-hour format
+                "message": "Check-in successful" if created else "Already checked in today",
+                "already_checked_in": not created,
+                "status": attendance["status"],
+                "location": attendance.get("check_in_location"),
+                "check_in_time": format_time_display(check_in_time_str),  # 12-hour format
                 "check_in_date": format_date_display(current_date_ist),  # DD-MM-YYYY
-                "check_in_datetime": format_datetime_display(current_datetime_ist),  # Full display
+                "check_in_datetime": format_datetime_display(f"{current_date_ist} {check_in_time_str}"),  # Full display
                 "timezone": "Asia/Kolkata (IST)",
-                "is_late": attendance.is_late,
-                "latemark_time": format_time_display(employee.shiftId.lateMarkTime),
+                "is_late": attendance.get("is_late", False),
+                "latemark_time": format_time_display(shift.late_mark_time),
                 "location_details": {
-                    "address": location_data.get('address', 'Unknown Location'),
-                    "latitude": location_data.get('latitude'),
-                    "longitude": location_data.get('longitude'),
-                    "accuracy": location_data.get('accuracy')
+                    "address": attendance.get("check_in_location"),
+                    "latitude": attendance.get("check_in_latitude"),
+                    "longitude": attendance.get("check_in_longitude"),
+                    "accuracy": location_data.get('accuracy'),
+                    "geofence": attendance.get("check_in_geofence"),
+                    "pending": created and location_data.get('deferred', False)
                 }
             })
             
-        except Employee.DoesNotExist:
-            return Response({"error": "Employee not found"}, status=404)
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -1134,116 +1285,32 @@ class CheckInView(APIView):
             None
         )
         
+        deferred = False
         if latitude and longitude and not address:
-            address = self.reverse_geocode(float(latitude), float(longitude))
+            if getattr(settings, "LOCATION_ENRICHMENT_ENABLED", True):
+                # Only resolved here when no geocoder call is needed; the
+                # rest is filled in after the response (Employee.location_enrichment)
+                address, deferred = locate(float(latitude), float(longitude))
+            else:
+                address = self.reverse_geocode(float(latitude), float(longitude))
         
         return {
             'address': address or 'Unknown Location',
             'latitude': float(latitude) if latitude else None,
             'longitude': float(longitude) if longitude else None,
-            'accuracy': data.get('accuracy', 0)
+            'accuracy': data.get('accuracy', 0),
+            'deferred': deferred
         }
     
     def reverse_geocode(self, lat, lng):
-        """Convert coordinates to area name using OpenStreetMap"""
+        """Convert coordinates to area name (synchronous lookup)"""
         try:
-            url = "https://nominatim.openstreetmap.org/reverse"
-            params = {
-                'lat': lat,
-                'lon': lng,
-                'format': 'json',
-                'addressdetails': 1
-            }
-            headers = {'User-Agent': 'HRMS-App/1.0'}
-            
-            response = requests.get(url, params=params, headers=headers, timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                address_data = data.get('address', {})
-                
-                area = (
-                    address_data.get('suburb') or
-                    address_data.get('neighbourhood') or
-                    address_data.get('city_district') or
-                    address_data.get('village') or
-                    address_data.get('town') or
-                    address_data.get('city') or
-                    None
-                )
-                
-                if area:
-                    city = address_data.get('city', 'Pune')
-                    return f"{area}, {city}"
-                
-                return self.extract_area_from_address(data.get('display_name', ''))
+            return describe_location(reverse_geocode(lat, lng), lat, lng)
         except Exception as e:
             print(f"❌ Reverse geocoding failed: {e}")
         
         return f"{lat}, {lng}"
-    
-    def extract_area_from_address(self, full_address):
-        """Extract area name from full address"""
-        known_areas = [
-            'Wakad', 'Baner', 'Katraj', 'Tathawade', 'Thergaon', 'Hinjewadi',
-            'Kothrud', 'Aundh', 'Viman Nagar', 'Koregaon Park', 'Hadapsar',
-            'Magarpatta', 'Wagholi', 'Ravet', 'Akurdi', 'Nigdi', 'Chinchwad',
-            'Pimple Saudagar', 'Bavdhan', 'Pashan', 'Sus', 'Mahalunge'
-        ]
-        
-        parts = full_address.split(', ')
-        
-        for part in parts:
-            for area in known_areas:
-                if area.lower() in part.lower():
-                    return area
-        
-        if len(parts) >= 4:
-            return parts[3].strip()
-        elif len(parts) >= 3:
-            return parts[2].strip()
-        
-        return parts[0].strip() if parts else full_address
-
-    def determine_checkin_status(self, attendance, checkin_time_str, from_time_str, late_mark_time_str):
-        """
-        Determine check-in status based on shift times (IST, 24-hour)
-
-        Rules:
-        - Before or at fromTime  → PRESENT (is_late = False)
-        - After fromTime         → PRESENT (is_late = True)
-        """
-        print(f"🕐 Check-in time : {checkin_time_str}")
-        print(f"🕐 Shift start   : {from_time_str}")
-        print(f"🕐 Late mark     : {late_mark_time_str}")
-
-        # If check-in is before or at shift start time
-        if checkin_time_str <= from_time_str:
-            if attendance.status == 'wfh':
-                attendance.is_late = False
-                attendance.is_onWFH = True
-                attendance.save()
-                print("✅ Status: PRESENT (On Time)")
-                return "wfh"
-            else:
-                print("✅ Status: PRESENT (On Time)")
-                attendance.is_late = False
-                attendance.save()
-                return "present"
-        else:
-            if attendance.status == 'wfh':
-                attendance.is_late = True
-                attendance.is_onWFH = True
-                attendance.save()
-                print("⚠️ Status: PRESENT (Late)")
-                return "wfh"    
-            else:
-                # Check-in after shift start time
-                print("⚠️ Status: PRESENT (Late)")
-                attendance.is_late = True
-                attendance.save()
-                return "present"
-    
+
     def detect_device_type(self, request):
         """Detect device type from request headers"""
         user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
@@ -1272,11 +1339,11 @@ class CheckOutView(APIView):
     - Calculates work hours from string times
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [AttendancePunchRateThrottle]
     
     def post(self, request):
         try:
-            # Get employee using MongoEngine
-            employee = Employee.objects.get(id=request.user.id)
+            emp_id, shift_id, org_id = punch_identity(request.user)
             
             # Get current IST date and time as strings
             current_date_ist = get_current_date_ist()  # "YYYY-MM-DD"
@@ -1286,71 +1353,67 @@ class CheckOutView(APIView):
             print(f"✅ Check-out date (IST): {current_date_ist}")
             print(f"✅ Check-out time (IST): {current_time_ist}")
             
-            # Get today's attendance record (MongoEngine query)
-            attendance = Attendance.objects(employee=employee, date=current_date_ist).first()
-            
-            if not attendance or not attendance.check_in_time:
-                return Response({
-                    "error": "No check-in record found for today. Please check-in first."
-                }, status=400)
-            
-            if attendance.check_out_time:
-                return Response({
-                    "error": "Already checked out today",
-                    "check_out_time": format_time_display(attendance.check_out_time)
-                }, status=400)
-            
             # Extract location data
             location_data = self.extract_location_data(request)
             
-            # Get check_in time (already string in IST)
-            check_in_time_str = attendance.check_in_time
-            
-            print(f"🕐 Check-in time: {check_in_time_str}")
-            print(f"🕐 Check-out time: {current_time_ist}")
+            # One atomic update; work hours and status computed by the update
+            # from the stored check-in time
+            try:
+                attendance, created = check_out(
+                    emp_id,
+                    current_date_ist,
+                    current_time_ist,
+                    current_datetime_ist,
+                    {
+                        "check_out_location": location_data.get('address', 'Unknown Location'),
+                        "check_out_latitude": location_data.get('latitude'),
+                        "check_out_longitude": location_data.get('longitude'),
+                        "check_out_geofence": check_geofence(org_id, location_data.get('latitude'), location_data.get('longitude')),
+                        "check_out_device": self.detect_device_type(request),
+                        "check_out_ip": self.get_client_ip(request),
+                    },
+                    # Overnight shifts close the previous day's row
+                    shift=get_compiled_shift(shift_id)
+                )
+            except PunchRejected as e:
+                return Response({"error": str(e)}, status=400)
             
-            # Calculate work hours (using string times)
-            work_hours = calculate_work_hours(check_in_time_str, current_time_ist, current_date_ist)
-            work_duration_display = calculate_work_duration_display(check_in_time_str, current_time_ist)
+            if created and location_data.get('deferred'):
+                enqueue_location(attendance["_id"], "check_out", location_data['latitude'], location_data['longitude'])
             
-            print(f"⏱️  Total work hours: {work_hours} hours ({work_duration_display})")
+            check_in_time_str = attendance["check_in_time"]
+            check_out_time_str = attendance["check_out_time"]
+            work_hours = attendance.get("total_work_hours", 0.0)
+            work_duration_display = calculate_work_duration_display(check_in_time_str, check_out_time_str)
             
-            # Determine final status based on work hours
-            attendance_status = self.determine_status(work_hours,attendance)
-
-            # Update attendance record (Store as string in IST)
-            attendance.check_out_time = current_time_ist
-            attendance.check_out_location = location_data.get('address', 'Unknown Location')
-            attendance.check_out_device = self.detect_device_type(request)
-            attendance.check_out_ip = self.get_client_ip(request)
-            attendance.total_work_hours = work_hours
-            attendance.status = attendance_status
-            attendance.updated_at = current_datetime_ist
-            attendance.save()  # MongoEngine save
+            print(f"⏱️  Total work hours: {work_hours} hours ({work_duration_display}), "
+                  f"status: {attendance['status']}" + ("" if created else " (repeated tap)"))
             
-            # Return response (already in IST)
+            # Return response (already in IST); a repeated tap gets the
+            # stored check-out back
             return Response({
-                "message": "Check-out successful",
-                "status": attendance_status,
-                "location": location_data.get('address', 'Unknown Location'),
+                "message": "Check-out successful" if created else "Already checked out today",
+                "already_checked_out": not created,
+                "status": attendance["status"],
+                "location": attendance.get("check_out_location"),
                 "check_in_time": format_time_display(check_in_time_str),  # 12-hour format
-                "check_out_time": format_time_display(current_time_ist),  # 12-hour format
+                "check_out_time": format_time_display(check_out_time_str),  # 12-hour format
                 "check_out_date": format_date_display(current_date_ist),  # DD-MM-YYYY
-                "check_out_datetime": format_datetime_display(current_datetime_ist),  # Full display
+                "check_out_datetime": format_datetime_display(f"{current_date_ist} {check_out_time_str}"),  # Full display
                 "total_work_hours": work_hours,
                 "work_duration": work_duration_display,
                 "timezone": "Asia/Kolkata (IST)",
                 "is_completed": True,
                 "location_details": {
-                    "address": location_data.get('address', 'Unknown Location'),
-                    "latitude": location_data.get('latitude'),
-                    "longitude": location_data.get('longitude'),
-                    "accuracy": location_data.get('accuracy')
+                    "address": attendance.get("check_out_location"),
+                    "latitude": attendance.get("check_out_latitude"),
+                    "longitude": attendance.get("check_out_longitude"),
+                    "accuracy": location_data.get('accuracy'),
+                    "geofence": attendance.get("check_out_geofence"),
+                    "pending": created and location_data.get('deferred', False)
                 }
             })
             
-        except Employee.DoesNotExist:
-            return Response({"error": "Employee not found"}, status=404)
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -1370,104 +1433,32 @@ class CheckOutView(APIView):
             None
         )
         
+        deferred = False
         if latitude and longitude and not address:
-            address = self.reverse_geocode(float(latitude), float(longitude))
+            if getattr(settings, "LOCATION_ENRICHMENT_ENABLED", True):
+                # Only resolved here when no geocoder call is needed; the
+                # rest is filled in after the response (Employee.location_enrichment)
+                address, deferred = locate(float(latitude), float(longitude))
+            else:
+                address = self.reverse_geocode(float(latitude), float(longitude))
         
         return {
             'address': address or 'Unknown Location',
             'latitude': float(latitude) if latitude else None,
             'longitude': float(longitude) if longitude else None,
-            'accuracy': data.get('accuracy', 0)
+            'accuracy': data.get('accuracy', 0),
+            'deferred': deferred
         }
     
     def reverse_geocode(self, lat, lng):
-        """Convert coordinates to area name using OpenStreetMap"""
+        """Convert coordinates to area name (synchronous lookup)"""
         try:
-            url = "https://nominatim.openstreetmap.org/reverse"
-            params = {
-                'lat': lat,
-                'lon': lng,
-                'format': 'json',
-                'addressdetails': 1
-            }
-            headers = {'User-Agent': 'HRMS-App/1.0'}
-            
-            response = requests.get(url, params=params, headers=headers, timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                address_data = data.get('address', {})
-                
-                area = (
-                    address_data.get('suburb') or
-                    address_data.get('neighbourhood') or
-                    address_data.get('city_district') or
-                    address_data.get('village') or
-                    address_data.get('town') or
-                    address_data.get('city') or
-                    None
-                )
-                
-                if area:
-                    city = address_data.get('city', 'Pune')
-                    return f"{area}, {city}"
-                
-                return self.extract_area_from_address(data.get('display_name', ''))
+            return describe_location(reverse_geocode(lat, lng), lat, lng)
         except Exception as e:
             print(f"❌ Reverse geocoding failed: {e}")
         
         return f"{lat}, {lng}"
-    
-    def extract_area_from_address(self, full_address):
-        """Extract area name from full address"""
-        known_areas = [
-            'Wakad', 'Baner', 'Katraj', 'Tathawade', 'Thergaon', 'Hinjewadi',
-            'Kothrud', 'Aundh', 'Viman Nagar', 'Koregaon Park', 'Hadapsar',
-            'Magarpatta', 'Wagholi', 'Ravet', 'Akurdi', 'Nigdi', 'Chinchwad',
-            'Pimple Saudagar', 'Bavdhan', 'Pashan', 'Sus', 'Mahalunge'
-        ]
-        
-        parts = full_address.split(', ')
-        
-        for part in parts:
-            for area in known_areas:
-                if area.lower() in part.lower():
-                    return area
-        
-        if len(parts) >= 4:
-            return parts[3].strip()
-        elif len(parts) >= 3:
-            return parts[2].strip()
-        
-        return parts[0].strip() if parts else full_address
-
-    def determine_status(self, work_hours, attendance):
-        """
-        Determine final attendance status based on total work hours
-        
-        Rules:
-        - Less than 5 hours      → ABSENT
-        - 5 to less than 9 hours → HALF_DAY
-        - 9 hours or more        → PRESENT
-        
-        Note: is_late flag from check-in is preserved separately
-        """
-        print(f"📊 Calculating status: work_hours={work_hours}")
-        
-        if work_hours < 5:
-            # Less than 5 hours = absent
-            print("❌ Status: ABSENT (worked < 5 hours)")
-            return "absent"
-        elif work_hours >= 5 and work_hours < 9:
-            # Between 5-9 hours = half day
-            print("⚠️ Status: HALF_DAY (worked 5-9 hours)")
-            return "half_day"
-        else:
-            # 9+ hours = present
-            print("✅ Status: PRESENT (worked 9+ hours)")
-            attendance.is_late = False  # Override late status if they worked full hours
-            return "present"
-    
+
     def detect_device_type(self, request):
         """Detect device type from request headers"""
         user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
@@ -1493,6 +1484,30 @@ class CheckOutView(APIView):
 # ATTENDANCE LIST AND MANAGEMENT VIEWS
 # ============================================================================
 
+#API END POINT = api/employee/Attendance/location-backlog/
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated, IsAdmin])
+def location_backlog_view(request):
+    """
+    Punch locations waiting for reverse geocoding (Employee.location_enrichment)
+    GET:  queue summary and recent failures
+    POST: put failed jobs back in the queue
+    """
+    if request.method == "POST":
+        requeued = retry_failed_locations()
+        return Response({
+            "statusCode": 200,
+            "message": f"{requeued} failed location jobs requeued",
+            "data": location_backlog()
+        }, status=status.HTTP_200_OK)
+
+    return Response({
+        "statusCode": 200,
+        "message": "Location enrichment backlog fetched successfully",
+        "data": location_backlog()
+    }, status=status.HTTP_200_OK)
+
+
 class TodayAttendanceView(APIView):
     """Get today's attendance for all employees (HR/Admin only)"""
     permission_classes = [IsAuthenticated, IsHR | IsAdmin]
@@ -1511,7 +1526,7 @@ class TodayAttendanceView(APIView):
 
             attendances = Attendance.objects.filter(date=today_date)
 
-            serializer = AttendanceSerializer(attendances, many=True)
+            serializer = AttendanceSnapshotSerializer(attendances, many=True)
             return Response({
                 "date": today_date,
                 "present_count": attendances.filter(status="present").count(),
@@ -1584,9 +1599,11 @@ class EmployeeProfileDataView(APIView):
 class OverallAttendanceListView(ListAPIView):
     """Get overall attendance for all employees (HR/Admin only)"""
     pagination_class = CustomPagination
+    # Keyset pagination with ?cursor= for deep pages (see CustomPagination)
+    cursor_ordering = ("-date", "-id")
     
     def get(self, request):
-        user = Employee.objects.get(id=request.user.id)
+        user = get_request_employee(request, refs=None)
 
         if user.role == "hr" or user.role == "admin":
             # Get all attendance records
@@ -1595,11 +1612,15 @@ class OverallAttendanceListView(ListAPIView):
             # Apply date filters
             attendance = apply_date_filters(attendance, request)
             
+            # Sparse fieldset (?fields=)
+            fields = get_requested_fields(request)
+            attendance = sparse_queryset(attendance, AttendanceSnapshotSerializer, fields, view=self)
+            
             # Apply pagination
             paginated_attendance = self.paginate_queryset(attendance)
             
             # Serialize paginated data
-            serializer = AttendanceSerializer(paginated_attendance, many=True)
+            serializer = AttendanceSnapshotSerializer(paginated_attendance, many=True, fields=fields)
             
             # Return paginated response
             return self.get_paginated_response(serializer.data)
@@ -1614,8 +1635,9 @@ from Employee.models import Employee
 
 class EmpAttendanceListView(ListAPIView):
     """Get attendance records for a specific employee"""
-    serializer_class = AttendanceSerializer
+    serializer_class = AttendanceSnapshotSerializer
     pagination_class = CustomPagination
+    cursor_ordering = ("-date", "-id")
 
     def get(self, request, pk):
         # Get attendance records for the specific employee
@@ -1624,11 +1646,12 @@ class EmpAttendanceListView(ListAPIView):
         # Apply date filters
         queryset = apply_date_filters(queryset, request)
 
-        # Get all employees list
-        employees_list = [
-            {"id": str(emp.id), "name": f"{emp.firstName} {emp.lastName}"}
-            for emp in Employee.objects.only("id", "firstName", "lastName")
-        ]
+        # Sparse fieldset (?fields=)
+        fields = get_requested_fields(request)
+        queryset = sparse_queryset(queryset, self.serializer_class, fields, view=self)
+
+        # Cached employees lookup (omitted with ?lookups=false)
+        employees_list = get_lookups("employees")["employees"] if wants_lookups(request) else None
 
         # Check if no records found
         if queryset.count() == 0:
@@ -1641,20 +1664,21 @@ class EmpAttendanceListView(ListAPIView):
                     "page": 1,
                     "pages": 0
                 },
-                "employees": employees_list
+                **({"employees": employees_list} if employees_list is not None else {})
             })
 
         # Apply pagination
         paginated_queryset = self.paginate_queryset(queryset)
         
         # Serialize paginated data
-        serializer = self.serializer_class(paginated_queryset, many=True)
+        serializer = self.serializer_class(paginated_queryset, many=True, fields=fields)
 
         # Get paginated response
         response = self.get_paginated_response(serializer.data)
         
         # Add employees list to response
-        response.data['employees'] = employees_list
+        if employees_list is not None:
+            response.data['employees'] = employees_list
 
         # Return paginated response with employees list
         return response
@@ -1728,7 +1752,7 @@ class EmpMarkAllView(ListAPIView):
 
     def post(self, request):
         """Validate attendance records for the filtered date/month/year"""
-        user = Employee.objects.get(id=request.user.id)
+        user = get_request_employee(request, refs=None)
         
         if user.role not in ["hr", "admin"]:
             return Response({
@@ -1793,7 +1817,7 @@ class EmpMarkAllView(ListAPIView):
     
     def get(self, request):
         """Get attendance records for validation preview (with pagination)"""
-        user = Employee.objects.get(id=request.user.id)
+        user = get_request_employee(request, refs=None)
         
         if user.role not in ["hr", "admin"]:
             return Response({
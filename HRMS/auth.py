@@ -3,6 +3,9 @@ from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.conf import settings
 from Employee.models import Employee, TokenBlacklist
+from HRMS.revocation import revocation_cache, revocation_key
+from HRMS.identity_map import register
+from HRMS.principal_cache import principal_cache
 from bson import ObjectId
 from bson.errors import InvalidId
 
@@ -33,17 +36,6 @@ class MongoJWTAuthentication(BaseAuthentication):
         if not token:
             raise AuthenticationFailed("Token not provided.")
 
-        # Check if token is blacklisted
-        try:
-            blacklisted_token = TokenBlacklist.objects(token=token).first()
-            if blacklisted_token is not None:
-                raise AuthenticationFailed("Token has been revoked. Please login again.")
-        except Exception as e:
-            # Log the error but don't expose internal details to client
-            print(f"Error checking token blacklist: {e}")
-            # Continue with authentication even if blacklist check fails
-            pass
-
         # Decode and validate JWT token
         try:
             payload = jwt.decode(
@@ -58,28 +50,53 @@ class MongoJWTAuthentication(BaseAuthentication):
         except Exception as e:
             raise AuthenticationFailed(f"Token validation failed: {str(e)}")
 
+        # Check if token is blacklisted (by jti, or token hash for old tokens)
+        # The in-process revocation cache answers almost every request; MongoDB
+        # is only asked when the key is present in the local set.
+        key = revocation_key(token, payload)
+        try:
+            if revocation_cache.might_be_revoked(key):
+                blacklisted_token = TokenBlacklist.objects(jti=key).first()
+                if blacklisted_token is not None:
+                    raise AuthenticationFailed("Token has been revoked. Please login again.")
+        except AuthenticationFailed:
+            raise
+        except Exception as e:
+            # Log the error but don't expose internal details to client
+            print(f"Error checking token blacklist: {e}")
+            # Continue with authentication even if blacklist check fails
+            pass
+
         # Extract employee ID from payload
         emp_id = payload.get("empId")
         if not emp_id:
             raise AuthenticationFailed("Token payload is invalid. Missing employee ID.")
 
-        # Retrieve employee from MongoDB
-        try:
-            emp = Employee.objects.get(id=ObjectId(emp_id))
-        except InvalidId:
-            raise AuthenticationFailed("Invalid employee ID format.")
-        except Employee.DoesNotExist:
-            raise AuthenticationFailed("User not found. Account may have been deleted.")
-        except Exception as e:
-            print(f"Error retrieving employee: {e}")
-            raise AuthenticationFailed("Authentication failed. Please try again.")
+        # Cached principal snapshot (id, role, status) - no query on a hit
+        principal = principal_cache.get(emp_id)
+
+        if principal is None:
+            # Retrieve employee from MongoDB
+            try:
+                emp = Employee.objects.get(id=ObjectId(emp_id))
+            except InvalidId:
+                raise AuthenticationFailed("Invalid employee ID format.")
+            except Employee.DoesNotExist:
+                raise AuthenticationFailed("User not found. Account may have been deleted.")
+            except Exception as e:
+                print(f"Error retrieving employee: {e}")
+                raise AuthenticationFailed("Authentication failed. Please try again.")
+
+            # Make the loaded employee available to views without another query
+            register(emp)
+            principal = principal_cache.put(emp)
 
         # Check if employee account is active
-        if hasattr(emp, 'status') and emp.status != 'active':
+        if principal.status != 'active':
             raise AuthenticationFailed("Account is inactive. Please contact administrator.")
 
         # Return user and token (DRF expects a tuple)
-        return (emp, token)
+        return (principal, token)
 
     def authenticate_header(self, request):
         """
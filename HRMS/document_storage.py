@@ -0,0 +1,302 @@
+# HRMS/document_storage.py
+"""
+Content-addressed, reference-counted storage for employee documents
+
+Uploads are streamed in fixed-size chunks (DOCUMENT_STORAGE_CHUNK_SIZE)
+to a temporary object while their SHA-256 is computed, then committed to
+
+    <folder>/<sha256[:2]>/<sha256><ext>     e.g. documents/pan/3f/3fa2...e1.pdf
+
+where <folder> comes from DOCUMENT_FOLDERS. Uploading the same file twice
+stores it once.
+
+Every employee document slot pointing at a path holds one reference,
+counted in the `stored_files` collection (StoredFile). release() drops a
+reference and deletes the bytes when the last one goes, so replaced
+documents are garbage-collected. While it deletes them the row is kept
+as a tombstone (`deleting`); a save of the same content waits for the
+row to go before counting a new reference and committing the bytes. Paths written before content addressing
+have no StoredFile row and belong to a single slot; releasing them
+deletes the file directly. Files generated from a stored file (photo
+thumbnails) are recorded on its row as `derived` and deleted with it.
+
+The bytes live in a backend chosen by settings.DOCUMENT_STORAGE_BACKEND:
+- LocalFileSystemBackend:  files under MEDIA_ROOT (default)
+
+Backend interface (an object store implements the same methods):
+    write_temp(chunks) -> token     stream chunks into a temporary object
+    commit(token, path) -> bool     move it to `path` (False: already there)
+    discard(token)                  drop an uncommitted temporary object
+    open(path) / exists(path) / delete(path)
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from mongoengine.errors import NotUniqueError
+
+from utils.timezone_utils import get_current_datetime_ist
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+MAX_EXTENSION_LENGTH = 10
+# How long save() waits for a release deleting the same path
+SAVE_RETRIES = 50
+SAVE_RETRY_DELAY = 0.1
+
+
+def clean_extension(filename):
+    """Lower-case extension of an uploaded file name, special characters removed"""
+    ext = os.path.splitext(filename or "")[1].lower()
+    ext = "".join(c for c in ext if c.isalnum())
+    return f".{ext[:MAX_EXTENSION_LENGTH]}" if ext else ""
+
+
+def content_path(folder, digest, ext):
+    """Storage path of a document with the given SHA-256"""
+    return f"{folder.rstrip('/')}/{digest[:2]}/{digest}{ext}"
+
+
+# ============================================================================
+# STORAGE BACKENDS
+# ============================================================================
+
+class LocalFileSystemBackend:
+    """Documents as files under MEDIA_ROOT"""
+
+    def __init__(self, root=None):
+        self.root = root or settings.MEDIA_ROOT
+        self.temp_dir = os.path.join(self.root, ".incoming")
+
+    def _full_path(self, path):
+        return os.path.join(self.root, path)
+
+    def write_temp(self, chunks):
+        # Same filesystem as the final location so commit() is a rename
+        os.makedirs(self.temp_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.temp_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as destination:
+                for chunk in chunks:
+                    destination.write(chunk)
+        except Exception:
+            self.discard(temp_path)
+            raise
+        return temp_path
+
+    def commit(self, token, path):
+        full_path = self._full_path(path)
+        if os.path.exists(full_path):
+            self.discard(token)
+            return False
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.chmod(token, getattr(settings, "FILE_UPLOAD_PERMISSIONS", None) or 0o644)
+        os.replace(token, full_path)
+        return True
+
+    def discard(self, token):
+        try:
+            os.remove(token)
+        except FileNotFoundError:
+            pass
+
+    def open(self, path):
+        return open(self._full_path(path), "rb")
+
+    def exists(self, path):
+        return os.path.exists(self._full_path(path))
+
+    def delete(self, path):
+        try:
+            os.remove(self._full_path(path))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+_backends = {}
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the configured storage backend (instantiated once per process)"""
+    path = getattr(settings, "DOCUMENT_STORAGE_BACKEND", "HRMS.document_storage.LocalFileSystemBackend")
+    backend = _backends.get(path)
+    if backend is None:
+        with _backend_lock:
+            backend = _backends.get(path)
+            if backend is None:
+                backend = _backends[path] = import_string(path)()
+    return backend
+
+
+# ============================================================================
+# DOCUMENT STORE
+# ============================================================================
+
+class DocumentStore:
+    """Saves uploads by content and keeps the reference counts"""
+
+    def __init__(self, backend=None, chunk_size=None):
+        self._backend = backend
+        self.chunk_size = chunk_size
+
+    @property
+    def backend(self):
+        return self._backend or get_backend()
+
+    def _chunk_size(self):
+        return self.chunk_size or getattr(settings, "DOCUMENT_STORAGE_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+
+    def save(self, file_obj, folder):
+        """
+        Stream an uploaded file into storage and take a reference to it
+        Returns the storage path to keep on the document slot.
+        """
+        from Employee.models import StoredFile
+
+        backend = self.backend
+        hasher = hashlib.sha256()
+        size = 0
+
+        def hashed_chunks():
+            nonlocal size
+            for chunk in file_obj.chunks(self._chunk_size()):
+                hasher.update(chunk)
+                size += len(chunk)
+                yield chunk
+
+        token = backend.write_temp(hashed_chunks())
+        digest = hasher.hexdigest()
+        path = content_path(folder, digest, clean_extension(file_obj.name))
+
+        try:
+            self._count_reference(path, digest, size)
+        except Exception:
+            backend.discard(token)
+            raise
+
+        try:
+            created = backend.commit(token, path)
+        except Exception:
+            backend.discard(token)
+            self.release(path)
+            raise
+
+        print(f"{'💾 Stored' if created else '♻️  Deduplicated'} {path} ({size} bytes)")
+        return path
+
+    def _count_reference(self, path, digest, size):
+        """
+        Add a reference to the StoredFile row of `path`, creating it if needed
+        A row being deleted by release() is not matched, and the upsert
+        conflicts with it on the unique path, so we wait for it to be gone:
+        once a live row is counted, no release can delete the bytes before
+        commit() and commit() keeping existing bytes is safe.
+        """
+        from Employee.models import StoredFile
+
+        for attempt in range(SAVE_RETRIES):
+            now = get_current_datetime_ist()
+            try:
+                return StoredFile.objects(path=path, deleting__ne=True).modify(
+                    upsert=True,
+                    new=True,
+                    inc__ref_count=1,
+                    set__updated_at=now,
+                    set_on_insert__sha256=digest,
+                    set_on_insert__size=size,
+                    set_on_insert__created_at=now
+                )
+            except NotUniqueError:
+                # Being deleted, or inserted by a concurrent save
+                time.sleep(SAVE_RETRY_DELAY)
+        raise RuntimeError(f"{path} is still being deleted")
+
+    def retain(self, path):
+        """Take another reference to an already stored path (no-op for untracked paths)"""
+        from Employee.models import StoredFile
+
+        if not path:
+            return False
+        now = get_current_datetime_ist()
+        return bool(StoredFile.objects(path=path, deleting__ne=True).update_one(
+            inc__ref_count=1, set__updated_at=now
+        ))
+
+    def release(self, path):
+        """Drop one reference; delete the bytes when none are left"""
+        from Employee.models import StoredFile
+
+        if not path:
+            return
+        now = get_current_datetime_ist()
+        try:
+            row = StoredFile.objects(path=path).modify(
+                new=True, dec__ref_count=1, set__updated_at=now
+            )
+            if row is None:
+                # Stored before content addressing, owned by one slot only
+                if self.backend.delete(path):
+                    print(f"🗑️  Deleted untracked file: {path}")
+                return
+            if row.ref_count > 0:
+                return
+            # Tombstone the row while the bytes go: a save in between would
+            # otherwise count a new row and keep the bytes we are deleting
+            row = StoredFile.objects(path=path, ref_count__lte=0, deleting__ne=True).modify(
+                new=True, set__deleting=True, set__updated_at=now
+            )
+            if row is None:
+                return
+            try:
+                for derived_path in row.derived or []:
+                    self.backend.delete(derived_path)
+                self.backend.delete(path)
+            finally:
+                StoredFile.objects(path=path, deleting=True).delete()
+            print(f"🗑️  Deleted unreferenced file: {path}")
+        except Exception as e:
+            print(f"⚠️  Warning: Could not release {path}: {e}")
+
+    def store_derived(self, source_path, path, chunks):
+        """
+        Store a file generated from `source_path` (deleted together with it)
+        Returns False, and stores nothing, if the source no longer exists.
+        """
+        from Employee.models import StoredFile
+
+        backend = self.backend
+        backend.commit(backend.write_temp(chunks), path)
+        if StoredFile.objects(path=source_path, deleting__ne=True).update_one(add_to_set__derived=path):
+            return True
+        if not StoredFile.objects(path=source_path).count() and backend.exists(source_path):
+            # Untracked (pre content addressing) source, untracked copy
+            return True
+        # Source released meanwhile - do not leave the file behind
+        backend.delete(path)
+        return False
+
+    def release_many(self, paths):
+        for path in paths:
+            self.release(path)
+
+    def replace_references(self, old_paths, new_paths, uploaded=()):
+        """
+        Move references from the old slot values to the new ones
+        old_paths / new_paths: {slot: path}. Slots in `uploaded` already got
+        their reference from save(); other changed slots are retained.
+        """
+        for slot, path in new_paths.items():
+            if path and slot not in uploaded and path != old_paths.get(slot):
+                self.retain(path)
+        for slot, path in old_paths.items():
+            if path and (slot in uploaded or new_paths.get(slot) != path):
+                self.release(path)
+
+
+document_store = DocumentStore()
@@ -0,0 +1,131 @@
+# HRMS/gazetteer.py
+"""
+Offline geocoder for the areas we serve
+
+A bundled gazetteer (GAZETTEER_PATH, default HRMS/data/pune_areas.json)
+lists area centroids, each covering `radius_km` around it (or the file's
+`default_radius_km`). Centroids are bucketed into a lat/lng grid whose
+cells are at least as wide as the largest radius, so a lookup only
+measures the areas in the 3x3 cells around the point: microseconds, no
+network.
+
+A point resolves to the nearest centroid whose radius covers it. Points
+outside every area return None, and HRMS.geocoding falls back to the
+Nominatim cache.
+
+    {"name": "...", "default_radius_km": 1.5,
+     "areas": [{"name": "Wakad", "city": "Pimpri-Chinchwad",
+                "lat": 18.5985, "lng": 73.7654, "radius_km": 2.0}, ...]}
+"""
+import json
+import math
+import os
+import threading
+
+from django.conf import settings
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), "data", "pune_areas.json")
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class Area:
+    __slots__ = ("name", "city", "lat", "lng", "radius_km")
+
+    def __init__(self, name, city, lat, lng, radius_km):
+        self.name = name
+        self.city = city
+        self.lat = lat
+        self.lng = lng
+        self.radius_km = radius_km
+
+    def __repr__(self):
+        return f"<Area {self.name}, {self.city}>"
+
+
+class Gazetteer:
+    """Grid index over area centroids"""
+
+    def __init__(self, areas):
+        self.areas = list(areas)
+        max_radius = max((area.radius_km for area in self.areas), default=1.0)
+        max_lat = max((abs(area.lat) for area in self.areas), default=0.0)
+        # A degree of longitude is shorter than one of latitude away from
+        # the equator; size cells for the narrowest one in the gazetteer
+        self.cell_degrees = max_radius / (KM_PER_DEGREE * math.cos(math.radians(min(max_lat + 1, 89))))
+        self._grid = {}
+        for area in self.areas:
+            self._grid.setdefault(self._cell(area.lat, area.lng), []).append(area)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as stream:
+            data = json.load(stream)
+        default_radius = float(data.get("default_radius_km", 1.5))
+        return cls(
+            Area(
+                row["name"],
+                row.get("city", ""),
+                float(row["lat"]),
+                float(row["lng"]),
+                float(row.get("radius_km", default_radius)),
+            )
+            for row in data.get("areas", [])
+        )
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def resolve(self, lat, lng):
+        """Nearest area covering the point, or None"""
+        row, col = self._cell(lat, lng)
+        best, best_distance = None, None
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                for area in self._grid.get((row + d_row, col + d_col), ()):
+                    distance = haversine_km(lat, lng, area.lat, area.lng)
+                    if distance <= area.radius_km and (best is None or distance < best_distance):
+                        best, best_distance = area, distance
+        return best
+
+
+_gazetteer = None
+_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Gazetteer loaded from GAZETTEER_PATH (once per process)"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.load(getattr(settings, "GAZETTEER_PATH", None) or DEFAULT_GAZETTEER_PATH)
+    return _gazetteer
+
+
+def resolve_area(latitude, longitude):
+    """
+    Offline reverse geocode in the Nominatim response shape used by the
+    views ({"address": {"suburb", "city"}, "display_name"}), or None
+    """
+    try:
+        area = get_gazetteer().resolve(float(latitude), float(longitude))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Gazetteer unavailable: {e}")
+        return None
+    if area is None:
+        return None
+    return {
+        "address": {"suburb": area.name, "city": area.city},
+        "display_name": f"{area.name}, {area.city}" if area.city else area.name,
+    }
@@ -0,0 +1,263 @@
+# HRMS/geocoding.py
+"""
+Cached reverse geocoding for check-in / check-out
+
+Points inside the areas of the offline gazetteer (HRMS.gazetteer) are
+resolved locally without any network call. Outside them, Nominatim is
+the fallback. Punches come from a handful of office buildings, so
+coordinates are bucketed into geohash cells (GEOCODE_CACHE_PRECISION
+characters, 7 is roughly 150 m x 150 m) and Nominatim is asked once per
+cell:
+
+1. in-process LRU (GEOCODE_CACHE_MAX_ENTRIES cells)
+2. `geocode_cells` collection, shared by all workers (TTL index,
+   GEOCODE_CACHE_TTL_DAYS)
+3. Nominatim - concurrent lookups of the same cell wait for the first
+   one instead of each calling out (single-flight)
+
+Only the parts of the Nominatim response the views use are kept:
+{"address": {...}, "display_name": "..."}. Failed lookups are not cached.
+Lookups made with rate_limited=True (the location enrichment worker) are
+spaced at least GEOCODER_MIN_INTERVAL_SECONDS apart per process (the
+Nominatim usage policy allows one request per second); lookups on a
+request thread are never delayed by it.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import requests
+from django.conf import settings
+
+from HRMS.gazetteer import resolve_area
+from utils.timezone_utils import get_current_datetime_ist
+
+
+NOMINATIM_REVERSE_URL = "https://nominatim.openstreetmap.org/reverse"
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(latitude, longitude, precision=7):
+    """Standard base32 geohash of a point"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        coord, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if coord >= middle:
+            value |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+_rate_lock = threading.Lock()
+_next_call_at = 0.0
+
+
+def reserve_rate_slot():
+    """Take the next geocoder slot of this process; seconds to wait for it"""
+    global _next_call_at
+    interval = getattr(settings, "GEOCODER_MIN_INTERVAL_SECONDS", 1.0)
+    with _rate_lock:
+        now = time.monotonic()
+        wait = _next_call_at - now
+        _next_call_at = max(now, _next_call_at) + interval
+    return max(wait, 0.0)
+
+
+def nominatim_reverse(latitude, longitude):
+    """One Nominatim reverse lookup; compact response or None"""
+    try:
+        response = requests.get(
+            NOMINATIM_REVERSE_URL,
+            params={
+                'lat': latitude,
+                'lon': longitude,
+                'format': 'json',
+                'addressdetails': 1
+            },
+            headers={'User-Agent': getattr(settings, "GEOCODER_USER_AGENT", "HRMS-App/1.0")},
+            timeout=getattr(settings, "GEOCODER_TIMEOUT_SECONDS", 5)
+        )
+        if response.status_code == 200:
+            data = response.json()
+            return {
+                "address": data.get("address", {}),
+                "display_name": data.get("display_name", ""),
+            }
+        print(f"❌ Reverse geocoding failed: HTTP {response.status_code}")
+    except Exception as e:
+        print(f"❌ Reverse geocoding failed: {e}")
+    return None
+
+
+class _Flight:
+    """A lookup in progress; followers wait on `done`"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        # Seconds the leader is queued behind the rate limit
+        self.rate_wait = 0.0
+
+
+class GeocodeCache:
+    """Per-process LRU over the geocode_cells collection, with single-flight"""
+
+    def __init__(self, precision=None, max_entries=None, ttl_days=None, fetch=None):
+        self.precision = precision or getattr(settings, "GEOCODE_CACHE_PRECISION", 7)
+        self.max_entries = max_entries or getattr(settings, "GEOCODE_CACHE_MAX_ENTRIES", 5000)
+        self.ttl_days = ttl_days or getattr(settings, "GEOCODE_CACHE_TTL_DAYS", 90)
+        self.fetch = fetch or nominatim_reverse
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # cell -> compact response
+        self._flights = {}              # cell -> _Flight
+        self.stats = {"local": 0, "stored": 0, "fetched": 0, "waited": 0}
+
+    def cell(self, latitude, longitude):
+        return geohash(float(latitude), float(longitude), self.precision)
+
+    def _get_local(self, cell):
+        with self._lock:
+            result = self._entries.get(cell)
+            if result is not None:
+                self._entries.move_to_end(cell)
+            return result
+
+    def _put_local(self, cell, result):
+        with self._lock:
+            self._entries[cell] = result
+            self._entries.move_to_end(cell)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, cell):
+        from Employee.models import GeocodeCell
+
+        try:
+            row = GeocodeCell._get_collection().find_one({"cell": cell}, {"response": 1})
+        except Exception as e:
+            print(f"Error reading geocode cache: {e}")
+            return None
+        return row.get("response") if row else None
+
+    def _store(self, cell, latitude, longitude, result):
+        from Employee.models import GeocodeCell
+
+        try:
+            GeocodeCell._get_collection().update_one(
+                {"cell": cell},
+                {
+                    "$set": {
+                        "response": result,
+                        "expires_at": datetime.now(timezone.utc) + timedelta(days=self.ttl_days),
+                    },
+                    "$setOnInsert": {
+                        "latitude": latitude,
+                        "longitude": longitude,
+                        "created_at": get_current_datetime_ist(),
+                    },
+                },
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Error writing geocode cache: {e}")
+
+    def peek(self, latitude, longitude):
+        """In-process hit only (no I/O), or None"""
+        return self._get_local(self.cell(latitude, longitude))
+
+    def reverse(self, latitude, longitude, wait_timeout=None, rate_limited=False):
+        """
+        Compact Nominatim response for a point, or None
+        rate_limited: space geocoder calls per GEOCODER_MIN_INTERVAL_SECONDS
+        (background callers only, it sleeps)
+        """
+        latitude, longitude = float(latitude), float(longitude)
+        cell = self.cell(latitude, longitude)
+
+        result = self._get_local(cell)
+        if result is not None:
+            self.stats["local"] += 1
+            return result
+
+        with self._lock:
+            flight = self._flights.get(cell)
+            leader = flight is None
+            if leader:
+                flight = self._flights[cell] = _Flight()
+
+        if not leader:
+            self.stats["waited"] += 1
+            timeout = wait_timeout or getattr(settings, "GEOCODER_TIMEOUT_SECONDS", 5) + 1
+            if not flight.done.wait(timeout):
+                # The leader may have been queued behind the rate limit
+                flight.done.wait(flight.rate_wait)
+            return flight.result
+
+        try:
+            result = self._load(cell)
+            if result is not None:
+                self.stats["stored"] += 1
+            else:
+                if rate_limited:
+                    flight.rate_wait = reserve_rate_slot()
+                    if flight.rate_wait:
+                        time.sleep(flight.rate_wait)
+                result = self.fetch(latitude, longitude)
+                self.stats["fetched"] += 1
+                if result is not None:
+                    self._store(cell, latitude, longitude, result)
+            if result is not None:
+                self._put_local(cell, result)
+            flight.result = result
+            return result
+        finally:
+            with self._lock:
+                self._flights.pop(cell, None)
+            flight.done.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+geocode_cache = GeocodeCache()
+
+
+def reverse_geocode(latitude, longitude):
+    """
+    Reverse geocode: {"address": {...}, "display_name": "..."} or None
+    Offline gazetteer first, then the cached Nominatim lookup
+    """
+    if getattr(settings, "GAZETTEER_ENABLED", True):
+        result = resolve_area(latitude, longitude)
+        if result is not None:
+            return result
+    return geocode_cache.reverse(latitude, longitude)
+
+
+def resolve_cached(latitude, longitude):
+    """
+    reverse_geocode() limited to lookups without network or database I/O
+    (offline gazetteer, in-process cache); None when it would need them
+    """
+    if getattr(settings, "GAZETTEER_ENABLED", True):
+        result = resolve_area(latitude, longitude)
+        if result is not None:
+            return result
+    return geocode_cache.peek(latitude, longitude)
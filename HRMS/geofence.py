@@ -0,0 +1,209 @@
+# HRMS/geofence.py
+"""
+Geofence checks for punches against organization sites
+
+Organization.sites lists circles (latitude, longitude, radius_m) and
+polygons ([[latitude, longitude], ...]). Each worker compiles the sites
+of every organization into NumPy arrays (reference-data lookup
+"geofences", rebuilt when the organization views bump the
+"organizations" version) and evaluates whole arrays of points at once:
+
+- circles:  haversine distance from every point to every centre
+- polygons: even-odd ray casting of every point against every edge
+
+A result is {"site", "inside", "distance_m", "evaluated_at"}: the site
+containing the point (the nearest one when none does) and how far
+outside its boundary the point is (0 inside; for polygons the distance
+to the nearest vertex). Check-in / check-out store it on the attendance
+row (check_in_geofence / check_out_geofence); reevaluate_month() redoes
+a month of punches in bulk after a site changes.
+
+NumPy is optional: without it punches are not geofenced (result None).
+"""
+from pymongo import UpdateOne
+
+from utils.timezone_utils import get_current_datetime_ist, month_day_key_range
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+
+EARTH_RADIUS_M = 6371008.8
+PUNCH_KINDS = ("check_in", "check_out")
+WRITE_BATCH_SIZE = 1000
+
+
+def haversine_m(lats, lngs, site_lats, site_lngs):
+    """Distances in metres, shape (points, sites)"""
+    lat1 = np.radians(lats)[:, None]
+    lng1 = np.radians(lngs)[:, None]
+    lat2 = np.radians(site_lats)[None, :]
+    lng2 = np.radians(site_lngs)[None, :]
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def points_in_polygon(lats, lngs, polygon_lats, polygon_lngs):
+    """Even-odd rule for every point against one polygon, shape (points,)"""
+    y = lats[:, None]
+    x = lngs[:, None]
+    yi, xi = polygon_lats[None, :], polygon_lngs[None, :]
+    yj, xj = np.roll(polygon_lats, 1)[None, :], np.roll(polygon_lngs, 1)[None, :]
+    spans = (yi > y) != (yj > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing_x = (xj - xi) * (y - yi) / (yj - yi) + xi
+    crossings = spans & (x < crossing_x)
+    return (crossings.sum(axis=1) % 2) == 1
+
+
+class SiteSet:
+    """The sites of one organization as arrays"""
+
+    __slots__ = ("names", "circle_lats", "circle_lngs", "circle_radii", "polygons")
+
+    def __init__(self, sites):
+        circles = [site for site in sites if not site.polygon]
+        polygons = [site for site in sites if site.polygon]
+        # Circles first, then polygons: columns of the distance matrix
+        self.names = [site.name for site in circles] + [site.name for site in polygons]
+        self.circle_lats = np.array([site.latitude for site in circles], dtype=float)
+        self.circle_lngs = np.array([site.longitude for site in circles], dtype=float)
+        self.circle_radii = np.array([site.radius_m for site in circles], dtype=float)
+        self.polygons = [
+            (
+                np.array([point[0] for point in site.polygon], dtype=float),
+                np.array([point[1] for point in site.polygon], dtype=float),
+            )
+            for site in polygons
+        ]
+
+    def evaluate(self, lats, lngs):
+        """
+        (site index, inside, metres outside) arrays for the points
+        Site index points into self.names
+        """
+        lats = np.asarray(lats, dtype=float)
+        lngs = np.asarray(lngs, dtype=float)
+        columns = []
+        if len(self.circle_lats):
+            distance = haversine_m(lats, lngs, self.circle_lats, self.circle_lngs)
+            columns.append(np.maximum(distance - self.circle_radii[None, :], 0.0))
+        for polygon_lats, polygon_lngs in self.polygons:
+            inside = points_in_polygon(lats, lngs, polygon_lats, polygon_lngs)
+            nearest_vertex = haversine_m(lats, lngs, polygon_lats, polygon_lngs).min(axis=1)
+            columns.append(np.where(inside, 0.0, nearest_vertex)[:, None])
+
+        outside = np.hstack(columns)
+        nearest = outside.argmin(axis=1)
+        distance = outside[np.arange(len(lats)), nearest]
+        return nearest, distance == 0.0, distance
+
+    def results(self, lats, lngs, evaluated_at=None):
+        """Geofence result dicts for the points"""
+        evaluated_at = evaluated_at or get_current_datetime_ist()
+        nearest, inside, distance = self.evaluate(lats, lngs)
+        return [
+            {
+                "site": self.names[index],
+                "inside": bool(is_inside),
+                "distance_m": round(float(metres), 1),
+                "evaluated_at": evaluated_at,
+            }
+            for index, is_inside, metres in zip(nearest.tolist(), inside.tolist(), distance.tolist())
+        ]
+
+
+def compile_geofences():
+    """{organization id: SiteSet} for organizations with sites (reference-data builder)"""
+    from Orgnization.models import Organization
+
+    if np is None:
+        return {}
+    return {
+        str(org.id): SiteSet(org.sites)
+        for org in Organization.objects(sites__0__exists=True).only("sites")
+    }
+
+
+def get_site_set(org_id):
+    """Cached SiteSet of an organization, or None (no sites, or no NumPy)"""
+    if not org_id or np is None:
+        return None
+    from HRMS.reference_data import reference_data_cache
+    return reference_data_cache.get(("geofences",))["geofences"].get(str(getattr(org_id, "id", org_id)))
+
+
+def check_geofence(org_id, latitude, longitude):
+    """Geofence result for one punch, or None when it cannot be checked"""
+    if latitude is None or longitude is None:
+        return None
+    try:
+        site_set = get_site_set(org_id)
+        if site_set is None:
+            return None
+        return site_set.results([float(latitude)], [float(longitude)])[0]
+    except Exception as e:
+        print(f"❌ Geofence check failed: {e}")
+        return None
+
+
+def reevaluate_month(org_id, year, month):
+    """
+    Recompute the geofence result of every punch with coordinates of an
+    organization's employees in a month; returns {kind: rows updated}
+    """
+    from Employee.models import Attendance, Employee
+
+    if np is None:
+        raise RuntimeError("NumPy is required to evaluate geofences")
+
+    # Usually run right after the sites were edited: make sure this worker
+    # has picked the change up instead of waiting for the next poll
+    from HRMS.reference_data import reference_data_cache
+    reference_data_cache.sync(force=True)
+    site_set = get_site_set(org_id)
+    employee_ids = [
+        row["_id"] for row in Employee._get_collection().find({"organizationId": org_id}, {"_id": 1})
+    ]
+    collection = Attendance._get_collection()
+    first_day, last_day = month_day_key_range(year, month)
+    evaluated_at = get_current_datetime_ist()
+    updated = {}
+
+    for kind in PUNCH_KINDS:
+        lat_field, lng_field = f"{kind}_latitude", f"{kind}_longitude"
+        rows = list(collection.find(
+            {
+                "employee": {"$in": employee_ids},
+                "day": {"$gte": first_day, "$lte": last_day},
+                lat_field: {"$ne": None},
+                lng_field: {"$ne": None},
+            },
+            {lat_field: 1, lng_field: 1}
+        ))
+        if not rows:
+            updated[kind] = 0
+            continue
+
+        if site_set is None:
+            # Sites removed: results no longer apply
+            results = [None] * len(rows)
+        else:
+            lats = np.fromiter((row[lat_field] for row in rows), dtype=float, count=len(rows))
+            lngs = np.fromiter((row[lng_field] for row in rows), dtype=float, count=len(rows))
+            results = site_set.results(lats, lngs, evaluated_at)
+
+        operations = [
+            UpdateOne({"_id": row["_id"]}, {"$set": {f"{kind}_geofence": result}})
+            for row, result in zip(rows, results)
+        ]
+        for start in range(0, len(operations), WRITE_BATCH_SIZE):
+            collection.bulk_write(operations[start:start + WRITE_BATCH_SIZE], ordered=False)
+        updated[kind] = len(operations)
+
+    return updated
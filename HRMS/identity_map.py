@@ -0,0 +1,200 @@
+# HRMS/identity_map.py
+"""
+Request-scoped document identity map
+
+MongoJWTAuthentication registers the Employee it loads (on a principal
+cache miss), so views should not fetch it again. The identity map keeps
+every document loaded during a request keyed by (document class, id) and
+resolves an employee's Shift / Department / Organization / reporting
+manager references with one batched `$in` query per collection instead of
+one lazy query per field.
+
+Usage in a view:
+    employee = get_request_employee(request, refs=("shiftId",))
+    employee.shiftId.fromTime   # already loaded, no extra query
+
+    employees = prefetch_references(page)   # whole page, one query per collection
+"""
+from contextvars import ContextVar
+
+from bson import DBRef, ObjectId
+from mongoengine import Document
+from mongoengine.base.datastructures import BaseList
+
+
+_current_map = ContextVar("hrms_identity_map", default=None)
+
+# Reference fields on Employee and the document classes they point to
+EMPLOYEE_REFERENCE_FIELDS = ("organizationId", "departmentId", "shiftId", "reportingManagers")
+
+
+def _raw_id(value):
+    """Return the ObjectId behind a DBRef / Document / ObjectId value"""
+    if isinstance(value, DBRef):
+        return value.id
+    if isinstance(value, Document):
+        return value.pk
+    if isinstance(value, ObjectId):
+        return value
+    return None
+
+
+class IdentityMap:
+    """Holds at most one instance per (document class, id)"""
+
+    def __init__(self):
+        self._documents = {}
+
+    def get(self, doc_cls, pk):
+        return self._documents.get((doc_cls, pk))
+
+    def add(self, document):
+        if document is None or document.pk is None:
+            return document
+        return self._documents.setdefault((type(document), document.pk), document)
+
+    def load_many(self, doc_cls, ids):
+        """
+        Return {id: document} for the given ids, fetching any that are not
+        already in the map with a single `$in` query
+        """
+        ids = [pk for pk in ids if pk is not None]
+        missing = list({pk for pk in ids if (doc_cls, pk) not in self._documents})
+        if missing:
+            for document in doc_cls.objects(id__in=missing):
+                self.add(document)
+        return {
+            pk: self._documents[(doc_cls, pk)]
+            for pk in ids if (doc_cls, pk) in self._documents
+        }
+
+    def resolve_references(self, document, fields):
+        """
+        Replace lazy references on `document` with already-loaded documents
+        One query per referenced collection, skipped entirely if cached
+        """
+        self.resolve_references_many([document], fields)
+        return document
+
+    def resolve_references_many(self, documents, fields):
+        """
+        Batched version of resolve_references for a page of documents
+        Ids from every document are collected first, so each referenced
+        collection is queried once regardless of how many documents there are
+        """
+        # Group the raw ids by target document class
+        wanted = {}
+        for document in documents:
+            for field_name, target, value in _reference_values(document, fields):
+                values = value if isinstance(value, (list, tuple)) else [value]
+                wanted.setdefault(target, set()).update(
+                    pk for pk in (_raw_id(v) for v in values) if pk is not None
+                )
+
+        loaded = {target: self.load_many(target, ids) for target, ids in wanted.items()}
+
+        # Attach the loaded documents directly to the instance data so
+        # attribute access does not dereference again
+        for document in documents:
+            for field_name, target, value in _reference_values(document, fields):
+                if isinstance(value, (list, tuple)):
+                    resolved = BaseList(
+                        [loaded[target].get(_raw_id(v), v) for v in value],
+                        document,
+                        field_name,
+                    )
+                    resolved._dereferenced = True
+                    document._data[field_name] = resolved
+                else:
+                    document._data[field_name] = loaded[target].get(_raw_id(value), value)
+        return documents
+
+
+def _reference_values(document, fields):
+    """Yield (field name, target class, raw value) for set reference fields"""
+    for field_name in fields:
+        field = document._fields.get(field_name)
+        value = document._data.get(field_name)
+        if field is None or not value:
+            continue
+        target = getattr(getattr(field, "field", field), "document_type", None)
+        if target is None:
+            continue
+        yield field_name, target, value
+
+
+def get_identity_map():
+    """Return the identity map for the current request (or a throwaway one)"""
+    identity_map = _current_map.get()
+    if identity_map is None:
+        identity_map = IdentityMap()
+    return identity_map
+
+
+def register(document):
+    """Add an already-loaded document to the current request's identity map"""
+    identity_map = _current_map.get()
+    if identity_map is None:
+        return document
+    return identity_map.add(document)
+
+
+def get_request_employee(request, refs=EMPLOYEE_REFERENCE_FIELDS):
+    """
+    Return the authenticated Employee without querying it again
+
+    Args:
+        request: DRF request authenticated by MongoJWTAuthentication
+        refs: reference fields to preload (default: all Employee references)
+
+    Raises:
+        Employee.DoesNotExist if the request has no authenticated employee
+    """
+    from Employee.models import Employee
+
+    identity_map = get_identity_map()
+    user = getattr(request, "user", None)
+
+    if isinstance(user, Employee):
+        employee = identity_map.add(user)
+    else:
+        # Cached Principal snapshot - load the full document once per request
+        emp_id = getattr(user, "id", None)
+        employee = identity_map.get(Employee, emp_id)
+        if employee is None:
+            employee = identity_map.add(Employee.objects.get(id=emp_id))
+
+    if refs:
+        identity_map.resolve_references(employee, refs)
+    return employee
+
+
+def prefetch_references(documents, fields=EMPLOYEE_REFERENCE_FIELDS):
+    """
+    prefetch_related-style loading for a page of documents
+    Loads every collection referenced by `fields` once with `$in` and
+    returns the documents as a list
+    """
+    documents = list(documents)
+    if documents and fields:
+        identity_map = get_identity_map()
+        # Documents on the page can satisfy references to each other
+        # (e.g. a reporting manager listed on the same page)
+        for document in documents:
+            identity_map.add(document)
+        identity_map.resolve_references_many(documents, fields)
+    return documents
+
+
+class IdentityMapMiddleware:
+    """Creates a fresh identity map for each request and drops it afterwards"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_map.set(IdentityMap())
+        try:
+            return self.get_response(request)
+        finally:
+            _current_map.reset(token)
@@ -0,0 +1,216 @@
+# HRMS/principal_cache.py
+"""
+Cached principal snapshots for MongoJWTAuthentication
+
+Authentication only needs an employee's id, role and status, which rarely
+change. Instead of loading the full Employee document on every request,
+each worker keeps a bounded LRU of compact snapshots with a TTL.
+
+Invalidation across workers uses a per-employee version counter stored in
+`principal_versions`. update_emp / delete_emp / forgot_password bump it,
+and every worker polls the collection's `updated_at` high-water mark and
+drops snapshots whose version is older than the stored one.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from utils.timezone_utils import get_current_datetime_ist
+
+
+def _ref_id(value):
+    """Return the ObjectId behind a reference value without dereferencing"""
+    return getattr(value, "id", value) if value is not None else None
+
+
+class Principal:
+    """
+    Compact authenticated-user snapshot
+
+    Exposes the attributes views and permissions read from request.user
+    (id, email, role, status, is_authenticated). Use
+    HRMS.identity_map.get_request_employee() for the full document.
+    """
+    __slots__ = (
+        "id", "email", "firstName", "lastName", "role", "status", "shiftId",
+        "departmentId", "organizationId", "reportingManagers", "version", "loaded_at",
+    )
+
+    def __init__(self, id, email, role, status, shiftId=None, departmentId=None,
+                 organizationId=None, reportingManagers=(), version=0, loaded_at=None,
+                 firstName=None, lastName=None):
+        self.id = id
+        self.email = email
+        self.firstName = firstName
+        self.lastName = lastName
+        self.role = role
+        self.status = status
+        self.shiftId = shiftId
+        self.departmentId = departmentId
+        self.organizationId = organizationId
+        self.reportingManagers = tuple(reportingManagers)
+        self.version = version
+        self.loaded_at = loaded_at if loaded_at is not None else time.monotonic()
+
+    @classmethod
+    def from_employee(cls, employee, version=0):
+        data = employee._data
+        return cls(
+            id=employee.id,
+            email=employee.email,
+            firstName=employee.firstName,
+            lastName=employee.lastName,
+            role=employee.role,
+            status=employee.status,
+            shiftId=_ref_id(data.get("shiftId")),
+            departmentId=_ref_id(data.get("departmentId")),
+            organizationId=_ref_id(data.get("organizationId")),
+            reportingManagers=[_ref_id(m) for m in data.get("reportingManagers") or [] if m],
+            version=version,
+        )
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    def __repr__(self):
+        return f"<Principal {self.id} role={self.role} v{self.version}>"
+
+
+class PrincipalCache:
+    """Bounded LRU of Principal snapshots with TTL and version invalidation"""
+
+    def __init__(self, max_entries=None, ttl=None, sync_interval=None):
+        self.max_entries = max_entries or getattr(settings, "PRINCIPAL_CACHE_MAX_ENTRIES", 10000)
+        self.ttl = ttl or getattr(settings, "PRINCIPAL_CACHE_TTL_SECONDS", 300)
+        self.sync_interval = (
+            sync_interval if sync_interval is not None
+            else getattr(settings, "PRINCIPAL_CACHE_SYNC_SECONDS", 15)
+        )
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # empId (str) -> Principal
+        self._versions = {}             # empId (str) -> latest known version
+        self._high_water = None
+        self._last_sync = 0.0
+
+    def sync(self, force=False):
+        """Pull version bumps newer than the high-water mark and evict stale entries"""
+        from Employee.models import PrincipalVersion
+
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._last_sync and now - self._last_sync < self.sync_interval:
+                return
+            high_water = self._high_water
+            self._last_sync = now
+
+        try:
+            queryset = PrincipalVersion.objects.only("empId", "version", "updated_at")
+            if high_water:
+                # >= because updated_at has one-second resolution
+                queryset = queryset.filter(updated_at__gte=high_water)
+            rows = [(row.empId, row.version, row.updated_at) for row in queryset]
+        except Exception as e:
+            print(f"Error syncing principal cache: {e}")
+            return
+
+        with self._lock:
+            for emp_id, version, updated_at in rows:
+                if version > self._versions.get(emp_id, -1):
+                    self._versions[emp_id] = version
+                cached = self._entries.get(emp_id)
+                if cached is not None and cached.version < version:
+                    del self._entries[emp_id]
+                if updated_at and (self._high_water is None or updated_at > self._high_water):
+                    self._high_water = updated_at
+
+    def get(self, emp_id):
+        """Return a fresh Principal for emp_id, or None on a miss"""
+        self.sync()
+        emp_id = str(emp_id)
+        with self._lock:
+            principal = self._entries.get(emp_id)
+            if principal is None:
+                return None
+            if time.monotonic() - principal.loaded_at > self.ttl:
+                del self._entries[emp_id]
+                return None
+            self._entries.move_to_end(emp_id)
+            return principal
+
+    def put(self, employee):
+        """Snapshot a freshly loaded Employee and cache it"""
+        emp_id = str(employee.id)
+        with self._lock:
+            principal = Principal.from_employee(employee, self._versions.get(emp_id, 0))
+            self._entries[emp_id] = principal
+            self._entries.move_to_end(emp_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, emp_id):
+        with self._lock:
+            self._entries.pop(str(emp_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._high_water = None
+            self._last_sync = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+principal_cache = PrincipalCache()
+
+
+def bump_principal_version(emp_id):
+    """
+    Invalidate the cached principal for an employee in every worker
+    Call after changing an employee's role, status, password or deleting it
+    """
+    from Employee.models import PrincipalVersion
+
+    emp_id = str(emp_id)
+    principal_cache.invalidate(emp_id)
+    try:
+        PrincipalVersion.objects(empId=emp_id).update_one(
+            inc__version=1,
+            set__updated_at=get_current_datetime_ist(),
+            upsert=True
+        )
+    except Exception as e:
+        print(f"Error bumping principal version for {emp_id}: {e}")
+
+
+def bump_principal_versions(emp_ids):
+    """bump_principal_version for many employees with one bulk write (bulk import)"""
+    from pymongo import UpdateOne
+    from Employee.models import PrincipalVersion
+
+    emp_ids = [str(emp_id) for emp_id in emp_ids]
+    if not emp_ids:
+        return
+    for emp_id in emp_ids:
+        principal_cache.invalidate(emp_id)
+    now = get_current_datetime_ist()
+    try:
+        PrincipalVersion._get_collection().bulk_write([
+            UpdateOne(
+                {"empId": emp_id},
+                {"$inc": {"version": 1}, "$set": {"updated_at": now}},
+                upsert=True
+            )
+            for emp_id in emp_ids
+        ], ordered=False)
+    except Exception as e:
+        print(f"Error bumping principal versions for {len(emp_ids)} employees: {e}")
@@ -0,0 +1,349 @@
+# HRMS/query_plans.py
+"""
+Query-plan advisor
+
+QUERY_SHAPES registers the canonical queries issued by the views and the
+scheduler jobs: the filter, sort and limit each one sends to MongoDB, with
+placeholders that are filled from the configured database (a real
+employee, a manager, today's date...) so explain() sees realistic
+selectivity.
+
+explain_shape() runs each one with explain() and reports:
+- COLLSCAN stages and in-memory SORT stages in the winning plan
+- docs examined / docs returned
+- a proposed index (Equality, Sort, Range field order) when no existing
+  index starts with those fields
+
+    python manage.py explain_queries
+    python manage.py explain_queries --shape attendance. --apply
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.utils.module_loading import import_string
+
+from utils.timezone_utils import get_current_date_ist, month_key, month_day_key_range
+
+
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$exists", "$nin"}
+EQUALITY_OPERATORS = {"$eq", "$in"}
+DEFAULT_RATIO_THRESHOLD = 10
+
+
+@dataclass
+class QueryShape:
+    name: str
+    source: str
+    model: str
+    filter: object
+    sort: list = field(default_factory=list)
+    limit: int = 0
+
+    def build(self, samples):
+        return self.filter(samples) if callable(self.filter) else self.filter
+
+
+QUERY_SHAPES = [
+    # ---- Employee ----
+    QueryShape(
+        "employee.login", "Employee.views.login_emp / forgot_password",
+        "Employee.models.Employee",
+        lambda s: {"email": s["email"]}, limit=1,
+    ),
+    QueryShape(
+        "employee.active_with_shift",
+        "Employee.scheduler.create_attendance_records_job / Employee.startup / Employee.tasks",
+        "Employee.models.Employee",
+        lambda s: {
+            "status": "active",
+            "shiftId": {"$ne": None},
+            "role": {"$in": ["JR_employee", "SR_employee", "hr"]},
+        },
+    ),
+    QueryShape(
+        "employee.senior_employees", "Leave.views.LeaveRequestView / OverallWorkFromHomeRequest",
+        "Employee.models.Employee",
+        {"role": "SR_employee"},
+    ),
+    QueryShape(
+        "employee.first_hr", "Leave.views reject leave / WFH",
+        "Employee.models.Employee",
+        {"role": "hr"}, limit=1,
+    ),
+    QueryShape(
+        "employee.direct_team", "Employee.hierarchy.team_ids(scope='direct')",
+        "Employee.models.Employee",
+        lambda s: {"reportingManagers": s["manager"]},
+    ),
+    QueryShape(
+        "employee.org_subtree", "Employee.hierarchy.team_ids(scope='org') / org_chart",
+        "Employee.models.Employee",
+        lambda s: {"ancestors": s["manager"]},
+    ),
+    QueryShape(
+        "employee.export_active", "Employee.views.export_emp?status=active",
+        "Employee.models.Employee",
+        {"status": "active"}, sort=[("_id", 1)],
+    ),
+
+    # ---- Attendance ----
+    QueryShape(
+        "attendance.employee_today",
+        "Employee.views.CheckInView / CheckOutView / scheduler.create_attendance_records_job",
+        "Employee.models.Attendance",
+        lambda s: {"employee": s["employee"], "date": s["today"]}, limit=1,
+    ),
+    QueryShape(
+        "attendance.pending_for_date",
+        "Employee.attendance_checker.mark_absent_for_date / Employee.tasks.mark_absent_for_no_checkin",
+        "Employee.models.Attendance",
+        lambda s: {"date": s["today"], "status": "pending"},
+    ),
+    QueryShape(
+        "attendance.today_by_status", "Employee.views.TodayAttendanceView (counts)",
+        "Employee.models.Attendance",
+        lambda s: {"date": s["today"], "status": "present"},
+    ),
+    QueryShape(
+        "attendance.month_by_status", "Employee.views.UserProfile (HR/admin, ?month=&year=)",
+        "Employee.models.Attendance",
+        lambda s: {
+            "month": s["month"], "day": {"$gte": s["month_first_day"], "$lte": s["month_last_day"]},
+            "status": "present",
+        },
+    ),
+    QueryShape(
+        "attendance.employee_status", "Employee.views.dashboardData (counts)",
+        "Employee.models.Attendance",
+        lambda s: {"employee": s["employee"], "status": "absent"},
+    ),
+    QueryShape(
+        "attendance.employee_month",
+        "Employee.views.EmployeeProfileDataView / utils.attendance_filters.apply_month_year_filter",
+        "Employee.models.Attendance",
+        lambda s: {
+            "employee": s["employee"],
+            "month": s["month"], "day": {"$gte": s["month_first_day"], "$lte": s["month_last_day"]},
+        },
+    ),
+    QueryShape(
+        "attendance.employee_history", "Employee.views.EmpAttendanceListView (keyset page)",
+        "Employee.models.Attendance",
+        lambda s: {"employee": s["employee"]}, sort=[("date", -1), ("_id", -1)], limit=20,
+    ),
+    QueryShape(
+        "attendance.history", "Employee.views.OverallAttendanceListView (keyset page)",
+        "Employee.models.Attendance",
+        {}, sort=[("date", -1), ("_id", -1)], limit=20,
+    ),
+
+    # ---- Leave requests ----
+    QueryShape(
+        "leave.team_requests", "Leave.views.LeaveRequestView (SR employee team)",
+        "Leave.models.LeaveRequest",
+        lambda s: {"employee": {"$in": s["team"]}}, sort=[("applied_date", -1), ("_id", -1)], limit=20,
+    ),
+    QueryShape(
+        "leave.employee_requests", "Leave.views employee leave history",
+        "Leave.models.LeaveRequest",
+        lambda s: {"employee": s["employee"]}, sort=[("applied_date", -1)],
+    ),
+    QueryShape(
+        "leave.approved_on_date", "Leave.views.LeaveRequestView?date= (employees on leave)",
+        "Leave.models.LeaveRequest",
+        lambda s: {"start_date": {"$lte": s["today"]}, "end_date": {"$gte": s["today"]}, "status": "APPROVED"},
+    ),
+
+    # ---- Work from home ----
+    QueryShape(
+        "wfh.team_requests", "Leave.views.OverallWorkFromHomeRequest (SR employee team)",
+        "Leave.models.WFH",
+        lambda s: {"employee": {"$in": s["team"]}}, sort=[("applied_date", -1)],
+    ),
+    QueryShape(
+        "wfh.employee_requests", "Leave.views employee WFH history",
+        "Leave.models.WFH",
+        lambda s: {"employee": s["employee"]}, sort=[("applied_date", -1)],
+    ),
+    QueryShape(
+        "wfh.approved_on_date", "Leave.views.OverallWorkFromHomeRequest?date= (employees on WFH)",
+        "Leave.models.WFH",
+        lambda s: {"start_date": {"$lte": s["today"]}, "end_date": {"$gte": s["today"]}, "status": "approved"},
+    ),
+
+    # ---- Holidays ----
+    QueryShape(
+        "holiday.on_date", "utils.holiday_utils.is_holiday (check-in, scheduler)",
+        "Leave.models.Holiday",
+        lambda s: {"date": s["today"], "year": s["year"], "is_active": True}, limit=1,
+    ),
+    QueryShape(
+        "holiday.year", "utils.holiday_utils.get_holidays_in_range / get_holiday_count_for_year",
+        "Leave.models.Holiday",
+        lambda s: {"year": s["year"], "is_active": True},
+    ),
+]
+
+
+def sample_values():
+    """Placeholder values taken from the configured database"""
+    from Employee.models import Employee
+
+    employees = Employee._get_collection()
+    row = (
+        employees.find_one({"reportingManagers.0": {"$exists": True}}, {"email": 1, "reportingManagers": 1})
+        or employees.find_one({}, {"email": 1, "reportingManagers": 1})
+        or {}
+    )
+    managers = row.get("reportingManagers") or []
+    manager = getattr(managers[0], "id", managers[0]) if managers else row.get("_id")
+
+    today = get_current_date_ist()
+    month_start = datetime.strptime(today, "%Y-%m-%d").replace(day=1)
+    month_first_day, month_last_day = month_day_key_range(month_start.year, month_start.month)
+    return {
+        "employee": row.get("_id"),
+        "email": row.get("email", ""),
+        "manager": manager,
+        "team": [value for value in (row.get("_id"), manager) if value is not None],
+        "today": today,
+        "year": month_start.year,
+        "month": month_key(month_start.year, month_start.month),
+        "month_first_day": month_first_day,
+        "month_last_day": month_last_day,
+    }
+
+
+def _plan_stages(plan):
+    """Every stage of a winning plan (classic and slot-based engine shapes)"""
+    stages = []
+    pending = [plan]
+    while pending:
+        node = pending.pop()
+        if not isinstance(node, dict):
+            continue
+        if "stage" in node:
+            stages.append(node)
+        if "queryPlan" in node:
+            pending.append(node["queryPlan"])
+        if "inputStage" in node:
+            pending.append(node["inputStage"])
+        pending.extend(node.get("inputStages") or [])
+    return stages
+
+
+def proposed_index(query, sort=()):
+    """
+    Index key for a query in Equality, Sort, Range order, or None when the
+    query cannot use one (only `_id`, `$or`/`$text`, no fields)
+    """
+    equality, ranges = [], []
+    for name, value in query.items():
+        if name.startswith("$") or name == "_id":
+            continue
+        if isinstance(value, dict) and value and all(op.startswith("$") for op in value):
+            if set(value) & RANGE_OPERATORS and not set(value) <= EQUALITY_OPERATORS:
+                ranges.append(name)
+                continue
+        equality.append(name)
+
+    keys = [(name, 1) for name in equality]
+    for name, direction in sort:
+        if name == "_id" and keys:
+            continue
+        keys.append((name, direction))
+    keys += [(name, 1) for name in ranges]
+
+    seen = set()
+    unique_keys = []
+    for name, direction in keys:
+        if name not in seen:
+            seen.add(name)
+            unique_keys.append((name, direction))
+    if not unique_keys or [name for name, _ in unique_keys] == ["_id"]:
+        return None
+    return unique_keys
+
+
+def index_covers(existing_keys, keys):
+    """An existing index key starts with the proposed fields (directions aside)"""
+    names = [name for name, _ in keys]
+    for existing in existing_keys:
+        if [name for name, _ in existing][:len(names)] == names:
+            return True
+    return False
+
+
+def index_meta_spec(keys):
+    """Proposed key in the `meta['indexes']` notation used by the models"""
+    fields = [("-" if direction == -1 else "") + ("id" if name == "_id" else name) for name, direction in keys]
+    if len(fields) == 1:
+        return repr(fields[0])
+    return "{" + f"'fields': {fields!r}" + "}"
+
+
+def explain_shape(shape, samples, ratio_threshold=DEFAULT_RATIO_THRESHOLD):
+    """explain() one shape; returns a report dict"""
+    model = import_string(shape.model)
+    collection = model._get_collection()
+    query = shape.build(samples)
+
+    cursor = collection.find(query)
+    if shape.sort:
+        cursor = cursor.sort(shape.sort)
+    if shape.limit:
+        cursor = cursor.limit(shape.limit)
+    explained = cursor.explain()
+
+    planner = explained.get("queryPlanner", {})
+    stats = explained.get("executionStats", {})
+    stages = _plan_stages(planner.get("winningPlan", {}))
+    stage_names = [stage["stage"] for stage in stages]
+    indexes_used = sorted({stage["indexName"] for stage in stages if stage.get("indexName")})
+
+    returned = stats.get("nReturned", 0)
+    examined = stats.get("totalDocsExamined", 0)
+    ratio = examined / max(returned, 1)
+
+    problems = []
+    if "COLLSCAN" in stage_names:
+        problems.append("COLLSCAN")
+    if "SORT" in stage_names:
+        problems.append("in-memory SORT")
+    if examined > returned and ratio >= ratio_threshold:
+        problems.append(f"examined/returned {ratio:.1f}")
+
+    existing_keys = [list(info["key"]) for info in collection.index_information().values()]
+    keys = proposed_index(query, shape.sort)
+    proposal = None
+    if problems and keys and not index_covers(existing_keys, keys):
+        proposal = {
+            "collection": collection.name,
+            "keys": keys,
+            "meta": index_meta_spec(keys),
+            "shell": f"db.{collection.name}.createIndex({{{', '.join(f'{n}: {d}' for n, d in keys)}}})",
+        }
+
+    return {
+        "name": shape.name,
+        "source": shape.source,
+        "collection": collection.name,
+        "query": query,
+        "sort": shape.sort,
+        "stages": stage_names,
+        "indexes_used": indexes_used,
+        "returned": returned,
+        "docs_examined": examined,
+        "keys_examined": stats.get("totalKeysExamined", 0),
+        "ratio": round(ratio, 2),
+        "millis": stats.get("executionTimeMillis", 0),
+        "problems": problems,
+        "proposal": proposal,
+    }
+
+
+def apply_proposal(proposal):
+    """Create a proposed index (background build on the live collection)"""
+    from mongoengine.connection import get_db
+
+    return get_db()[proposal["collection"]].create_index(proposal["keys"], background=True)
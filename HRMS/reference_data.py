@@ -0,0 +1,215 @@
+# HRMS/reference_data.py
+"""
+Cached reference-data lookups (dropdown lists)
+
+The frontend needs small id/name lists for organizations, departments,
+shifts, reporting managers and employees. Instead of rebuilding them with
+a full collection scan on every list request, each worker caches them and
+only rebuilds a lookup when the version of its source collection changes.
+
+Versions live in `reference_data_versions` (one counter per collection)
+and are bumped by the create/update/delete views with
+bump_reference_version(). Other workers pick up bumps by polling every
+REFERENCE_DATA_SYNC_SECONDS. The combined versions also give the ETag
+served by the reference-data endpoint.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+
+from utils.timezone_utils import get_current_datetime_ist
+
+
+REPORTING_MANAGER_ROLES = ["admin", "hr", "SR_employee"]
+
+
+def _organizations():
+    from Orgnization.models import Organization
+    return [
+        {"id": str(org.id), "orgName": org.orgName}
+        for org in Organization.objects.only("orgName")
+    ]
+
+
+def _departments():
+    from Departments.models import Departments
+    return [
+        {"id": str(dept.id), "deptName": dept.deptName}
+        for dept in Departments.objects.only("deptName")
+    ]
+
+
+def _shifts():
+    from Shifts.models import Shift
+    return [
+        {"id": str(shift.id), "shiftType": shift.shiftType}
+        for shift in Shift.objects.only("shiftType")
+    ]
+
+
+def _reporting_managers():
+    from Employee.models import Employee
+    return [
+        {"id": str(emp.id), "firstName": emp.firstName}
+        for emp in Employee.objects.filter(
+            role__in=REPORTING_MANAGER_ROLES
+        ).only("id", "firstName")
+    ]
+
+
+def _employees():
+    from Employee.models import Employee
+    return [
+        {"id": str(emp.id), "name": f"{emp.firstName} {emp.lastName}"}
+        for emp in Employee.objects.only("id", "firstName", "lastName")
+    ]
+
+
+def _shift_registry():
+    from HRMS.shift_registry import compile_shifts
+    return compile_shifts()
+
+
+def _department_names():
+    from Departments.models import Departments
+    return {str(dept.id): dept.deptName for dept in Departments.objects.only("deptName")}
+
+
+def _geofences():
+    from HRMS.geofence import compile_geofences
+    return compile_geofences()
+
+
+# lookup name -> (source collection whose version it depends on, builder)
+LOOKUPS = {
+    "organizations": ("organizations", _organizations),
+    "departments": ("departments", _departments),
+    "shifts": ("shifts", _shifts),
+    "reporting_managers": ("employees", _reporting_managers),
+    "employees": ("employees", _employees),
+}
+
+# Cached the same way but only used server-side (not served by the
+# reference-data endpoint)
+INTERNAL_LOOKUPS = {
+    "shift_registry": ("shifts", _shift_registry),
+    "department_names": ("departments", _department_names),
+    "geofences": ("organizations", _geofences),
+}
+
+
+def _lookup(name):
+    return LOOKUPS.get(name) or INTERNAL_LOOKUPS[name]
+
+
+class ReferenceDataCache:
+    """Per-process lookup cache keyed on collection versions"""
+
+    def __init__(self, sync_interval=None):
+        self.sync_interval = (
+            sync_interval if sync_interval is not None
+            else getattr(settings, "REFERENCE_DATA_SYNC_SECONDS", 10)
+        )
+        self._lock = threading.Lock()
+        self._versions = {}     # collection -> version
+        self._lookups = {}      # lookup name -> (version, data)
+        self._last_sync = 0.0
+
+    def sync(self, force=False):
+        """Refresh the collection versions from MongoDB"""
+        from Employee.models import ReferenceDataVersion
+
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._last_sync and now - self._last_sync < self.sync_interval:
+                return
+            self._last_sync = now
+
+        try:
+            rows = [(row.name, row.version) for row in ReferenceDataVersion.objects.only("name", "version")]
+        except Exception as e:
+            print(f"Error syncing reference data versions: {e}")
+            return
+
+        with self._lock:
+            for name, version in rows:
+                if version > self._versions.get(name, -1):
+                    self._versions[name] = version
+
+    def versions(self, names):
+        """Return {lookup name: version of its source collection}"""
+        self.sync()
+        with self._lock:
+            return {name: self._versions.get(_lookup(name)[0], 0) for name in names}
+
+    def get(self, names):
+        """Return {lookup name: list}, rebuilding only lookups whose version changed"""
+        versions = self.versions(names)
+        result = {}
+        for name in names:
+            version = versions[name]
+            with self._lock:
+                cached = self._lookups.get(name)
+            if cached is not None and cached[0] == version:
+                result[name] = cached[1]
+                continue
+            data = _lookup(name)[1]()
+            with self._lock:
+                self._lookups[name] = (version, data)
+            result[name] = data
+        return result
+
+    def etag(self, names):
+        """Strong ETag for a set of lookups, derived from their versions only"""
+        versions = self.versions(names)
+        raw = "|".join(f"{name}:{versions[name]}" for name in sorted(names))
+        return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20] + '"'
+
+    def set_version(self, collection, version):
+        with self._lock:
+            if version > self._versions.get(collection, -1):
+                self._versions[collection] = version
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+            self._lookups.clear()
+            self._last_sync = 0.0
+
+
+reference_data_cache = ReferenceDataCache()
+
+
+def bump_reference_version(collection):
+    """
+    Mark a reference collection as changed in every worker
+    collection: "organizations", "departments", "shifts" or "employees"
+    """
+    from Employee.models import ReferenceDataVersion
+
+    try:
+        row = ReferenceDataVersion.objects(name=collection).modify(
+            upsert=True,
+            new=True,
+            inc__version=1,
+            set__updated_at=get_current_datetime_ist()
+        )
+        reference_data_cache.set_version(collection, row.version)
+    except Exception as e:
+        print(f"Error bumping reference data version for {collection}: {e}")
+
+
+def get_lookups(*names):
+    """Cached lookup lists, e.g. get_lookups("shifts", "departments")"""
+    return reference_data_cache.get(names)
+
+
+def wants_lookups(request):
+    """
+    False when the client opted out of embedded lookups with ?lookups=false
+    (it should use the reference-data endpoint instead)
+    """
+    value = request.query_params.get("lookups", "true")
+    return value.lower() not in ("false", "0", "no")
@@ -0,0 +1,144 @@
+# HRMS/revocation.py
+"""
+In-process token revocation cache
+
+Keeps a copy of the revoked token keys (jti or token hash) from the
+`token_blacklist` collection in every worker so MongoJWTAuthentication
+only has to query MongoDB when a token is actually present in the local
+set. The set is kept in sync incrementally by polling the `blacklisted_at`
+high-water mark, and logout adds entries immediately.
+"""
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from utils.timezone_utils import DATETIME_FORMAT
+
+
+def hash_token(token):
+    """Return a compact, fixed-size key (16-byte hash, hex) for a raw token"""
+    return hashlib.sha256(token.encode("utf-8")).digest()[:16].hex()
+
+
+def revocation_key(token, payload=None):
+    """
+    Key under which a token is revoked
+    Uses the `jti` claim when present, else a 16-byte hash of the raw token
+    (tokens minted before jti was added)
+    """
+    jti = (payload or {}).get("jti")
+    return jti if jti else hash_token(token)
+
+
+def _expiry_to_epoch(expires_at):
+    """
+    Convert an `expires_at` value to a unix timestamp
+    Accepts epoch numbers, datetime objects (naive values are UTC, as
+    returned by MongoDB) and "YYYY-MM-DD HH:MM:SS" strings
+    """
+    if expires_at is None:
+        return None
+    if isinstance(expires_at, (int, float)):
+        return float(expires_at)
+    if isinstance(expires_at, datetime):
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at.timestamp()
+    try:
+        return datetime.strptime(expires_at, DATETIME_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenRevocationCache:
+    """
+    Revoked-key set with per-entry TTL
+
+    - might_be_revoked(key): True only if the key is in the local set
+    - add(key, expires_at):  record a revocation made by this process
+    - sync():                pull rows newer than the high-water mark
+    """
+
+    def __init__(self, sync_interval=None):
+        self.sync_interval = (
+            sync_interval if sync_interval is not None
+            else getattr(settings, "TOKEN_REVOCATION_SYNC_SECONDS", 30)
+        )
+        self._lock = threading.Lock()
+        self._entries = {}          # revocation key -> expiry epoch (or None)
+        self._high_water = None     # latest `blacklisted_at` seen
+        self._last_sync = 0.0
+        self._loaded = False
+
+    def _purge_expired(self, now_epoch):
+        expired = [
+            key for key, expiry in self._entries.items()
+            if expiry is not None and expiry <= now_epoch
+        ]
+        for key in expired:
+            del self._entries[key]
+
+    def sync(self, force=False):
+        """Load new blacklist rows since the last high-water mark"""
+        from Employee.models import TokenBlacklist
+
+        now_epoch = time.time()
+        with self._lock:
+            if not force and self._loaded and now_epoch - self._last_sync < self.sync_interval:
+                return
+            high_water = self._high_water
+            self._last_sync = now_epoch
+
+        try:
+            queryset = TokenBlacklist.objects.only("jti", "expires_at", "blacklisted_at")
+            if high_water:
+                # >= because blacklisted_at has one-second resolution
+                queryset = queryset.filter(blacklisted_at__gte=high_water)
+            rows = [(row.jti, row.expires_at, row.blacklisted_at) for row in queryset]
+        except Exception as e:
+            print(f"Error syncing token revocation cache: {e}")
+            return
+
+        with self._lock:
+            for key, expires_at, blacklisted_at in rows:
+                self._entries[key] = _expiry_to_epoch(expires_at)
+                if blacklisted_at and (self._high_water is None or blacklisted_at > self._high_water):
+                    self._high_water = blacklisted_at
+            self._purge_expired(now_epoch)
+            self._loaded = True
+
+    def might_be_revoked(self, key):
+        """Return True if the key may be blacklisted and MongoDB should be asked"""
+        self.sync()
+        with self._lock:
+            if not self._loaded:
+                # Initial load failed - fall back to asking MongoDB
+                return True
+            expiry = self._entries.get(key, 0)
+            if expiry == 0:
+                return False
+            if expiry is not None and expiry <= time.time():
+                del self._entries[key]
+                return False
+            return True
+
+    def add(self, key, expires_at=None):
+        """Record a revocation locally so this worker rejects it immediately"""
+        with self._lock:
+            self._entries[key] = _expiry_to_epoch(expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._high_water = None
+            self._last_sync = 0.0
+            self._loaded = False
+
+    def __len__(self):
+        return len(self._entries)
+
+
+revocation_cache = TokenRevocationCache()
@@ -73,6 +73,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'HRMS.identity_map.IdentityMapMiddleware',  # request-scoped document cache
 ]
 
 # -------------------------------------------------------------------------
@@ -187,7 +188,9 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 DEBUG = False
 
 DATA_UPLOAD_MAX_MEMORY_SIZE = 104857600  # 100MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 104857600  # 100MB
+# Uploads above this are spooled to a temporary file instead of memory,
+# then streamed into document storage chunk by chunk
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB
 
 # File upload handlers
 FILE_UPLOAD_HANDLERS = [
@@ -198,6 +201,60 @@ FILE_UPLOAD_HANDLERS = [
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 FILE_UPLOAD_PERMISSIONS = 0o644
 
+# -------------------------------------------------------------------------
+# DOCUMENT STORAGE (HRMS.document_storage, content-addressed + ref-counted)
+# -------------------------------------------------------------------------
+# Where document bytes live; LocalFileSystemBackend stores under MEDIA_ROOT
+DOCUMENT_STORAGE_BACKEND = os.getenv("DOCUMENT_STORAGE_BACKEND", "HRMS.document_storage.LocalFileSystemBackend")
+# Bytes read / hashed / written per step while storing an upload
+DOCUMENT_STORAGE_CHUNK_SIZE = int(os.getenv("DOCUMENT_STORAGE_CHUNK_SIZE", str(64 * 1024)))
+
+# -------------------------------------------------------------------------
+# PHOTO THUMBNAILS (Employee.photo_thumbnails, needs Pillow)
+# -------------------------------------------------------------------------
+PHOTO_THUMBNAIL_SIZES = [64, 128, 512]
+PHOTO_THUMBNAIL_FORMATS = ["webp", "jpeg"]
+# "thread" (in-process worker pool) or "celery" (generate_photo_thumbnails task)
+PHOTO_THUMBNAIL_BACKEND = os.getenv("PHOTO_THUMBNAIL_BACKEND", "thread")
+PHOTO_THUMBNAIL_WORKERS = int(os.getenv("PHOTO_THUMBNAIL_WORKERS", "2"))
+
+# -------------------------------------------------------------------------
+# REVERSE GEOCODING (HRMS.geocoding, check-in / check-out addresses)
+# -------------------------------------------------------------------------
+# Geohash length of a cache cell: 6 ~ 1.2 km, 7 ~ 150 m, 8 ~ 40 m
+GEOCODE_CACHE_PRECISION = int(os.getenv("GEOCODE_CACHE_PRECISION", "7"))
+GEOCODE_CACHE_MAX_ENTRIES = int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "5000"))
+GEOCODE_CACHE_TTL_DAYS = int(os.getenv("GEOCODE_CACHE_TTL_DAYS", "90"))
+GEOCODER_TIMEOUT_SECONDS = int(os.getenv("GEOCODER_TIMEOUT_SECONDS", "5"))
+GEOCODER_USER_AGENT = os.getenv("GEOCODER_USER_AGENT", "HRMS-App/1.0")
+# Offline area lookup (HRMS.gazetteer) tried before Nominatim; default
+# gazetteer: HRMS/data/pune_areas.json
+GAZETTEER_ENABLED = os.getenv("GAZETTEER_ENABLED", "True") == "True"
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", "")
+# Nominatim usage policy: at most one request per second (applied to the
+# location enrichment worker; request threads are not delayed)
+GEOCODER_MIN_INTERVAL_SECONDS = float(os.getenv("GEOCODER_MIN_INTERVAL_SECONDS", "1.0"))
+
+# -------------------------------------------------------------------------
+# LOCATION ENRICHMENT (Employee.location_enrichment, deferred punch geocoding)
+# -------------------------------------------------------------------------
+# False: check-in/out call the geocoder inside the request (old behaviour)
+LOCATION_ENRICHMENT_ENABLED = os.getenv("LOCATION_ENRICHMENT_ENABLED", "True") == "True"
+# "thread" (in-process worker) or "celery" (enrich_locations task)
+LOCATION_ENRICHMENT_BACKEND = os.getenv("LOCATION_ENRICHMENT_BACKEND", "thread")
+LOCATION_ENRICHMENT_BATCH_SIZE = int(os.getenv("LOCATION_ENRICHMENT_BATCH_SIZE", "50"))
+LOCATION_ENRICHMENT_MAX_ATTEMPTS = int(os.getenv("LOCATION_ENRICHMENT_MAX_ATTEMPTS", "5"))
+# First retry delay, doubled on every further attempt
+LOCATION_ENRICHMENT_RETRY_SECONDS = int(os.getenv("LOCATION_ENRICHMENT_RETRY_SECONDS", "60"))
+LOCATION_ENRICHMENT_POLL_SECONDS = int(os.getenv("LOCATION_ENRICHMENT_POLL_SECONDS", "30"))
+LOCATION_ENRICHMENT_SWEEP_MINUTES = int(os.getenv("LOCATION_ENRICHMENT_SWEEP_MINUTES", "5"))
+
+# -------------------------------------------------------------------------
+# ATTENDANCE SNAPSHOTS (Employee.attendance_snapshot, employee copy on rows)
+# -------------------------------------------------------------------------
+# "thread" (in-process worker) or "celery" (propagate_attendance_snapshots task)
+ATTENDANCE_SNAPSHOT_BACKEND = os.getenv("ATTENDANCE_SNAPSHOT_BACKEND", "thread")
+
 # -------------------------------------------------------------------------
 # DRF SETTINGS (IMPORTANT FOR JWT)
 # -------------------------------------------------------------------------
@@ -215,6 +272,62 @@ REST_FRAMEWORK = {
     'DATETIME_INPUT_FORMATS': ['%Y-%m-%d %H:%M:%S', 'iso-8601'],
 }
 
+# -------------------------------------------------------------------------
+# TOKEN REVOCATION CACHE
+# -------------------------------------------------------------------------
+# How often (seconds) each worker polls token_blacklist for new revocations
+TOKEN_REVOCATION_SYNC_SECONDS = int(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", "30"))
+
+# -------------------------------------------------------------------------
+# PRINCIPAL CACHE (authenticated employee snapshots)
+# -------------------------------------------------------------------------
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+# How often (seconds) each worker polls principal_versions for invalidations
+PRINCIPAL_CACHE_SYNC_SECONDS = int(os.getenv("PRINCIPAL_CACHE_SYNC_SECONDS", "15"))
+
+# -------------------------------------------------------------------------
+# PAGINATION (utils.pagination.CustomPagination)
+# -------------------------------------------------------------------------
+# Lifetime (seconds) of cached filtered counts for ?count=estimated
+PAGINATION_COUNT_CACHE_SECONDS = int(os.getenv("PAGINATION_COUNT_CACHE_SECONDS", "60"))
+
+# -------------------------------------------------------------------------
+# REFERENCE DATA (HRMS.reference_data lookup cache)
+# -------------------------------------------------------------------------
+# How often (seconds) each worker polls reference_data_versions
+REFERENCE_DATA_SYNC_SECONDS = int(os.getenv("REFERENCE_DATA_SYNC_SECONDS", "10"))
+
+# -------------------------------------------------------------------------
+# EMPLOYEE SEARCH (Employee.search_index)
+# -------------------------------------------------------------------------
+# "index" (in-process word/prefix/trigram index with a substring scan) or
+# "mongo" (text index only)
+EMPLOYEE_SEARCH_BACKEND = os.getenv("EMPLOYEE_SEARCH_BACKEND", "index")
+# How often (seconds) each worker applies employee changes from other workers
+EMPLOYEE_SEARCH_SYNC_SECONDS = int(os.getenv("EMPLOYEE_SEARCH_SYNC_SECONDS", "10"))
+
+# -------------------------------------------------------------------------
+# EMPLOYEE EXPORT (Employee.export)
+# -------------------------------------------------------------------------
+# Documents fetched per cursor batch / written per response chunk
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# -------------------------------------------------------------------------
+# RATE LIMITING (HRMS.throttling token buckets)
+# -------------------------------------------------------------------------
+# LocalTokenBucketBackend (per process), MongoTokenBucketBackend or
+# RedisTokenBucketBackend (shared across workers)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "HRMS.throttling.LocalTokenBucketBackend")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+
+# rate = refill rate, burst = bucket size, key = ip / employee / endpoint
+RATE_LIMITS = {
+    "login": {"rate": "10/min", "burst": 5, "key": ["ip", "endpoint"]},
+    "attendance_punch": {"rate": "6/min", "burst": 3, "key": ["employee", "endpoint"]},
+    "leave_request": {"rate": "20/hour", "burst": 5, "key": ["employee", "endpoint"]},
+}
+
 # -------------------------------------------------------------------------
 # EMAIL SETTINGS
 # -------------------------------------------------------------------------
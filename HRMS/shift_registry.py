@@ -0,0 +1,148 @@
+# HRMS/shift_registry.py
+"""
+Compiled shifts for time comparisons
+
+There are only a handful of shifts, and every punch and absent sweep
+compares against them. Each shift is compiled once into a CompiledShift
+holding its times as seconds since midnight (plus the absent cutoff and
+whether the shift crosses midnight), so comparisons are integer
+arithmetic instead of strptime() calls.
+
+Compiled shifts are held by the reference-data cache (lookup
+"shift_registry" in HRMS.reference_data) and rebuilt when the "shifts"
+version is bumped by the Shift create/update/delete views. Use
+get_compiled_shift(shift_id), or compiled(shift) when a Shift document
+(or a compiled one) is already at hand.
+"""
+from datetime import time
+
+
+SECONDS_PER_DAY = 24 * 3600
+NOON = 12 * 3600
+# Employees without a check-in are marked absent this long before shift end
+ABSENT_CUTOFF_BEFORE_END = 2 * 3600
+
+
+def seconds_of(time_str):
+    """ "HH:MM:SS" (or "HH:MM") -> seconds since midnight, None if invalid"""
+    if not time_str:
+        return None
+    try:
+        parts = [int(part) for part in time_str.split(":")]
+    except (AttributeError, ValueError):
+        return None
+    if len(parts) == 2:
+        parts.append(0)
+    if len(parts) != 3:
+        return None
+    hours, minutes, seconds = parts
+    if not (0 <= hours < 24 and 0 <= minutes < 60 and 0 <= seconds < 60):
+        return None
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def time_string(seconds):
+    """Seconds since midnight -> "HH:MM:SS" """
+    seconds %= SECONDS_PER_DAY
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def time_of(time_str):
+    """ "HH:MM:SS" -> datetime.time, None if invalid"""
+    seconds = seconds_of(time_str)
+    if seconds is None:
+        return None
+    return time(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+
+class CompiledShift:
+    """A shift's times as seconds since midnight"""
+
+    __slots__ = (
+        "id", "shift_type", "from_time", "end_time", "late_mark_time",
+        "start", "end", "late_mark", "absent_cutoff", "absent_cutoff_time",
+        "crosses_midnight",
+    )
+
+    def __init__(self, id, shift_type, from_time, end_time, late_mark_time=None):
+        self.id = id
+        self.shift_type = shift_type
+        self.from_time = from_time
+        self.end_time = end_time
+        self.late_mark_time = late_mark_time
+        self.start = seconds_of(from_time)
+        self.end = seconds_of(end_time)
+        self.late_mark = seconds_of(late_mark_time)
+        self.crosses_midnight = (
+            self.start is not None and self.end is not None and self.end < self.start
+        )
+        if self.end is None:
+            self.absent_cutoff = self.absent_cutoff_time = None
+        else:
+            self.absent_cutoff = (self.end - ABSENT_CUTOFF_BEFORE_END) % SECONDS_PER_DAY
+            self.absent_cutoff_time = time_string(self.absent_cutoff)
+
+    @classmethod
+    def from_document(cls, shift):
+        return cls(
+            str(shift.id) if shift.id else None,
+            shift.shiftType,
+            shift.fromTime,
+            shift.endTime,
+            shift.lateMarkTime,
+        )
+
+    def __repr__(self):
+        return f"<CompiledShift {self.shift_type} {self.from_time}-{self.end_time}>"
+
+    def is_late(self, seconds):
+        """A check-in at `seconds` is after the shift start"""
+        if self.start is None:
+            return False
+        if self.crosses_midnight and seconds < self.end:
+            # Past midnight on an overnight shift
+            return True
+        return seconds > self.start
+
+    def absent_cutoff_passed(self, seconds):
+        """
+        The absent cutoff (shift end - 2 hours) has passed at `seconds`
+        On a shift crossing midnight with a morning cutoff, evening times
+        are still the previous day and never past it
+        """
+        if self.absent_cutoff is None:
+            return False
+        if self.crosses_midnight and self.absent_cutoff < NOON:
+            return seconds < NOON and seconds > self.absent_cutoff
+        return seconds > self.absent_cutoff
+
+
+def compile_shifts():
+    """{shift id: CompiledShift} for every shift (reference-data builder)"""
+    from Shifts.models import Shift
+    return {
+        str(shift.id): CompiledShift.from_document(shift)
+        for shift in Shift.objects.only("shiftType", "fromTime", "endTime", "lateMarkTime")
+    }
+
+
+def get_compiled_shift(shift_id):
+    """Cached CompiledShift for a shift id, or None"""
+    if not shift_id:
+        return None
+    from HRMS.reference_data import reference_data_cache
+    return reference_data_cache.get(("shift_registry",))["shift_registry"].get(str(getattr(shift_id, "id", shift_id)))
+
+
+def compiled(shift):
+    """
+    CompiledShift for a Shift document (or a CompiledShift, returned as is)
+    The registry's copy is used when the document is saved and unchanged
+    """
+    if shift is None or isinstance(shift, CompiledShift):
+        return shift
+    if shift.id and not getattr(shift, "_changed_fields", None):
+        registered = get_compiled_shift(shift.id)
+        if registered is not None:
+            return registered
+    return CompiledShift.from_document(shift)
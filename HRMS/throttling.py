@@ -0,0 +1,275 @@
+# HRMS/throttling.py
+"""
+Token-bucket rate limiting as DRF throttle classes
+
+Each scope in settings.RATE_LIMITS defines a refill rate, a burst size and
+which request attributes make up the bucket key:
+
+    RATE_LIMITS = {
+        "login": {"rate": "10/min", "burst": 5, "key": ["ip", "endpoint"]},
+    }
+
+Buckets live in a backend chosen by settings.RATE_LIMIT_BACKEND:
+- LocalTokenBucketBackend:  in-memory, per process (default, also used in tests)
+- MongoTokenBucketBackend:  shared, one findOneAndUpdate per request
+- RedisTokenBucketBackend:  shared, one Lua script call per request
+
+If a shared backend fails the throttle falls back to the local bucket.
+Throttled requests get a 429 with a Retry-After header (set by DRF from
+the throttle's wait()).
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+
+PERIODS = {
+    "s": 1, "sec": 1, "second": 1,
+    "m": 60, "min": 60, "minute": 60,
+    "h": 3600, "hour": 3600,
+    "d": 86400, "day": 86400,
+}
+
+
+def parse_rate(rate):
+    """
+    Parse "N/period" into (tokens, seconds)
+    e.g. "10/min" -> (10, 60), "100/hour" -> (100, 3600)
+    """
+    num, period = rate.split("/")
+    try:
+        return int(num), PERIODS[period.strip().lower()]
+    except KeyError:
+        raise ImproperlyConfigured(f"Invalid rate period in '{rate}'")
+
+
+# ============================================================================
+# BUCKET BACKENDS
+# Interface: consume(key, capacity, refill_per_second, ttl) -> (allowed, tokens_left)
+# ============================================================================
+
+class LocalTokenBucketBackend:
+    """In-memory token buckets for a single process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> [tokens, last_refill, expires]
+
+    def consume(self, key, capacity, refill_per_second, ttl):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or bucket[2] <= now:
+                tokens = float(capacity)
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * refill_per_second)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = [tokens, now, now + ttl]
+
+            # Opportunistic cleanup so idle keys do not accumulate
+            if len(self._buckets) > 10000:
+                for stale in [k for k, b in self._buckets.items() if b[2] <= now]:
+                    del self._buckets[stale]
+
+        return allowed, tokens
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class MongoTokenBucketBackend:
+    """
+    Shared token buckets in the `rate_limit_buckets` collection
+    The refill and the take happen in one atomic findOneAndUpdate pipeline.
+    """
+
+    collection_name = "rate_limit_buckets"
+
+    def __init__(self):
+        self._indexes_ready = False
+
+    def _collection(self):
+        from mongoengine.connection import get_db
+        collection = get_db()[self.collection_name]
+        if not self._indexes_ready:
+            # Idle buckets are removed by MongoDB itself
+            collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexes_ready = True
+        return collection
+
+    def consume(self, key, capacity, refill_per_second, ttl):
+        from pymongo import ReturnDocument
+
+        now = time.time()
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        refilled = {
+            "$min": [
+                capacity,
+                {"$add": [
+                    {"$ifNull": ["$tokens", capacity]},
+                    {"$multiply": [
+                        {"$subtract": [now, {"$ifNull": ["$ts", now]}]},
+                        refill_per_second,
+                    ]},
+                ]},
+            ]
+        }
+        bucket = self._collection().find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "ts": now, "expires_at": expires_at}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [
+                        {"$gte": ["$tokens", 1]},
+                        {"$subtract": ["$tokens", 1]},
+                        "$tokens",
+                    ]},
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return bool(bucket["allowed"]), float(bucket["tokens"])
+
+
+class RedisTokenBucketBackend:
+    """Shared token buckets in Redis (requires the optional `redis` package)"""
+
+    SCRIPT = """
+    local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or ARGV[1])
+    local ts = tonumber(redis.call('HGET', KEYS[1], 'ts') or ARGV[3])
+    tokens = math.min(tonumber(ARGV[1]), tokens + (tonumber(ARGV[3]) - ts) * tonumber(ARGV[2]))
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', ARGV[3])
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured(
+                "RedisTokenBucketBackend requires the 'redis' package"
+            )
+        url = getattr(settings, "RATE_LIMIT_REDIS_URL", None) or "redis://localhost:6379/1"
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def consume(self, key, capacity, refill_per_second, ttl):
+        allowed, tokens = self._script(
+            keys=[f"ratelimit:{key}"],
+            args=[capacity, refill_per_second, time.time(), int(ttl)],
+        )
+        return bool(int(allowed)), float(tokens)
+
+
+_local_backend = LocalTokenBucketBackend()
+_backends = {"HRMS.throttling.LocalTokenBucketBackend": _local_backend}
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the configured bucket backend (instantiated once per process)"""
+    path = getattr(settings, "RATE_LIMIT_BACKEND", "HRMS.throttling.LocalTokenBucketBackend")
+    backend = _backends.get(path)
+    if backend is None:
+        with _backend_lock:
+            backend = _backends.get(path)
+            if backend is None:
+                backend = _backends[path] = import_string(path)()
+    return backend
+
+
+# ============================================================================
+# DRF THROTTLE CLASSES
+# ============================================================================
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base token-bucket throttle; subclasses set `scope` (and optionally `methods`)
+
+    Key parts (settings.RATE_LIMITS[scope]["key"]):
+        "employee" - authenticated employee id (falls back to IP)
+        "ip"       - client IP (honours NUM_PROXIES like DRF's throttles)
+        "endpoint" - resolved URL name, or the path
+    """
+    scope = None
+    methods = None  # e.g. ("POST",) to leave GET requests unthrottled
+
+    def __init__(self):
+        config = getattr(settings, "RATE_LIMITS", {}).get(self.scope)
+        if not config:
+            raise ImproperlyConfigured(f"No RATE_LIMITS entry for scope '{self.scope}'")
+        num, period = parse_rate(config["rate"])
+        self.capacity = config.get("burst", num)
+        self.refill_per_second = num / period
+        self.key_parts = config.get("key", ["employee"])
+        self.tokens_left = self.capacity
+
+    def get_cache_key(self, request, view):
+        parts = [self.scope]
+        for part in self.key_parts:
+            if part == "employee":
+                user = getattr(request, "user", None)
+                if user is not None and getattr(user, "is_authenticated", False) and getattr(user, "id", None):
+                    parts.append(f"emp:{user.id}")
+                else:
+                    parts.append(f"ip:{self.get_ident(request)}")
+            elif part == "ip":
+                parts.append(f"ip:{self.get_ident(request)}")
+            elif part == "endpoint":
+                match = getattr(request, "resolver_match", None)
+                parts.append(f"ep:{match.view_name if match else request.path}")
+        return "|".join(parts)
+
+    def allow_request(self, request, view):
+        if self.methods and request.method not in self.methods:
+            return True
+
+        key = self.get_cache_key(request, view)
+        # Idle buckets are refilled to capacity anyway, so they can be dropped
+        ttl = max(1, int(self.capacity / self.refill_per_second) + 1)
+
+        try:
+            allowed, self.tokens_left = get_backend().consume(
+                key, self.capacity, self.refill_per_second, ttl
+            )
+        except Exception as e:
+            print(f"Rate limit backend error, using local bucket: {e}")
+            allowed, self.tokens_left = _local_backend.consume(
+                key, self.capacity, self.refill_per_second, ttl
+            )
+        return allowed
+
+    def wait(self):
+        """Seconds until one token is available (sent as Retry-After)"""
+        missing = max(0.0, 1 - self.tokens_left)
+        return missing / self.refill_per_second if self.refill_per_second else None
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    scope = "login"
+
+
+class AttendancePunchRateThrottle(TokenBucketThrottle):
+    scope = "attendance_punch"
+
+
+class LeaveRequestRateThrottle(TokenBucketThrottle):
+    scope = "leave_request"
+    methods = ("POST",)
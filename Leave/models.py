@@ -85,6 +85,7 @@ class LeaveRequest(Document):
             'leave_type',
             {'fields': ['employee', 'status']},
             {'fields': ['start_date', 'end_date']},
+            {'fields': ['-applied_date', '-id']},  # cursor pagination
         ],
         'ordering': ['-applied_date']
     }
@@ -174,7 +175,8 @@ class WFH(Document):
         'indexes': [
             'employee',
             'status',
-            {'fields': ['employee', 'start_date', 'end_date'], 'unique': True}
+            {'fields': ['employee', 'start_date', 'end_date'], 'unique': True},
+            {'fields': ['-applied_date', '-id']},  # cursor pagination
         ],
         'ordering': ['-applied_date']
     }
@@ -9,10 +9,20 @@ from utils.timezone_utils import (
     is_valid_date_format,
     calculate_days_between
 )
+from utils.sparse_fields import SparseFieldsetMixin
 from datetime import datetime
 
 
-class LeaveSerializer(DocumentSerializer):
+class LeaveSerializer(SparseFieldsetMixin, DocumentSerializer):
+    # Document fields read by the display fields (for ?fields= projections)
+    field_sources = {
+        'start_date_display': ('start_date',),
+        'end_date_display': ('end_date',),
+        'applied_date_display': ('applied_date',),
+        'approved_date_display': ('approved_date',),
+        'rejected_date_display': ('rejected_date',),
+    }
+    
     # Display fields (read-only)
     start_date_display = serializers.SerializerMethodField()
     end_date_display = serializers.SerializerMethodField()
@@ -181,9 +191,18 @@ class LeaveSerializer(DocumentSerializer):
         return instance
 
 
-class WFHSerializer(serializers.Serializer):
+class WFHSerializer(SparseFieldsetMixin, serializers.Serializer):
     """MongoDB-compatible WFH Serializer with IST timezone support"""
     
+    # Document fields read by the display fields (for ?fields= projections)
+    field_sources = {
+        'start_date_display': ('start_date',),
+        'end_date_display': ('end_date',),
+        'applied_date_display': ('applied_date',),
+        'approved_date_display': ('approved_date',),
+        'rejected_date_display': ('rejected_date',),
+    }
+    
     # Read-only fields (displayed in response)
     id = serializers.CharField(read_only=True)
     employee = serializers.SerializerMethodField(read_only=True)
@@ -21,6 +21,10 @@ from utils.timezone_utils import (
 
 from utils.filters import apply_date_filters,apply_wfh_date_filters,apply_leave_date_filters
 from utils.pagination import CustomPagination
+from HRMS.identity_map import get_request_employee
+from HRMS.throttling import LeaveRequestRateThrottle
+from utils.sparse_fields import get_requested_fields, sparse_queryset
+from Employee.hierarchy import team_ids
 
 # ============================================================================LEAVE CRUD ============================================================================
 # API END POINTS = api/leave/leaverequest/
@@ -32,6 +36,11 @@ from utils.pagination import CustomPagination
 from datetime import datetime
 
 class LeaveRequestView(APIView):
+    # Only POST (leave submission) is throttled
+    throttle_classes = [LeaveRequestRateThrottle]
+    # Keyset pagination with ?cursor= (see utils.pagination.CustomPagination)
+    cursor_ordering = ("-applied_date", "-id")
+
     def get(self, request):
         """
         Get leave requests based on user role with filters and pagination
@@ -40,8 +49,8 @@ class LeaveRequestView(APIView):
         - JR_employee: See only own leave requests
         """
         try:
-            # Get employee by email (Django user email should match Employee email)
-            employee = Employee.objects.get(email=request.user.email)
+            # Authenticated employee (already loaded by MongoJWTAuthentication)
+            employee = get_request_employee(request, refs=None)
             
             # Get reporting managers for response
             reporting_managers = [
@@ -59,9 +68,10 @@ class LeaveRequestView(APIView):
                 # 1. Their own leave requests
                 # 2. Leave requests of employees who report to them
                 
-                # Get all employees who have this SR employee in their reportingManagers list
-                team_employees = Employee.objects.filter(reportingManagers=employee)
-                team_employee_ids = [emp.id for emp in team_employees]
+                # Team from the materialized hierarchy (one indexed lookup):
+                # direct reports, or everyone below them with ?scope=org
+                team_employee_ids = team_ids(employee.id, request.query_params.get("scope", "direct"))
+                team_size = len(team_employee_ids)
                 
                 # Add SR employee's own ID
                 team_employee_ids.append(employee.id)
@@ -112,6 +122,10 @@ class LeaveRequestView(APIView):
             # Apply ordering for consistent pagination
             leave_requests = leave_requests.order_by('-start_date', '-applied_date')
             
+            # Sparse fieldset (?fields=) - project and serialize only what is asked for
+            fields = get_requested_fields(request)
+            leave_requests = sparse_queryset(leave_requests, LeaveSerializer, fields, view=self)
+            
             # Check if there are any leave requests after filtering
             if leave_requests.count() == 0:
                 response_data = {
@@ -142,7 +156,7 @@ class LeaveRequestView(APIView):
             paginated_requests = paginator.paginate_queryset(leave_requests, request, view=self)
             
             # Serialize the data
-            serializer = LeaveSerializer(paginated_requests, many=True)
+            serializer = LeaveSerializer(paginated_requests, many=True, fields=fields)
             
             # Return paginated response
             response = paginator.get_paginated_response(serializer.data)
@@ -162,8 +176,7 @@ class LeaveRequestView(APIView):
             
             # Add team_size for SR_employee
             if employee.role == "SR_employee":
-                team_employees = Employee.objects.filter(reportingManagers=employee)
-                response.data['team_size'] = team_employees.count()
+                response.data['team_size'] = team_size
             
             return response
                 
@@ -182,8 +195,8 @@ class LeaveRequestView(APIView):
     def post(self, request):
         """Create a new leave request"""
         try:
-            # Get employee by email
-            employee = Employee.objects.get(email=request.user.email)
+            # Authenticated employee (already loaded by MongoJWTAuthentication)
+            employee = get_request_employee(request, refs=None)
             
             # Add employee to request data
             request_data = request.data.copy()
@@ -226,6 +239,7 @@ from utils.filters import apply_leave_date_filters
 from utils.pagination import CustomPagination
 
 class EmpLeaveRequestView(APIView):
+    cursor_ordering = ("-applied_date", "-id")
     
     def get(self, request, pk):
         """Get all leave requests for a specific employee with filters and pagination"""
@@ -363,8 +377,8 @@ class LeaveApproveView(APIView):
 
     def post(self, request, pk):
         try:
-            # Get current user as employee
-            emp = Employee.objects.get(id=request.user.id)
+            # Get current user as employee (already loaded by MongoJWTAuthentication)
+            emp = get_request_employee(request, refs=None)
             
             print(f"📋 Approval Request from: {emp.firstName} {emp.lastName} ({emp.role})")
             
@@ -1011,6 +1025,7 @@ from utils.pagination import CustomPagination
 
 class EmployeeWorkFromHomeRequest(APIView):
     """API for employees to request Work From Home (WFH)"""
+    cursor_ordering = ("-applied_date", "-id")
     
     def get(self, request, pk):
         """Get all WFH requests for a specific employee with filters and pagination"""
@@ -1027,12 +1042,16 @@ class EmployeeWorkFromHomeRequest(APIView):
             # Apply ordering for consistent pagination
             wfh_requests = wfh_requests.order_by('-start_date', '-applied_date')
             
+            # Sparse fieldset (?fields=)
+            fields = get_requested_fields(request)
+            wfh_requests = sparse_queryset(wfh_requests, WFHSerializer, fields, view=self)
+            
             # Apply pagination
             paginator = CustomPagination()
             paginated_requests = paginator.paginate_queryset(wfh_requests, request, view=self)
             
             # Serialize the data
-            serializer = WFHSerializer(paginated_requests, many=True)
+            serializer = WFHSerializer(paginated_requests, many=True, fields=fields)
             
             # Return paginated response
             response = paginator.get_paginated_response(serializer.data)
@@ -1100,6 +1119,7 @@ class EmployeeWorkFromHomeRequest(APIView):
        
 
 class OverallWorkFromHomeRequest(APIView):
+    cursor_ordering = ("-applied_date", "-id")
 
     def get(self, request):
         """
@@ -1122,12 +1142,10 @@ class OverallWorkFromHomeRequest(APIView):
 
             elif employee.role == "SR_employee":
 
-                # Get team employees
-                team_employees = Employee.objects.filter(
-                    reportingManagers=employee
-                )
-
-                team_employee_ids = [emp.id for emp in team_employees]
+                # Team from the materialized hierarchy (one indexed lookup):
+                # direct reports, or everyone below them with ?scope=org
+                team_employee_ids = team_ids(employee.id, request.query_params.get("scope", "direct"))
+                team_size = len(team_employee_ids)
 
                 # Add SR employee own ID
                 team_employee_ids.append(employee.id)
@@ -1180,6 +1198,10 @@ class OverallWorkFromHomeRequest(APIView):
                 "-start_date", "-applied_date"
             )
 
+            # ---------------- SPARSE FIELDSET ---------------- #
+            fields = get_requested_fields(request)
+            wfh_requests = sparse_queryset(wfh_requests, WFHSerializer, fields, view=self)
+
             # ---------------- EMPTY DATA ---------------- #
             if wfh_requests.count() == 0:
 
@@ -1210,7 +1232,7 @@ class OverallWorkFromHomeRequest(APIView):
                 wfh_requests, request, view=self
             )
 
-            serializer = WFHSerializer(paginated_requests, many=True)
+            serializer = WFHSerializer(paginated_requests, many=True, fields=fields)
 
             response = paginator.get_paginated_response(serializer.data)
 
@@ -1226,11 +1248,7 @@ class OverallWorkFromHomeRequest(APIView):
 
             # Add team size for SR employee
             if employee.role == "SR_employee":
-                team_count = Employee.objects.filter(
-                    reportingManagers=employee
-                ).count()
-
-                response.data["team_size"] = team_count
+                response.data["team_size"] = team_size
 
             return response
 
@@ -1,4 +1,26 @@
-from mongoengine import Document, StringField, EmailField, URLField
+from mongoengine import Document, EmbeddedDocument, StringField, EmailField, URLField, \
+                        FloatField, ListField, EmbeddedDocumentField, ValidationError
+
+
+class Site(EmbeddedDocument):
+    """
+    A place where punches are expected (HRMS.geofence)
+    Either a circle (latitude, longitude, radius_m) or a polygon of
+    [latitude, longitude] points
+    """
+    name = StringField(required=True, max_length=100)
+    latitude = FloatField()
+    longitude = FloatField()
+    radius_m = FloatField(min_value=1)
+    polygon = ListField(ListField(FloatField()), default=list)
+
+    def clean(self):
+        if self.polygon:
+            if len(self.polygon) < 3 or any(len(point) != 2 for point in self.polygon):
+                raise ValidationError(f"Site '{self.name}': polygon needs at least 3 [latitude, longitude] points")
+        elif self.latitude is None or self.longitude is None or not self.radius_m:
+            raise ValidationError(f"Site '{self.name}': needs latitude, longitude and radius_m, or a polygon")
+
 
 class Organization(Document):
     orgName = StringField(required=True, max_length=50)
@@ -7,6 +29,8 @@ class Organization(Document):
     orgEmail = StringField(required=True, unique=True)
     orgLink = StringField(required=True)
     orgStatus = StringField(required=True,choices=["Active", "Inactive"])
+    # Geofences checked on every punch
+    sites = ListField(EmbeddedDocumentField(Site), default=list)
 
     meta = {
         'collection': 'organizations',
@@ -1,9 +1,23 @@
+from mongoengine import ValidationError as DocumentValidationError
+from rest_framework import serializers
 from rest_framework_mongoengine.serializers import DocumentSerializer
-from Orgnization.models import Organization
+from Orgnization.models import Organization, Site
 
 class OrgnizationSerializer(DocumentSerializer):
     class Meta:
         model = Organization
         fields = '__all__'
 
-
+    def validate_sites(self, value):
+        # Site.clean() only runs on save(), where it would surface as a 500
+        errors = []
+        for site in value or []:
+            if not isinstance(site, Site):
+                site = Site(**site)
+            try:
+                site.validate()
+            except DocumentValidationError as e:
+                errors.append(e.message or str(e))
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
@@ -9,4 +9,5 @@ urlpatterns = [
     path("fetch/<str:pk>/",views.fetch_org,name="fetch_org"),
     path("update/<str:pk>/",views.update_org,name="update_org"),
     path("delete/<str:pk>/",views.delete_org,name="delete_org"),
+    path("geofence/<str:pk>/reevaluate/",views.reevaluate_geofences,name="reevaluate_geofences"),
 ]
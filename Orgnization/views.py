@@ -6,6 +6,12 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.pagination import PageNumberPagination
 import logging
+from bson import ObjectId
+from bson.errors import InvalidId
+from rest_framework.decorators import permission_classes
+from HRMS.reference_data import bump_reference_version
+from HRMS.geofence import reevaluate_month
+from HRMS.permissions import IsAuthenticated, IsAdminOrHR
 
 @api_view(['POST'])
 def create_org(request):
@@ -13,6 +19,7 @@ def create_org(request):
     print("fetched data",request.data)
     if serializer.is_valid():
         serializer.save()
+        bump_reference_version("organizations")
         print("serialised data",serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -48,6 +55,7 @@ def update_org(request,pk):
     serializer = OrgnizationSerializer(org,data=request.data)
     if serializer.is_valid():
         serializer.save()
+        bump_reference_version("organizations")
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -58,4 +66,52 @@ def delete_org(request,pk):
     except Organization.DoesNotExist:
         return Response({'error':'data not found'}, status=status.HTTP_400_BAD_REQUEST)
     org.delete()
-    return Response({"Message":'Orgnization Record deleted successfully'},status=status.HTTP_200_OK)
\ No newline at end of file
+    bump_reference_version("organizations")
+    return Response({"Message":'Orgnization Record deleted successfully'},status=status.HTTP_200_OK)
+
+
+#API END POINT = api/organization/geofence/<org_id>/reevaluate/   body: {"month": 3, "year": 2025}
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminOrHR])
+def reevaluate_geofences(request, pk):
+    """Recheck a month of punches against the organization's current sites"""
+    try:
+        org_id = ObjectId(pk)
+        month = int(request.data.get("month"))
+        year = int(request.data.get("year"))
+    except (InvalidId, TypeError, ValueError):
+        return Response({
+            "statusCode": 400,
+            "message": "Valid organization id, month and year are required",
+            "data": None
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not 1 <= month <= 12:
+        return Response({
+            "statusCode": 400,
+            "message": "Month must be between 1 and 12",
+            "data": None
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not Organization.objects(id=org_id).only("id").first():
+        return Response({
+            "statusCode": 404,
+            "message": "Organization not found",
+            "data": None
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        updated = reevaluate_month(org_id, year, month)
+    except RuntimeError as e:
+        return Response({
+            "statusCode": 503,
+            "message": str(e),
+            "data": None
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    print(f"📍 Geofences re-evaluated for {pk} {year}-{month:02d}: {updated}")
+    return Response({
+        "statusCode": 200,
+        "message": "Geofences re-evaluated",
+        "data": {"month": month, "year": year, "updated": updated}
+    }, status=status.HTTP_200_OK)
@@ -1,5 +1,7 @@
 from mongoengine import Document, StringField
-from datetime import datetime, time
+from datetime import time
+
+from HRMS.shift_registry import time_of
 
 
 class Shift(Document):
@@ -42,24 +44,15 @@ class Shift(Document):
     
     def get_from_time_obj(self):
         """Convert fromTime string to time object for comparisons"""
-        try:
-            return datetime.strptime(self.fromTime, "%H:%M:%S").time()
-        except:
-            return None
+        return time_of(self.fromTime)
     
     def get_end_time_obj(self):
         """Convert endTime string to time object for comparisons"""
-        try:
-            return datetime.strptime(self.endTime, "%H:%M:%S").time()
-        except:
-            return None
+        return time_of(self.endTime)
     
     def get_late_mark_time_obj(self):
         """Convert lateMarkTime string to time object for comparisons"""
-        try:
-            return datetime.strptime(self.lateMarkTime, "%H:%M:%S").time()
-        except:
-            return None
+        return time_of(self.lateMarkTime)
     
     meta = {
         'collection': 'shifts',
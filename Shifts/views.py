@@ -10,6 +10,8 @@ from HRMS.permissions import IsAdmin,IsHR,IsSREmployee, IsJREmployee, IsAuthenti
 import pytz
 from datetime import datetime
 from utils.timezone_utils import get_current_datetime_ist,get_current_time_ist
+from HRMS.reference_data import bump_reference_version
+from Employee.attendance_snapshot import schedule_propagation
 
 # Create your views here.
 @api_view(['POST'])
@@ -18,6 +20,7 @@ def create_shift(request):
     serializer = ShiftSerializer(data=request.data)
     if serializer.is_valid():
         serializer.save()
+        bump_reference_version("shifts")
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -47,9 +50,13 @@ def update_shift(request, pk):
     except Shift.DoesNotExist:
         return Response({"error": "Shift not found"}, status=status.HTTP_404_NOT_FOUND)
     print("curent time",get_current_time_ist())
+    old_type = shift.shiftType
     serializer = ShiftSerializer(shift, data=request.data, partial=True)
     if serializer.is_valid():
         serializer.save()
+        bump_reference_version("shifts")
+        if serializer.instance.shiftType != old_type:
+            schedule_propagation("shiftId", shift.id)
         return Response(serializer.data, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -62,4 +69,5 @@ def delete_shift(request, pk):
         return Response({"error": "Shift not found"}, status=status.HTTP_404_NOT_FOUND)
     
     shift.delete()
+    bump_reference_version("shifts")
     return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
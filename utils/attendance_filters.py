@@ -1,12 +1,17 @@
 """
-Attendance filtering utilities for string-based date queries
+Attendance filtering utilities
+Month and date-range filters use the integer date keys
+(Attendance.day = yyyymmdd, Attendance.month = yyyymm)
 """
 from datetime import datetime
 
+from utils.filters import month_key_filter
+from utils.timezone_utils import date_keys
+
 
 def apply_month_year_filter(queryset, request):
     """
-    Filter attendance by month and year using string dates
+    Filter attendance by month and year using the month/day keys
     
     Args:
         queryset: MongoEngine queryset
@@ -23,33 +28,12 @@ def apply_month_year_filter(queryset, request):
     year = request.query_params.get('year')
     
     if month and year:
-        try:
-            month = int(month)
-            year = int(year)
-            
-            # Create date range strings for the month
-            # Start: YYYY-MM-01
-            # End: YYYY-MM-31 (or appropriate last day)
-            
-            # Get last day of month
-            if month == 12:
-                next_month = 1
-                next_year = year + 1
-            else:
-                next_month = month + 1
-                next_year = year
-            
-            # First day of current month
-            start_date = f"{year:04d}-{month:02d}-01"
-            
-            # First day of next month (to use as upper bound)
-            end_date = f"{next_year:04d}-{next_month:02d}-01"
-            
-            # Filter: date >= start_date AND date < end_date
-            queryset = queryset.filter(date__gte=start_date, date__lt=end_date)
-            
-        except (ValueError, TypeError):
-            pass  # Invalid month/year, return unfiltered
+        # Integer date keys (day = yyyymmdd, month = yyyymm):
+        # index range scans on (employee, day) / (month, status)
+        month_filter = month_key_filter(year, month)
+        if month_filter is not None:
+            queryset = queryset.filter(**month_filter)
+        # Invalid month/year: return unfiltered
     
     return queryset
 
@@ -80,7 +64,7 @@ def apply_status_filter(queryset, request):
 
 def apply_date_range_filter(queryset, request):
     """
-    Filter attendance by date range using string dates
+    Filter attendance by date range using the day keys
     
     Args:
         queryset: MongoEngine queryset
@@ -100,7 +84,8 @@ def apply_date_range_filter(queryset, request):
         try:
             # Validate format
             datetime.strptime(start_date, "%Y-%m-%d")
-            queryset = queryset.filter(date__gte=start_date)
+            start_day, start_month = date_keys(start_date)
+            queryset = queryset.filter(month__gte=start_month, day__gte=start_day)
         except ValueError:
             pass  # Invalid format, skip filter
     
@@ -108,7 +93,8 @@ def apply_date_range_filter(queryset, request):
         try:
             # Validate format
             datetime.strptime(end_date, "%Y-%m-%d")
-            queryset = queryset.filter(date__lte=end_date)
+            end_day, end_month = date_keys(end_date)
+            queryset = queryset.filter(month__lte=end_month, day__lte=end_day)
         except ValueError:
             pass  # Invalid format, skip filter
     
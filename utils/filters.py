@@ -67,17 +67,19 @@
 
 
 
-from utils.timezone_utils import is_valid_date_format
+from utils.timezone_utils import is_valid_date_format, date_keys, month_key, month_day_key_range
 
 
 # ============================================================================
 # COMMON DATE FILTER (Single date field)
-# Example: Attendance, Holiday, Daily Logs
+# Example: Attendance
 # ============================================================================
 
 def apply_date_filters(queryset, request):
     """
-    Filters records having a single `date` field.
+    Filters attendance records on their `date`.
+    Ranges and months use the integer date keys (`day` = yyyymmdd,
+    `month` = yyyymm), exact dates the `date` string.
 
     Supported query params:
     ?date=YYYY-MM-DD
@@ -100,9 +102,14 @@ def apply_date_filters(queryset, request):
         and is_valid_date_format(start_date)
         and is_valid_date_format(end_date)
     ):
+        start_day, start_month = date_keys(start_date)
+        end_day, end_month = date_keys(end_date)
+        # month bounds let queries across employees use (month, status)
         return queryset.filter(
-            date__gte=start_date,
-            date__lte=end_date
+            month__gte=start_month,
+            month__lte=end_month,
+            day__gte=start_day,
+            day__lte=end_day
         )
 
     # --------------------------------------------------
@@ -115,18 +122,29 @@ def apply_date_filters(queryset, request):
     # 3️⃣ MONTH FILTER
     # --------------------------------------------------
     if month and year:
-        month = month.zfill(2)
-        start = f"{year}-{month}-01"
-        end = f"{year}-{month}-31"
-
-        return queryset.filter(
-            date__gte=start,
-            date__lte=end
-        )
+        month_filter = month_key_filter(year, month)
+        if month_filter is None:
+            return queryset.none()
+        return queryset.filter(**month_filter)
 
     return queryset
 
 
+def month_key_filter(year, month):
+    """
+    Filter kwargs selecting one month by the attendance date keys
+
+    Both keys are given so the planner can scan (employee, day) for one
+    employee's month and (month, status) for everyone's
+    Returns None for an invalid month/year
+    """
+    key = month_key(year, month)
+    if key is None:
+        return None
+    first_day, last_day = month_day_key_range(year, month)
+    return {"month": key, "day__gte": first_day, "day__lte": last_day}
+
+
 # ============================================================================
 # WFH DATE FILTER (start_date & end_date fields)
 # ============================================================================
@@ -4,6 +4,7 @@ import re
 import json
 from ipware import get_client_ip
 from django.conf import settings
+from HRMS.geocoding import reverse_geocode
 
 class LocationService:
     """Service to extract and process location data for check-in/check-out"""
@@ -61,26 +62,8 @@ class LocationService:
     
     @staticmethod
     def _reverse_geocode(latitude, longitude):
-        """Convert coordinates to address using Nominatim"""
-        try:
-            url = "https://nominatim.openstreetmap.org/reverse"
-            params = {
-                'lat': latitude,
-                'lon': longitude,
-                'format': 'json',
-                'addressdetails': 1
-            }
-            headers = {
-                'User-Agent': 'HRMS-App/1.0 (hrms@example.com)'
-            }
-            
-            response = requests.get(url, params=params, headers=headers, timeout=5)
-            if response.status_code == 200:
-                return response.json()
-        except Exception as e:
-            print(f"Reverse geocoding failed: {e}")
-        
-        return None
+        """Convert coordinates to address using Nominatim (cached per geohash cell)"""
+        return reverse_geocode(latitude, longitude)
     
     @staticmethod
     def _extract_area_from_address(address_data):
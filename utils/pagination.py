@@ -1,32 +1,203 @@
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+from bson import ObjectId
+import base64
+import json
 import math
+import threading
+import time
+
+
+# Cached filtered counts for count mode "estimated": (collection, query) -> (count, stored_at)
+_count_cache = {}
+_count_cache_lock = threading.Lock()
+
+
+def encode_cursor(values, direction):
+    """Opaque cursor for the keyset position `values` (ObjectIds as strings)"""
+    raw = json.dumps({
+        "v": [str(v) if isinstance(v, ObjectId) else v for v in values],
+        "d": direction
+    }, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (values, direction) from an opaque cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return data["v"], data["d"]
+    except (ValueError, KeyError, TypeError):
+        raise ValidationError({"cursor": "Invalid cursor"})
+
 
 class CustomPagination(PageNumberPagination):
+    """
+    Page-number pagination with an optional keyset (cursor) mode
+
+    Page mode (default):   ?page=3&limit=10          - skip/limit
+    Cursor mode:           ?cursor=<opaque>&limit=10  - range query on
+                           the view's `cursor_ordering`, e.g. ("-date", "-id")
+
+    A view opts in to cursors by setting `cursor_ordering`; cursor mode is
+    then used when the view sets `pagination_mode = "cursor"` or the client
+    sends a `cursor` parameter (empty for the first page).
+
+    Total count (`?count=` or the view's `count_mode`):
+        exact      - queryset.count() (default in page mode)
+        estimated  - estimated_document_count() for unfiltered querysets,
+                     otherwise a count cached for PAGINATION_COUNT_CACHE_SECONDS
+        none       - no count (default in cursor mode)
+
+    Both modes return the same statusCode/message/data/meta envelope.
+    """
     page_size = 10
     page_size_query_param = "limit"
+    pagination_mode = "page"
+    count_mode = None
 
     def paginate_queryset(self, queryset, request, view=None):
         self.page_size = int(request.query_params.get("limit", self.page_size))
         self.page_number = int(request.query_params.get("page", 1))
+        self.next_cursor = None
+        self.prev_cursor = None
 
-        total_count = queryset.count()
-        start = (self.page_number - 1) * self.page_size
-        end = start + self.page_size
+        ordering = getattr(view, "cursor_ordering", None)
+        mode = getattr(view, "pagination_mode", self.pagination_mode)
+        if ordering and (mode == "cursor" or "cursor" in request.query_params):
+            self.mode = "cursor"
+        else:
+            self.mode = "page"
 
-        self.total_pages = math.ceil(total_count / self.page_size)
+        count_mode = (
+            request.query_params.get("count")
+            or getattr(view, "count_mode", None)
+            or self.count_mode
+            or ("none" if self.mode == "cursor" else "exact")
+        )
+        total_count = self.get_total_count(queryset, count_mode)
         self.total_count = total_count
+        self.total_pages = math.ceil(total_count / self.page_size) if total_count is not None else None
+
+        if self.mode == "cursor":
+            self.page_number = None
+            return self.paginate_cursor(queryset, request, ordering)
+
+        start = (self.page_number - 1) * self.page_size
+        end = start + self.page_size
 
         return queryset[start:end]
 
+    # ------------------------------------------------------------------
+    # Counting
+    # ------------------------------------------------------------------
+
+    def get_total_count(self, queryset, count_mode):
+        if count_mode == "none":
+            return None
+        if count_mode != "estimated":
+            return queryset.count()
+
+        query = queryset._query
+        collection = queryset._collection
+        if not query:
+            # Reads collection metadata, no scan
+            return collection.estimated_document_count()
+
+        key = (collection.name, json.dumps(query, sort_keys=True, default=str))
+        ttl = getattr(settings, "PAGINATION_COUNT_CACHE_SECONDS", 60)
+        now = time.monotonic()
+        with _count_cache_lock:
+            cached = _count_cache.get(key)
+            if cached and now - cached[1] < ttl:
+                return cached[0]
+
+        count = queryset.count()
+        with _count_cache_lock:
+            if len(_count_cache) > 1000:
+                _count_cache.clear()
+            _count_cache[key] = (count, now)
+        return count
+
+    # ------------------------------------------------------------------
+    # Keyset pagination
+    # ------------------------------------------------------------------
+
+    def paginate_cursor(self, queryset, request, ordering):
+        document = queryset._document
+        fields = [name.lstrip("-") for name in ordering]
+        db_fields = [document._fields[name].db_field for name in fields]
+        descending = [name.startswith("-") for name in ordering]
+
+        cursor = request.query_params.get("cursor")
+        direction = "next"
+        if cursor:
+            values, direction = decode_cursor(cursor)
+            if len(values) != len(fields):
+                raise ValidationError({"cursor": "Invalid cursor"})
+            values = [
+                ObjectId(v) if db_field == "_id" else v
+                for db_field, v in zip(db_fields, values)
+            ]
+            queryset = queryset.filter(
+                __raw__=self.keyset_filter(db_fields, descending, values, backwards=(direction == "prev"))
+            )
+
+        if direction == "prev":
+            # Walk backwards from the cursor, then restore the display order
+            sort = [name[1:] if name.startswith("-") else f"-{name}" for name in ordering]
+        else:
+            sort = list(ordering)
+
+        rows = list(queryset.order_by(*sort)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if direction == "prev":
+            rows.reverse()
+
+        if rows:
+            first = [getattr(rows[0], name) for name in fields]
+            last = [getattr(rows[-1], name) for name in fields]
+            if direction == "next":
+                self.next_cursor = encode_cursor(last, "next") if has_more else None
+                self.prev_cursor = encode_cursor(first, "prev") if cursor else None
+            else:
+                self.next_cursor = encode_cursor(last, "next")
+                self.prev_cursor = encode_cursor(first, "prev") if has_more else None
+        return rows
+
+    @staticmethod
+    def keyset_filter(db_fields, descending, values, backwards=False):
+        """
+        Range filter for rows after (or before) `values` in the sort order
+        (a, b) > (x, y)  ->  a > x OR (a == x AND b > y)
+        """
+        clauses = []
+        for i, db_field in enumerate(db_fields):
+            clause = {db_fields[j]: values[j] for j in range(i)}
+            after_is_less = descending[i] != backwards
+            clause[db_field] = {"$lt" if after_is_less else "$gt": values[i]}
+            clauses.append(clause)
+        return {"$or": clauses}
+
     def get_paginated_response(self, data):
+        meta = {
+            "total": self.total_count,
+            "page": self.page_number,
+            "pages": self.total_pages
+        }
+        if getattr(self, "mode", "page") == "cursor":
+            meta.update({
+                "limit": self.page_size,
+                "next": self.next_cursor,
+                "prev": self.prev_cursor
+            })
         return Response({
             "statusCode": 200,
             "message": "Attendance fetched successfully",
             "data": data,
-            "meta": {
-                "total": self.total_count,
-                "page": self.page_number,
-                "pages": self.total_pages
-            }
+            "meta": meta
         })
@@ -0,0 +1,70 @@
+"""
+Sparse fieldsets for list endpoints
+
+    GET /api/employee/Attendance/overall/?fields=date,status,check_in_display
+
+`?fields=` limits both what is read from MongoDB (a `.only()` projection)
+and what the serializer builds (unrequested SerializerMethodFields are
+never evaluated).
+
+Serializers opt in with SparseFieldsetMixin and describe which document
+fields their computed fields read in `field_sources`.
+"""
+
+
+def get_requested_fields(request):
+    """Return the list of names from ?fields=, or None for all fields"""
+    raw = request.query_params.get("fields")
+    if not raw:
+        return None
+    fields = [name.strip() for name in raw.split(",") if name.strip()]
+    return fields or None
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin accepting a `fields` kwarg
+    Fields not listed are dropped before serialization ("id" is always kept).
+
+    field_sources: {serializer field: (document fields it reads)}, used to
+    build the projection for fields that are not plain document fields.
+    """
+    field_sources = {}
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            allowed = set(fields) | {"id"}
+            for name in list(self.fields):
+                if name not in allowed:
+                    self.fields.pop(name)
+
+    @classmethod
+    def source_fields(cls, fields):
+        """Document fields needed to render the given serializer fields"""
+        sources = []
+        for name in fields:
+            sources.extend(cls.field_sources.get(name, (name,)))
+        return sources
+
+
+def sparse_queryset(queryset, serializer_class, fields, view=None):
+    """
+    Project `queryset` to the document fields needed for `fields`
+    Keeps "id" and the view's cursor_ordering fields so cursor pagination
+    still works. Returns the queryset unchanged when fields is None.
+    """
+    if not fields:
+        return queryset
+
+    document_fields = queryset._document._fields
+    needed = ["id"]
+    needed.extend(serializer_class.source_fields(fields))
+    needed.extend(name.lstrip("-") for name in getattr(view, "cursor_ordering", None) or ())
+
+    only = []
+    for name in needed:
+        if name in document_fields and name not in only:
+            only.append(name)
+    return queryset.only(*only)
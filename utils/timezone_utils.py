@@ -377,6 +377,56 @@ def is_valid_datetime_format(datetime_str):
         return False
 
 
+# ============================================================================
+# DATE KEYS (integer forms of "YYYY-MM-DD" for indexed range queries)
+# ============================================================================
+
+def date_keys(date_str):
+    """
+    Integer keys of a date string
+    Args:
+        date_str: date string "YYYY-MM-DD"
+    Returns: (day key yyyymmdd, month key yyyymm), (None, None) if invalid
+    Example: "2024-12-27" -> (20241227, 202412)
+    """
+    if not date_str:
+        return None, None
+    try:
+        parsed = datetime.strptime(date_str, DATE_FORMAT).date()
+    except (TypeError, ValueError):
+        return None, None
+    day_key = parsed.year * 10000 + parsed.month * 100 + parsed.day
+    return day_key, day_key // 100
+
+
+def month_key(year, month):
+    """
+    Month key yyyymm
+    Args:
+        year: int or numeric string (e.g., 2024)
+        month: int or numeric string (1-12)
+    Returns: int, None if invalid
+    """
+    try:
+        year, month = int(year), int(month)
+    except (TypeError, ValueError):
+        return None
+    if not (1 <= month <= 12 and 1 <= year <= 9999):
+        return None
+    return year * 100 + month
+
+
+def month_day_key_range(year, month):
+    """
+    First and last possible day keys of a month (yyyymm01, yyyymm31)
+    Returns: (int, int), (None, None) if invalid
+    """
+    key = month_key(year, month)
+    if key is None:
+        return None, None
+    return key * 100 + 1, key * 100 + 31
+
+
 # ============================================================================
 # CONVENIENCE ALIASES
 # ============================================================================